@@ -0,0 +1,335 @@
+"""
+Accuracy and throughput baseline of the whole OCR path, for every engine and preset.
+
+Renders a corpus of UI-like screenshots (title bar, sidebar, body text, buttons, status bar) with
+known text: light and dark themes, sans, serif and monospace fonts, several sizes, plus Simplified
+Chinese screens recognized with chi_sim when a CJK font is installed. Every configuration
+(engine x preprocessing preset x text region mode) recognizes every screen the way
+ocr.extract_layout does, without the result cache and in one thread, and reports:
+  - the character error rate (CER): each rendered line is compared with the words recognized
+    inside its box, and words outside every line count as errors too, so the reading order
+    chosen by the engine does not matter,
+  - images per second,
+  - the median milliseconds per image of each stage: text region detection, preprocessing,
+    the engine itself and building the result.
+
+    cd screenshot_tool
+    python benchmarks/ocr_benchmark.py --json benchmarks/ocr_baseline.json   # record a baseline
+    python benchmarks/ocr_benchmark.py --baseline benchmarks/ocr_baseline.json  # compare with it
+
+With --baseline the exit status is 1 if any configuration got less accurate (CER up by more
+than --cer-tolerance) or slower (images/sec down by more than --speed-tolerance) than in the
+baseline. Languages whose Tesseract data is missing are reported and skipped; without any OCR
+engine only detection and preprocessing are timed.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # screenshot_tool/
+sys.path.insert(0, PROJECT_ROOT)
+
+from PIL import Image, ImageDraw # noqa: E402
+
+from ocr_preprocess_benchmark import WORDS, edit_distance # noqa: E402
+from src import fonts, ocr_engines, ocr_preprocess, text_regions # noqa: E402
+from src.ocr_result import OcrResult # noqa: E402
+
+CJK_WORDS = ("文件 编辑 视图 设置 搜索 打开 保存 取消 应用 删除 导出 导入 终端 构建 调试 错误 警告 "
+             "已连接 已断开 下载 上传 预览 个人资料 账户 网络 状态 运行中 已停止 帮助 窗口 工具 刷新").split()
+SCREEN_THEMES = {
+    "light": {"background": (255, 255, 255), "bar": (225, 228, 232), "panel": (243, 244, 246),
+              "text": (32, 33, 36), "muted": (95, 99, 104), "accent": (26, 115, 232), "accent_text": (255, 255, 255)},
+    "dark": {"background": (30, 31, 34), "bar": (43, 45, 49), "panel": (37, 39, 43),
+             "text": (220, 221, 222), "muted": (150, 155, 160), "accent": (88, 101, 242), "accent_text": (255, 255, 255)},
+}
+FONT_FAMILIES = ("sans", "serif", "monospace")
+CJK_FAMILIES = ("Noto Sans CJK SC", "Source Han Sans SC", "WenQuanYi Micro Hei", "WenQuanYi Zen Hei",
+                "Microsoft YaHei", "PingFang SC", "SimHei", "SimSun")
+FONT_SIZES = (11, 13, 16, 20)
+LANGS = ("eng", "chi_sim")
+REGION_MODES = ("off", "on")
+BOX_TOLERANCE = 4 # Pixels a recognized word's center may lie outside a rendered line's box
+STAGES = ("detect", "preprocess", "recognize", "assemble")
+
+def available_families(lang):
+    """Installed font families to render lang with (aliases resolved, duplicates removed)."""
+    if lang == "chi_sim":
+        installed = {family.lower(): family for family in fonts.list_families()}
+        return [installed[name.lower()] for name in CJK_FAMILIES if name.lower() in installed][:1]
+    families = []
+    for family in FONT_FAMILIES:
+        resolved = fonts.resolve_family(family)
+        if resolved is not None and resolved not in families:
+            families.append(resolved)
+    return families
+
+def render_screen(rng, theme, family, font_size, lang="eng", width=960):
+    """
+    Renders a UI-like screen.
+
+    Returns:
+        tuple: (RGB image, elements) where elements is a list of (text, box) for every rendered
+               line of text, box being its (x1, y1, x2, y2) bounding box.
+    """
+    colors = SCREEN_THEMES[theme]
+    vocabulary = CJK_WORDS if lang == "chi_sim" else WORDS
+    separator = "" if lang == "chi_sim" else " "
+    font = fonts.get_font(family, font_size)
+    line_height = int(font_size * 1.8)
+    bar_height = line_height + 8
+    sidebar_width = width // 4
+    content_lines = 8
+    height = bar_height * 2 + line_height * (content_lines + 4) + 32
+    image = Image.new("RGB", (width, height), colors["background"])
+    draw = ImageDraw.Draw(image)
+    elements = []
+
+    def text(position, words, fill, max_width):
+        while len(words) > 1 and draw.textlength(separator.join(words), font=font) > max_width:
+            words = words[:-1] # Drop words until the line fits
+        line = separator.join(words)
+        draw.text(position, line, fill=fill, font=font)
+        elements.append((line, draw.textbbox(position, line, font=font)))
+
+    def words(count):
+        return [rng.choice(vocabulary) for _ in range(count)]
+
+    draw.rectangle((0, 0, width, bar_height), fill=colors["bar"])
+    text((12, 4), words(3), colors["text"], width - 24)
+    draw.rectangle((0, bar_height, sidebar_width, height - bar_height), fill=colors["panel"])
+    for i in range(content_lines):
+        text((16, bar_height + 12 + i * line_height), words(rng.randint(1, 2)), colors["muted"], sidebar_width - 24)
+    left = sidebar_width + 24
+    for i in range(content_lines):
+        text((left, bar_height + 12 + i * line_height), words(rng.randint(4, 9)), colors["text"], width - left - 24)
+    button_top = bar_height + 24 + content_lines * line_height
+    x = left
+    for _ in range(3):
+        label = words(1)
+        label_width = draw.textlength(separator.join(label), font=font)
+        draw.rounded_rectangle((x, button_top, x + label_width + 32, button_top + line_height + 12),
+                               radius=4, fill=colors["accent"])
+        text((x + 16, button_top + 6), label, colors["accent_text"], label_width)
+        x += label_width + 48
+    draw.rectangle((0, height - bar_height, width, height), fill=colors["bar"])
+    text((12, height - bar_height + 4), words(4), colors["muted"], width - 24)
+    return image, elements
+
+def build_corpus(langs=LANGS, seed=7, per_combination=1):
+    """Returns the screens as dicts {"id", "lang", "theme", "family", "size", "image", "elements"}."""
+    rng = random.Random(seed)
+    corpus = []
+    for lang in langs:
+        for theme in SCREEN_THEMES:
+            for family in available_families(lang):
+                for size in FONT_SIZES:
+                    for n in range(per_combination):
+                        image, elements = render_screen(rng, theme, family, size, lang)
+                        corpus.append({"id": f"{lang}-{theme}-{family.replace(' ', '')}-{size}-{n}", "lang": lang,
+                                       "theme": theme, "family": family, "size": size,
+                                       "image": image, "elements": elements})
+    return corpus
+
+def layout_errors(elements, layout, ignore_spaces=False):
+    """
+    Compares a recognized layout with the rendered lines.
+
+    Returns:
+        tuple: (character errors, expected characters). Each line's words are matched by the
+               position of their centers; words outside every line are all errors.
+    """
+    def normalize(value):
+        return "".join(value.split()) if ignore_spaces else " ".join(value.split())
+
+    matched = [[] for _ in elements]
+    errors = 0
+    for word in layout.words():
+        x1, y1, x2, y2 = word["box"]
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        for k, (_, box) in enumerate(elements):
+            if (box[0] - BOX_TOLERANCE <= cx <= box[2] + BOX_TOLERANCE
+                    and box[1] - BOX_TOLERANCE <= cy <= box[3] + BOX_TOLERANCE):
+                matched[k].append(word)
+                break
+        else:
+            errors += len(normalize(word["text"])) # Text where there is none
+    total = 0
+    for (expected, _), words in zip(elements, matched):
+        expected = normalize(expected)
+        actual = normalize(" ".join(w["text"] for w in sorted(words, key=lambda w: w["box"][0])))
+        errors += edit_distance(expected, actual)
+        total += len(expected)
+    return errors, total
+
+def recognize(image, engine, lang, preset, regions, stage_ms):
+    """
+    Recognizes image like ocr.extract_layout (no cache, one thread), adding the milliseconds of
+    each stage to stage_ms. engine None only detects and preprocesses.
+
+    Returns:
+        OcrResult
+    """
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        stage_ms[stage] = stage_ms.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+        return result
+
+    def recognize_part(part):
+        prepared, transform = timed("preprocess", ocr_preprocess.preprocess, part, preset)
+        if engine is None:
+            return OcrResult(*part.size)
+        data = timed("recognize", engine.image_to_data, prepared, lang)
+        return timed("assemble", lambda: OcrResult.from_data(ocr_preprocess.map_data(data, transform, part.size)))
+
+    if regions != "off":
+        found = timed("detect", text_regions.find_text_regions, image)
+        if regions == "on" or text_regions.coverage(found, image.size) <= text_regions.AUTO_MAX_COVERAGE:
+            inside = sum(stage_ms.values())
+            start = time.perf_counter()
+            result = text_regions.recognize_regions(image, found, recognize_part, workers=1)
+            # What recognize_regions spends outside the parts (cropping, merging) is assembly too
+            outside = (time.perf_counter() - start) * 1000 - (sum(stage_ms.values()) - inside)
+            stage_ms["assemble"] = stage_ms.get("assemble", 0.0) + outside
+            return result
+    return recognize_part(image)
+
+def usable_engines(names=None):
+    """Returns {name: engine} for the requested (default: installed) engines that can run Tesseract."""
+    engines = {}
+    for name in names or ocr_engines.available_engines():
+        try:
+            engine = ocr_engines.get_engine(name)
+            engine.image_to_string(Image.new("L", (32, 32), 255)) # Fails early if Tesseract itself is missing
+            engines[name] = engine
+        except ocr_engines.OcrError as e:
+            print(f"Skipping engine {name}: {e}")
+    return engines
+
+def run(corpus, engines, presets, region_modes):
+    """
+    Runs every configuration over the corpus.
+
+    Args:
+        corpus (list): From build_corpus.
+        engines (dict): {name: engine}; empty to time detection and preprocessing only.
+        presets (list): Names in ocr_preprocess.PRESETS.
+        region_modes (list): "off" and/or "on"/"auto" (see text_regions).
+
+    Returns:
+        dict: "engine/preset/regions/lang" -> {"images", "cer", "worst_cer", "worst_image",
+              "images_per_sec", "stages_ms": {stage: median ms}, "total_ms"}, or {"error": message}.
+    """
+    results = {}
+    langs = sorted({sample["lang"] for sample in corpus}, key=LANGS.index)
+    for engine_name, engine in (engines or {"none": None}).items():
+        for lang in langs:
+            samples = [sample for sample in corpus if sample["lang"] == lang]
+            error = None
+            if engine is not None:
+                try: # Loads the language data, so it does not count towards the first image
+                    engine.image_to_data(samples[0]["image"], lang=lang)
+                except ocr_engines.OcrError as e:
+                    error = str(e)
+            for preset in presets:
+                for regions in region_modes:
+                    key = f"{engine_name}/{preset}/{regions}/{lang}"
+                    if error is not None:
+                        results[key] = {"error": error}
+                        continue
+                    results[key] = _run_configuration(samples, engine, lang, preset, regions)
+    return results
+
+def _run_configuration(samples, engine, lang, preset, regions):
+    per_stage = {stage: [] for stage in STAGES}
+    totals, rates = [], []
+    for sample in samples:
+        stage_ms = {}
+        start = time.perf_counter()
+        layout = recognize(sample["image"], engine, lang, preset, regions, stage_ms)
+        totals.append((time.perf_counter() - start) * 1000)
+        for stage in STAGES:
+            per_stage[stage].append(stage_ms.get(stage, 0.0))
+        if engine is not None:
+            errors, expected = layout_errors(sample["elements"], layout, ignore_spaces=lang == "chi_sim")
+            rates.append(errors / max(1, expected))
+    result = {"images": len(samples), "images_per_sec": round(len(samples) * 1000 / sum(totals), 2),
+              "stages_ms": {stage: round(statistics.median(values), 2) for stage, values in per_stage.items()},
+              "total_ms": round(statistics.median(totals), 2)}
+    if rates:
+        worst = max(range(len(rates)), key=rates.__getitem__)
+        result.update(cer=round(statistics.mean(rates), 4), worst_cer=round(rates[worst], 4),
+                      worst_image=samples[worst]["id"])
+    return result
+
+def compare(results, baseline, cer_tolerance, speed_tolerance):
+    """Returns messages for the configurations that are less accurate or slower than in baseline."""
+    regressions = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None or "error" in current or "error" in base:
+            continue
+        if "cer" in base and "cer" in current and current["cer"] > base["cer"] + cer_tolerance:
+            regressions.append(f"{key}: CER {base['cer']:.3f} -> {current['cer']:.3f}")
+        if current["images_per_sec"] < base["images_per_sec"] * (1 - speed_tolerance):
+            regressions.append(f"{key}: {base['images_per_sec']:.2f} -> {current['images_per_sec']:.2f} images/s")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OCR accuracy and speed on a synthetic screenshot corpus.")
+    parser.add_argument("--engines", nargs="+", choices=ocr_engines.ENGINES, help="Default: all installed engines.")
+    parser.add_argument("--presets", nargs="+", default=list(ocr_preprocess.PRESETS), choices=tuple(ocr_preprocess.PRESETS))
+    parser.add_argument("--regions", nargs="+", default=list(REGION_MODES), choices=text_regions.MODES)
+    parser.add_argument("--langs", nargs="+", default=list(LANGS), choices=LANGS)
+    parser.add_argument("--per-combination", type=int, default=1, help="Screens per theme, font and size.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-corpus", metavar="DIR", help="Also write the screens and their text to DIR.")
+    parser.add_argument("--json", help="Write the results to this file (e.g. as the new baseline).")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with.")
+    parser.add_argument("--cer-tolerance", type=float, default=0.01, help="Allowed CER increase (absolute).")
+    parser.add_argument("--speed-tolerance", type=float, default=0.2, help="Allowed images/sec decrease (fraction).")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.langs, args.seed, args.per_combination)
+    for lang in args.langs:
+        if not any(sample["lang"] == lang for sample in corpus):
+            print(f"No font to render {lang} with; its screens are skipped.")
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for sample in corpus:
+            sample["image"].save(os.path.join(args.save_corpus, sample["id"] + ".png"))
+        with open(os.path.join(args.save_corpus, "ground_truth.json"), "w", encoding="utf-8") as f:
+            json.dump({sample["id"]: [{"text": t, "box": list(b)} for t, b in sample["elements"]] for sample in corpus},
+                      f, ensure_ascii=False, indent=1)
+    engines = usable_engines(args.engines)
+    if not engines:
+        print("No usable OCR engine; timing detection and preprocessing only.")
+    print(f"{len(corpus)} screens; engines: {', '.join(engines) or 'none'}")
+    results = run(corpus, engines, args.presets, args.regions)
+
+    print(f"{'configuration':<38}{'CER':>7}{'worst':>7}{'img/s':>9}" + "".join(f"{stage:>11}" for stage in STAGES))
+    for key, r in results.items():
+        if "error" in r:
+            print(f"{key:<38}  {r['error']}")
+            continue
+        cer = f"{r['cer']:>7.3f}{r['worst_cer']:>7.3f}" if "cer" in r else f"{'-':>7}{'-':>7}"
+        print(f"{key:<38}{cer}{r['images_per_sec']:>9.1f}" + "".join(f"{r['stages_ms'][s]:>9.1f}ms" for s in STAGES))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"screens": len(corpus), "seed": args.seed, "per_combination": args.per_combination,
+                       "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.cer_tolerance, args.speed_tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,149 @@
+"""
+Speed and accuracy of the OCR preprocessing presets (see src/ocr_preprocess.py).
+
+Renders UI-like test images with known text (light and dark themes, colored panels, small and
+normal font sizes), runs every preset followed by the OCR engine, and reports per preset:
+  - the preprocessing time and the OCR time per image,
+  - the character error rate (CER) against the rendered text.
+The recommended preset is the fastest one (preprocessing + OCR) whose CER is within --max-cer.
+
+    cd screenshot_tool
+    python benchmarks/ocr_preprocess_benchmark.py --json ../preprocess_bench.json
+
+Without an OCR engine (tesserocr or the tesseract program) only the preprocessing times are
+measured. The result is written to ocr.preprocess by --apply.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # screenshot_tool/
+sys.path.insert(0, PROJECT_ROOT)
+
+from PIL import Image, ImageDraw # noqa: E402
+
+from src import config_manager, fonts, ocr_engines, ocr_preprocess # noqa: E402
+
+WORDS = ("File Edit View Settings Search Open Save Cancel Apply Delete Export Import Terminal Build "
+         "Debug Error Warning Connected Disconnected Download Upload Preview Profile Account Network "
+         "Status Running Stopped 2024 42 3.14 user@example.com 192.168.0.1 v1.2.3").split()
+THEMES = {
+    "light": {"background": (255, 255, 255), "panel": (236, 240, 245), "text": (33, 33, 33)},
+    "dark": {"background": (30, 30, 30), "panel": (45, 52, 64), "text": (220, 220, 220)},
+    "accent": {"background": (250, 250, 250), "panel": (25, 118, 210), "text": (255, 255, 255)},
+}
+FONT_SIZES = (11, 13, 16)
+
+def render_sample(rng, theme, font_size, lines=6, width=640):
+    """Returns (RGBA image, expected text) of a small UI-like panel."""
+    colors = THEMES[theme]
+    font = fonts.get_font("sans", font_size)
+    line_height = int(font_size * 1.6)
+    margin = 24
+    image = Image.new("RGBA", (width, margin * 2 + lines * line_height), colors["background"] + (255,))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((margin // 2, margin // 2, width - margin // 2, image.height - margin // 2), fill=colors["panel"])
+    expected = []
+    for i in range(lines):
+        words = []
+        while True: # Fill the line without overflowing the panel
+            candidate = words + [rng.choice(WORDS)]
+            if draw.textlength(" ".join(candidate), font=font) > width - margin * 2 or len(candidate) > 8:
+                break
+            words = candidate
+        text = " ".join(words)
+        draw.text((margin, margin + i * line_height), text, fill=colors["text"], font=font)
+        expected.append(text)
+    return image, "\n".join(expected)
+
+def edit_distance(expected, actual):
+    """Levenshtein distance (insertions, deletions and substitutions of characters) between two strings."""
+    previous = list(range(len(actual) + 1))
+    for i, e in enumerate(expected, 1):
+        current = [i]
+        for j, a in enumerate(actual, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (e != a)))
+        previous = current
+    return previous[-1]
+
+def character_error_rate(expected, actual):
+    """Levenshtein distance between the texts (whitespace runs collapsed), divided by len(expected)."""
+    expected, actual = " ".join(expected.split()), " ".join(actual.split())
+    if not expected:
+        return 0.0 if not actual else 1.0
+    return edit_distance(expected, actual) / len(expected)
+
+def build_corpus(seed=7, per_combination=2):
+    rng = random.Random(seed)
+    return [(theme, size) + render_sample(rng, theme, size)
+            for theme in THEMES for size in FONT_SIZES for _ in range(per_combination)]
+
+def run(corpus, presets, engine, lang="eng"):
+    results = {}
+    for preset in presets:
+        preprocess_ms, ocr_ms, cers, step_ms = [], [], [], {}
+        for _, _, image, expected in corpus:
+            start = time.perf_counter()
+            prepared, _ = ocr_preprocess.preprocess(image, preset, timings=step_ms)
+            preprocess_ms.append((time.perf_counter() - start) * 1000)
+            if engine is None:
+                continue
+            start = time.perf_counter()
+            text = engine.image_to_string(prepared, lang=lang)
+            ocr_ms.append((time.perf_counter() - start) * 1000)
+            cers.append(character_error_rate(expected, text))
+        result = {"preprocess_ms": statistics.median(preprocess_ms),
+                  "steps_ms": {step: ms / len(corpus) for step, ms in step_ms.items()}}
+        if engine is not None:
+            result.update(ocr_ms=statistics.median(ocr_ms), cer=statistics.mean(cers), worst_cer=max(cers))
+        results[preset] = result
+    return results
+
+def recommend(results, max_cer):
+    eligible = [(r["preprocess_ms"] + r["ocr_ms"], preset) for preset, r in results.items() if r["cer"] <= max_cer]
+    return min(eligible)[1] if eligible else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the OCR preprocessing presets.")
+    parser.add_argument("--presets", nargs="+", default=list(ocr_preprocess.PRESETS), choices=tuple(ocr_preprocess.PRESETS))
+    parser.add_argument("--engine", choices=("auto",) + ocr_engines.ENGINES, help="OCR engine (default from config).")
+    parser.add_argument("--max-cer", type=float, default=0.05, help="Accuracy bar: highest acceptable mean CER.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    parser.add_argument("--apply", action="store_true", help="Save the recommended preset as ocr.preprocess.")
+    args = parser.parse_args()
+
+    try:
+        engine = ocr_engines.get_engine(args.engine)
+        engine.image_to_string(Image.new("L", (32, 32), 255)) # Fails early if Tesseract itself is missing
+    except ocr_engines.OcrError as e:
+        print(f"No usable OCR engine ({e}); measuring preprocessing only.")
+        engine = None
+    corpus = build_corpus()
+    print(f"{len(corpus)} images, engine: {engine.name if engine else 'none'}")
+    results = run(corpus, args.presets, engine)
+
+    print(f"{'preset':<12}{'preprocess':>12}{'ocr':>10}{'CER':>8}{'worst':>8}")
+    for preset, r in results.items():
+        if engine is None:
+            print(f"{preset:<12}{r['preprocess_ms']:>10.1f}ms")
+        else:
+            print(f"{preset:<12}{r['preprocess_ms']:>10.1f}ms{r['ocr_ms']:>8.0f}ms{r['cer']:>8.3f}{r['worst_cer']:>8.3f}")
+    best = recommend(results, args.max_cer) if engine is not None else None
+    if engine is not None:
+        print(f"Recommended preset (fastest with CER <= {args.max_cer}): {best or 'none meets the bar'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"engine": engine.name if engine else None, "images": len(corpus), "max_cer": args.max_cer,
+                       "recommended": best, "presets": results}, f, indent=2)
+    if args.apply and best:
+        config = config_manager.load_config()
+        config["ocr"]["preprocess"] = best
+        config_manager.save_config(config)
+        print(f"Saved ocr.preprocess = {best!r}")
+    sys.exit(1 if engine is not None and best is None else 0)
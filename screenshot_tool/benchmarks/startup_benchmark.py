@@ -0,0 +1,196 @@
+"""
+Startup-time benchmark for the Screenshot Tool GUI.
+
+Measures, each in a fresh interpreter:
+  - the import time of every module in `src`,
+  - time-to-first-window: from process spawn until `MainApplication` has been
+    mapped on screen,
+  - which heavy third-party modules (cv2, numpy, ...) are loaded by the time the
+    main window is up. None of them should be; they are imported lazily when the
+    corresponding feature is first used.
+
+Exits with a non-zero status if a heavy module is loaded at startup or a time
+budget is exceeded, so it can be run in CI:
+
+    cd screenshot_tool
+    python benchmarks/startup_benchmark.py --json ../bench_output.txt
+
+On Linux CI runners without a display, run it under `xvfb-run -a`. When no display
+is available the time-to-first-window measurement is skipped (reported as such),
+the import measurements still run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # screenshot_tool/
+
+MODULES = [
+    "i18n",
+    "config_manager",
+    "editor",
+    "main",
+    "ocr",
+    "recorder",
+    "scrolling_capture",
+    "settings_window",
+    "gui",
+]
+
+# Modules that must not be imported just to show the main window.
+HEAVY_MODULES = ["cv2", "numpy", "pyautogui", "pytesseract", "mss"]
+
+DEFAULT_BUDGET_GUI_IMPORT_MS = 500.0
+DEFAULT_BUDGET_FIRST_WINDOW_MS = 2500.0
+
+_IMPORT_PROBE = """
+import json, sys, time, importlib
+t0 = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = (time.perf_counter() - t0) * 1000.0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed, "heavy": heavy}}))
+"""
+
+_WINDOW_PROBE = """
+import json, sys, time
+try:
+    from src.gui import MainApplication
+    app = MainApplication()
+except Exception as e: # Typically tkinter.TclError: no display
+    print(json.dumps({{"error": str(e)}}))
+    sys.exit(0)
+app.update()
+app.wait_visibility()
+mapped_at = time.time()
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"mapped_at": mapped_at, "heavy": heavy}}))
+sys.stdout.flush()
+app.destroy()
+"""
+
+
+def _run_probe(code):
+    """Runs a probe snippet in a fresh interpreter rooted at the project and returns its JSON output."""
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        timeout=120,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"probe exited with status {proc.returncode}")
+    # Modules may print while importing; the probe result is always the last line.
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_module_imports(repeat=3):
+    """
+    Measures the import time of each module in `src` in a fresh interpreter.
+
+    Returns:
+        dict: module name -> {"ms": median import time, "heavy": heavy modules it pulled in},
+              or {"error": message} if the module failed to import.
+    """
+    results = {}
+    for module in MODULES:
+        timings = []
+        heavy = []
+        try:
+            for _ in range(repeat):
+                out = _run_probe(_IMPORT_PROBE.format(module=f"src.{module}", heavy=HEAVY_MODULES))
+                timings.append(out["ms"])
+                heavy = out["heavy"]
+            results[module] = {"ms": statistics.median(timings), "heavy": heavy}
+        except Exception as e:
+            results[module] = {"error": str(e).splitlines()[-1]}
+    return results
+
+
+def measure_first_window(repeat=3):
+    """
+    Measures the wall time from spawning a new interpreter until the main window is mapped.
+
+    Returns:
+        dict: {"ms": median time-to-first-window, "heavy": heavy modules loaded at that point},
+              or {"skipped": reason} if no window could be created (e.g. no display).
+    """
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        spawned_at = time.time()
+        out = _run_probe(_WINDOW_PROBE.format(heavy=HEAVY_MODULES))
+        if "error" in out:
+            return {"skipped": out["error"]}
+        timings.append((out["mapped_at"] - spawned_at) * 1000.0)
+        heavy = out["heavy"]
+    return {"ms": statistics.median(timings), "heavy": heavy}
+
+
+def check_budgets(imports, first_window, budget_gui_import_ms, budget_first_window_ms):
+    """Returns a list of human-readable budget violations (empty if everything is within budget)."""
+    failures = []
+    gui = imports.get("gui", {})
+    if "error" in gui:
+        failures.append(f"src.gui failed to import: {gui['error']}")
+    else:
+        if gui["heavy"]:
+            failures.append(f"Importing src.gui loads heavy modules: {', '.join(gui['heavy'])}")
+        if gui["ms"] > budget_gui_import_ms:
+            failures.append(f"src.gui import took {gui['ms']:.1f} ms (budget {budget_gui_import_ms:.0f} ms)")
+
+    if "skipped" not in first_window:
+        if first_window["heavy"]:
+            failures.append(f"Heavy modules loaded before the first window: {', '.join(first_window['heavy'])}")
+        if first_window["ms"] > budget_first_window_ms:
+            failures.append(f"Time to first window was {first_window['ms']:.1f} ms (budget {budget_first_window_ms:.0f} ms)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure GUI startup time and per-module import time.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the median is reported.")
+    parser.add_argument("--budget-gui-import-ms", type=float, default=DEFAULT_BUDGET_GUI_IMPORT_MS)
+    parser.add_argument("--budget-first-window-ms", type=float, default=DEFAULT_BUDGET_FIRST_WINDOW_MS)
+    parser.add_argument("--json", dest="json_path", help="Also write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    imports = measure_module_imports(repeat=args.repeat)
+    first_window = measure_first_window(repeat=args.repeat)
+
+    print("Module import times (fresh interpreter, median):")
+    for module, result in imports.items():
+        if "error" in result:
+            print(f"  src.{module:<20} ERROR: {result['error']}")
+        else:
+            heavy = f"  [loads: {', '.join(result['heavy'])}]" if result["heavy"] else ""
+            print(f"  src.{module:<20} {result['ms']:8.1f} ms{heavy}")
+
+    if "skipped" in first_window:
+        print(f"Time to first window: skipped ({first_window['skipped']})")
+    else:
+        print(f"Time to first window: {first_window['ms']:.1f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"imports": imports, "first_window": first_window}, f, indent=4)
+
+    failures = check_budgets(imports, first_window, args.budget_gui_import_ms, args.budget_first_window_ms)
+    if failures:
+        print("\nStartup budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\nStartup within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Vector annotations drawn over a screenshot.
+
+Rectangles, ellipses, lines, arrows, text and pen strokes are kept as Annotation objects in an
+AnnotationLayer instead of being painted into the image. The editor shows them as canvas items,
+so adding or moving one does not touch any pixels; they are rasterized onto the image only when
+it is saved, copied or exported (AnnotationLayer.render_onto).
+
+A layer can be written to a JSON sidecar file next to the image and applied again later, e.g.
+to stamp the same callouts onto a series of screenshots:
+    python -m src.annotations callouts.json shot1.png shot2.png --output-dir annotated/
+"""
+
+import argparse
+import json
+import math
+import os
+
+from PIL import Image, ImageDraw
+
+from . import fonts
+
+KINDS = ("rectangle", "ellipse", "line", "arrow", "text", "pen")
+SIDECAR_SUFFIX = ".annotations.json"
+FORMAT_VERSION = 1
+
+def load_font(family, size):
+    """Returns the (cached) font for family and size; see fonts.get_font."""
+    return fonts.get_font(family, size)
+
+def arrowhead_points(x1, y1, x2, y2, width):
+    """Returns the three corners of the arrowhead for a line from (x1, y1) to (x2, y2)."""
+    angle = math.atan2(y2 - y1, x2 - x1)
+    arrow_length = 8 + width * 2.5
+    arrow_degrees = 0.4 # Radians, approx 22.5 degrees for each wing
+    return [(x2, y2),
+            (x2 - arrow_length * math.cos(angle - arrow_degrees), y2 - arrow_length * math.sin(angle - arrow_degrees)),
+            (x2 - arrow_length * math.cos(angle + arrow_degrees), y2 - arrow_length * math.sin(angle + arrow_degrees))]
+
+
+class Annotation:
+    def __init__(self, kind, points, color="red", width=3, text=None, font_family="Arial", font_size=16):
+        """
+        Args:
+            kind (str): One of KINDS.
+            points (list): (x, y) image coordinates. Two points (start, end) for shapes, lines and
+                           arrows, one (top-left) for text, any number for pen strokes.
+            color (str): Tk/Pillow color name or "#rrggbb".
+            width (int): Line width in image pixels.
+            text (str, optional): The text of a "text" annotation.
+            font_family (str), font_size (int): Font of a "text" annotation.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown annotation kind {kind!r}; expected one of {KINDS}")
+        self.kind = kind
+        self.points = [(float(x), float(y)) for x, y in points]
+        self.color = color
+        self.width = int(width)
+        self.text = text
+        self.font_family = font_family
+        self.font_size = int(font_size)
+
+    def copy(self):
+        return Annotation.from_dict(self.to_dict())
+
+    def to_dict(self):
+        data = {"kind": self.kind, "points": [[x, y] for x, y in self.points],
+                "color": self.color, "width": self.width}
+        if self.kind == "text":
+            data.update(text=self.text, font_family=self.font_family, font_size=self.font_size)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["kind"], data["points"], color=data.get("color", "red"), width=data.get("width", 3),
+                   text=data.get("text"), font_family=data.get("font_family", "Arial"),
+                   font_size=data.get("font_size", 16))
+
+    def translate(self, dx, dy):
+        self.points = [(x + dx, y + dy) for x, y in self.points]
+
+    def bbox(self):
+        """Returns the (x1, y1, x2, y2) image area the annotation covers when rasterized."""
+        if self.kind == "text":
+            draw = ImageDraw.Draw(Image.new("L", (1, 1)))
+            return draw.textbbox(self.points[0], self.text or "", font=load_font(self.font_family, self.font_size))
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        pad = self.width / 2.0 + 1
+        if self.kind == "arrow":
+            pad += 8 + self.width * 2.5 # The arrowhead reaches past the end point
+        return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+    def contains(self, x, y, tolerance=4):
+        """True if (x, y) is on or near the annotation (bounding-box test)."""
+        x1, y1, x2, y2 = self.bbox()
+        return x1 - tolerance <= x <= x2 + tolerance and y1 - tolerance <= y <= y2 + tolerance
+
+    def draw(self, draw):
+        """Rasterizes the annotation with a PIL.ImageDraw.Draw."""
+        if self.kind == "text":
+            draw.text(self.points[0], self.text or "", font=load_font(self.font_family, self.font_size), fill=self.color)
+        elif self.kind == "pen":
+            if len(self.points) == 1:
+                x, y = self.points[0]
+                r = self.width / 2.0
+                draw.ellipse([x - r, y - r, x + r, y + r], fill=self.color)
+            else:
+                draw.line(self.points, fill=self.color, width=self.width, joint="curve")
+        else:
+            (sx, sy), (ex, ey) = self.points[0], self.points[-1]
+            if self.kind == "rectangle":
+                draw.rectangle([min(sx, ex), min(sy, ey), max(sx, ex), max(sy, ey)], outline=self.color, width=self.width)
+            elif self.kind == "ellipse":
+                draw.ellipse([min(sx, ex), min(sy, ey), max(sx, ex), max(sy, ey)], outline=self.color, width=self.width)
+            else: # line, arrow
+                draw.line([sx, sy, ex, ey], fill=self.color, width=self.width)
+                if self.kind == "arrow":
+                    draw.polygon(arrowhead_points(sx, sy, ex, ey, self.width), fill=self.color)
+
+
+class AnnotationLayer:
+    """Ordered list of annotations; later ones are drawn on top."""
+
+    def __init__(self, annotations=None):
+        self.annotations = list(annotations or [])
+
+    def __len__(self):
+        return len(self.annotations)
+
+    def __iter__(self):
+        return iter(self.annotations)
+
+    def add(self, annotation):
+        self.annotations.append(annotation)
+        return len(self.annotations) - 1
+
+    def insert(self, index, annotation):
+        self.annotations.insert(index, annotation)
+
+    def remove_at(self, index):
+        return self.annotations.pop(index)
+
+    def replace(self, index, annotation):
+        self.annotations[index] = annotation
+
+    def index_at(self, x, y, tolerance=4):
+        """Returns the index of the topmost annotation at image position (x, y), or None."""
+        for index in range(len(self.annotations) - 1, -1, -1):
+            if self.annotations[index].contains(x, y, tolerance):
+                return index
+        return None
+
+    def translate(self, dx, dy):
+        for annotation in self.annotations:
+            annotation.translate(dx, dy)
+
+    def render_onto(self, image):
+        """Returns a copy of image with all annotations rasterized onto it. image is not modified."""
+        result = image.copy()
+        if self.annotations:
+            draw = ImageDraw.Draw(result)
+            for annotation in self.annotations:
+                annotation.draw(draw)
+        return result
+
+    def to_dict(self, image_size=None):
+        data = {"version": FORMAT_VERSION, "annotations": [a.to_dict() for a in self.annotations]}
+        if image_size is not None:
+            data["image_size"] = list(image_size)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(Annotation.from_dict(item) for item in data.get("annotations", []))
+
+    def save(self, path, image_size=None):
+        """Writes the layer as JSON. image_size records the size of the image it was drawn on."""
+        partial_path = path + ".part"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(image_size), f, indent=2)
+        os.replace(partial_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def sidecar_path(image_path):
+    """Returns the path of the annotation sidecar file for image_path."""
+    return image_path + SIDECAR_SUFFIX
+
+def apply_annotations(layer, image_path, output_path=None):
+    """
+    Rasterizes layer onto the image at image_path and saves the result.
+
+    Args:
+        layer (AnnotationLayer): The annotations to apply.
+        image_path (str): Source image.
+        output_path (str, optional): Destination. Defaults to "<name>_annotated<ext>" next to the source.
+
+    Returns:
+        str: The written path, or None on failure.
+    """
+    from . import image_io
+    try:
+        with Image.open(image_path) as source:
+            image = source.convert("RGBA")
+        if output_path is None:
+            root, ext = os.path.splitext(image_path)
+            output_path = f"{root}_annotated{ext}"
+        return image_io.save_image(layer.render_onto(image), output_path)
+    except Exception as e:
+        print(f"Error applying annotations to {image_path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply a saved annotation layer to one or more images.")
+    parser.add_argument("annotations", help="Annotation JSON file (e.g. an image's .annotations.json sidecar).")
+    parser.add_argument("images", nargs="+", help="Images to annotate.")
+    parser.add_argument("--output-dir", help="Write results here instead of next to each image.")
+    args = parser.parse_args()
+
+    layer = AnnotationLayer.load(args.annotations)
+    for path in args.images:
+        output = None
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            output = os.path.join(args.output_dir, os.path.basename(path))
+        written = apply_annotations(layer, path, output)
+        if written:
+            print(f"{path} -> {written}")
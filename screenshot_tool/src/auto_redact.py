@@ -0,0 +1,183 @@
+"""
+Automatic redaction of sensitive text (emails, API tokens, IP addresses) found by OCR.
+
+The image is OCR'd once with word bounding boxes (ocr.extract_words). Each recognized line is
+matched against a set of regular expressions, and the boxes of the words a match touches are
+pixelated or blurred with the same code the editor uses (redaction.redact_regions). A whole word is
+covered even if only part of it matches (e.g. "user=alice@example.com"), since OCR does not locate
+individual characters.
+
+Built-in patterns are listed in PATTERNS; which ones run, plus any custom patterns, is configured in
+the "auto_redact" config section. Headless use over whole directories, with one worker process per
+core (from the screenshot_tool directory):
+    python -m src.auto_redact ~/Pictures/Screenshots --output-dir shared/ --patterns email,ipv4
+"""
+
+import argparse
+import os
+import re
+
+from . import config_manager
+from . import redaction
+
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_HEX4 = r"[0-9A-Fa-f]{1,4}"
+
+PATTERNS = {
+    "email": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}",
+    "ipv4": rf"(?<![\d.]){_OCTET}(?:\.{_OCTET}){{3}}(?![\d.]*\d)",
+    # Full form, or compressed with "::" (so times like 12:30:45 do not match)
+    "ipv6": rf"(?<![\w:])(?:(?:{_HEX4}:){{7}}{_HEX4}|(?:{_HEX4}:){{1,6}}:(?:{_HEX4}(?::{_HEX4})*)?)(?![\w:])",
+    "token": r"(?:eyJ[\w-]{8,}\.[\w-]{8,}\.[\w-]{8,}" # JWT
+             r"|\b(?:gh[pousr]_|github_pat_|xox[abprs]-|sk-|sk_live_|rk_live_|AKIA|AIza)[A-Za-z0-9_-]{12,}" # Known prefixes
+             r"|(?<![\w+/=-])(?=[\w+/=-]*\d)(?=[\w+/=-]*[A-Za-z])[\w+/=-]{32,})", # Long mixed letters and digits
+}
+DEFAULT_PATTERNS = ("email", "ipv4", "ipv6", "token")
+
+def compile_patterns(names=None, custom=None):
+    """
+    Returns {name: compiled regex} for the patterns to look for.
+
+    Args:
+        names (list, optional): Names from PATTERNS. Defaults to auto_redact.patterns in the config.
+        custom (dict, optional): Extra {name: regex}. Defaults to auto_redact.custom_patterns.
+
+    Raises:
+        ValueError: For an unknown pattern name or an invalid custom regex.
+    """
+    if names is None:
+        names = config_manager.get_setting("auto_redact", "patterns", list(DEFAULT_PATTERNS))
+    if custom is None:
+        custom = config_manager.get_setting("auto_redact", "custom_patterns", {})
+    compiled = {}
+    for name in names:
+        if name not in PATTERNS:
+            raise ValueError(f"Unknown pattern {name!r}; built-in patterns are {sorted(PATTERNS)}")
+        compiled[name] = re.compile(PATTERNS[name])
+    for name, expression in (custom or {}).items():
+        try:
+            compiled[name] = re.compile(expression)
+        except re.error as e:
+            raise ValueError(f"Invalid regular expression for pattern {name!r}: {e}")
+    return compiled
+
+def find_matches(words, patterns, padding=2):
+    """
+    Matches OCR'd words against patterns, line by line.
+
+    Args:
+        words (list): Word dicts from ocr.extract_words.
+        patterns (dict): {name: compiled regex}, see compile_patterns.
+        padding (int): Pixels added around each matched box.
+
+    Returns:
+        list: {"pattern", "text", "box": (x1, y1, x2, y2)} per match, in reading order.
+    """
+    lines = {}
+    for word in words:
+        lines.setdefault(word["line"], []).append(word)
+
+    matches = []
+    for line_words in lines.values():
+        # Join the line with single spaces, remembering where each word starts and ends
+        spans, parts, offset = [], [], 0
+        for word in line_words:
+            spans.append((offset, offset + len(word["text"])))
+            parts.append(word["text"])
+            offset += len(word["text"]) + 1
+        line_text = " ".join(parts)
+        for name, regex in patterns.items():
+            for match in regex.finditer(line_text):
+                touched = [w["box"] for w, (start, end) in zip(line_words, spans)
+                           if start < match.end() and end > match.start()]
+                if not touched:
+                    continue
+                matches.append({"pattern": name, "text": match.group(0),
+                                "box": (min(b[0] for b in touched) - padding, min(b[1] for b in touched) - padding,
+                                        max(b[2] for b in touched) + padding, max(b[3] for b in touched) + padding)})
+    return matches
+
+def find_sensitive_regions(image, patterns=None, lang=None, padding=None):
+    """
+    OCRs image and returns the matches of patterns (see find_matches), or None if OCR failed.
+
+    Args:
+        image (PIL.Image.Image or str): Image or image path.
+        patterns (dict, optional): Compiled patterns. Defaults to compile_patterns().
+        lang (str, optional): OCR language. Defaults to auto_redact.lang.
+        padding (int, optional): Defaults to auto_redact.padding.
+    """
+    from . import ocr
+    if patterns is None:
+        patterns = compile_patterns()
+    if lang is None:
+        lang = config_manager.get_setting("auto_redact", "lang", "eng")
+    if padding is None:
+        padding = int(config_manager.get_setting("auto_redact", "padding", 2))
+    # Full pass: text the region detector missed would stay unredacted
+    words = ocr.extract_words(image, lang=lang, detect_regions="off")
+    if words is None:
+        return None
+    return find_matches(words, patterns, padding)
+
+def auto_redact(image, patterns=None, method=None, strength=None, lang=None, padding=None):
+    """
+    Finds sensitive text in image and pixelates or blurs it in place.
+
+    Args:
+        image (PIL.Image.Image): The image to modify.
+        patterns (dict, optional): Compiled patterns. Defaults to compile_patterns().
+        method (str, optional): "mosaic", "blur" or "gaussian". Defaults to auto_redact.method.
+        strength (int, optional): See redaction.redact_regions.
+        lang (str, optional), padding (int, optional): See find_sensitive_regions.
+
+    Returns:
+        list: The matches that were redacted, or None if OCR failed (the image is then unchanged).
+    """
+    matches = find_sensitive_regions(image, patterns, lang, padding)
+    if matches is None:
+        return None
+    if method is None:
+        method = config_manager.get_setting("auto_redact", "method", "mosaic")
+    redaction.redact_regions(image, [m["box"] for m in matches], method, strength)
+    return matches
+
+
+if __name__ == "__main__":
+    from . import image_ops
+
+    parser = argparse.ArgumentParser(description="Pixelate emails, tokens and IP addresses found by OCR.")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories (searched recursively).")
+    parser.add_argument("--output-dir", required=True, help="Where redacted copies are written.")
+    parser.add_argument("--patterns", help=f"Comma-separated built-in patterns ({', '.join(sorted(PATTERNS))}).")
+    parser.add_argument("--pattern", action="append", default=[], metavar="NAME=REGEX", help="Extra pattern (repeatable).")
+    parser.add_argument("--method", choices=redaction.METHODS, help="Redaction method (default from config).")
+    parser.add_argument("--strength", type=int, help="Mosaic block size or blur radius in pixels.")
+    parser.add_argument("--lang", help="OCR language, e.g. eng or eng+deu (default from config).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of CPUs).")
+    args = parser.parse_args()
+
+    operation = {"op": "auto_redact"}
+    if args.patterns:
+        operation["patterns"] = [name.strip() for name in args.patterns.split(",") if name.strip()]
+    if args.pattern:
+        operation["custom_patterns"] = dict(item.split("=", 1) for item in args.pattern if "=" in item)
+    for key in ("method", "strength", "lang"):
+        if getattr(args, key) is not None:
+            operation[key] = getattr(args, key)
+    try: # Fail on bad patterns before starting the workers
+        compile_patterns(operation.get("patterns"), operation.get("custom_patterns"))
+    except ValueError as e:
+        parser.error(str(e))
+
+    def batch_jobs():
+        for input_arg in args.inputs:
+            base = input_arg if os.path.isdir(input_arg) else None
+            for image_path in image_ops.collect_images([input_arg]):
+                yield image_path, image_ops.output_path_for(image_path, args.output_dir, base_dir=base)
+
+    def report(input_path, output_path, error, seconds):
+        print(f"FAILED {input_path}: {error}" if error else f"{input_path} -> {output_path} ({seconds:.2f}s)")
+
+    result = image_ops.run_batch(batch_jobs(), [operation], workers=args.workers, on_result=report)
+    print(f"Redacted {result['processed']} image(s), {result['failed']} failed, in {result['seconds']:.1f}s.")
@@ -0,0 +1,296 @@
+"""
+Crash recovery for the image editor: an append-only journal of every edit, written in the background.
+
+When an editor window makes its first edit, a journal file is created in AUTOSAVE_DIR holding the
+image the editor started from. After that, each record/undo/redo of the edit history (see
+edit_history.EditHistory.add_listener) is appended as the primitive changes it made: compressed
+pixel patches, whole-image replacements (crop), annotation changes and layer moves. Patches are
+the ones the history already compressed, so journaling costs no extra encoding on the Tk thread;
+a writer thread does the file I/O. After a successful save the journal is rewritten to start from
+the saved state, and closing the window deletes it.
+
+A journal that is still on disk when no process owns it anymore was left by a crash. The main
+window offers to reopen such journals on launch (list_recoverable, read_journal).
+
+File format: a sequence of records, each a header (JSON length, payload length as big-endian
+uint32), a UTF-8 JSON object and an optional binary payload (zlib-compressed raw pixels). A record
+cut short by a crash is ignored on recovery.
+"""
+
+import itertools
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import appdirs
+from PIL import Image
+
+from . import config_manager
+from .annotations import Annotation, AnnotationLayer
+
+AUTOSAVE_DIR = os.path.join(appdirs.user_data_dir(config_manager.APP_NAME, config_manager.APP_AUTHOR), "autosave")
+JOURNAL_SUFFIX = ".journal"
+FORMAT_VERSION = 1
+COMPRESSION_LEVEL = 1
+
+_HEADER = struct.Struct(">II") # JSON length, payload length
+_journal_numbers = itertools.count(1)
+
+def _encode_record(header, payload=b""):
+    data = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(data), len(payload)) + data + payload
+
+def _annotation_dict(annotation):
+    return annotation.to_dict() if annotation is not None else None
+
+def _step_record(step):
+    """Encodes one primitive change from EditHistory (see edit_history.PatchDelta.steps)."""
+    kind = step[0]
+    if kind == "patch":
+        _, box, pixels = step
+        return _encode_record({"type": "patch", "box": list(box), "mode": pixels.mode, "size": list(pixels.size)}, pixels.data)
+    if kind == "replace":
+        pixels = step[1]
+        return _encode_record({"type": "replace", "mode": pixels.mode, "size": list(pixels.size)}, pixels.data)
+    if kind == "annotation":
+        _, index, old, new = step
+        return _encode_record({"type": "annotation", "index": index, "old": _annotation_dict(old), "new": _annotation_dict(new)})
+    if kind == "translate":
+        return _encode_record({"type": "translate", "dx": step[1], "dy": step[2]})
+    raise ValueError(f"Unknown history step {kind!r}")
+
+def _start_record(image, annotation_dicts, source_path):
+    header = {"type": "start", "version": FORMAT_VERSION, "source_path": source_path, "created": time.time(),
+              "mode": image.mode, "size": list(image.size), "annotations": annotation_dicts}
+    return _encode_record(header, zlib.compress(image.tobytes(), COMPRESSION_LEVEL))
+
+
+class AutosaveJournal:
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str, optional): Where the journal file is created. Defaults to AUTOSAVE_DIR.
+        """
+        self.directory = directory or AUTOSAVE_DIR
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{int(time.time() * 1000)}-{next(_journal_numbers)}{JOURNAL_SUFFIX}")
+        self._queue = queue.Queue()
+        self._thread = None
+        self.records_written = 0
+        self.bytes_written = 0
+        self.last_error = None
+
+    def start(self, image, layer, source_path=None):
+        """
+        Starts the writer thread and (re)creates the journal with image and layer as its starting state.
+
+        Args:
+            image (PIL.Image.Image): Starting image. It must not be modified afterwards (pass a copy).
+            layer (annotations.AnnotationLayer): Starting annotations (copied here, on the caller's thread).
+            source_path (str, optional): File the image came from, shown when offering recovery.
+        """
+        self._queue.put(("start", image, [a.to_dict() for a in layer], source_path))
+        if not self.is_running():
+            self._thread = threading.Thread(target=self._run, name="autosave-journal", daemon=True)
+            self._thread.start()
+
+    def rebase(self, image, layer, source_path=None):
+        """Rewrites the journal to start from image and layer, e.g. after they were saved to source_path."""
+        self.start(image, layer, source_path)
+
+    def append(self, steps):
+        """Queues the steps of one history change (see EditHistory.add_listener). Cheap; safe from the Tk thread."""
+        if self.is_running():
+            self._queue.put(("steps", steps))
+
+    def stop(self, discard=True):
+        """Writes out what is queued and stops the writer thread. discard=True deletes the journal (clean close)."""
+        if self._thread is None:
+            return
+        self._queue.put(("stop", discard))
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self):
+        return {"path": self.path, "running": self.is_running(), "records": self.records_written,
+                "bytes": self.bytes_written, "pending": self._queue.qsize(), "last_error": self.last_error}
+
+    def _run(self):
+        f = None
+        try:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item[0] == "start":
+                        if f is not None:
+                            f.close()
+                        f = self._write_start(*item[1:])
+                    elif item[0] == "steps" and f is not None:
+                        for step in item[1]:
+                            record = _step_record(step)
+                            f.write(record)
+                            self.records_written += 1
+                            self.bytes_written += len(record)
+                    elif item[0] == "stop":
+                        if f is not None:
+                            f.close()
+                            f = None
+                        if item[1]:
+                            try:
+                                os.remove(self.path)
+                            except FileNotFoundError:
+                                pass
+                        return
+                    if f is not None and self._queue.empty():
+                        # Batch bursts of edits into one flush; fsync so a crash of the OS keeps them too
+                        f.flush()
+                        os.fsync(f.fileno())
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"Autosave error ({self.path}): {e}")
+        finally:
+            if f is not None:
+                f.close()
+
+    def _write_start(self, image, annotation_dicts, source_path):
+        """Writes the start record to a new file that atomically replaces the journal; returns it opened for appending."""
+        os.makedirs(self.directory, exist_ok=True)
+        record = _start_record(image, annotation_dicts, source_path)
+        partial_path = self.path + ".part"
+        with open(partial_path, "wb") as part:
+            part.write(record)
+            part.flush()
+            os.fsync(part.fileno())
+        os.replace(partial_path, self.path)
+        self.records_written, self.bytes_written = 1, len(record)
+        return open(self.path, "ab")
+
+
+def _read_records(f):
+    """Yields (header, payload) for each complete record; stops at a truncated or corrupt one."""
+    while True:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            return
+        json_length, payload_length = _HEADER.unpack(raw)
+        data = f.read(json_length)
+        payload = f.read(payload_length)
+        if len(data) < json_length or len(payload) < payload_length:
+            return
+        try:
+            yield json.loads(data.decode("utf-8")), payload
+        except ValueError:
+            return
+
+def _pixels_from(header, payload):
+    return Image.frombytes(header["mode"], tuple(header["size"]), zlib.decompress(payload))
+
+def read_journal(path):
+    """
+    Replays a journal.
+
+    Returns:
+        tuple: (image, annotations.AnnotationLayer, source path or None) of the last journaled state,
+               or None if the file has no valid start record.
+    """
+    image, layer, source_path = None, None, None
+    try:
+        with open(path, "rb") as f:
+            for header, payload in _read_records(f):
+                kind = header.get("type")
+                if kind == "start":
+                    image = _pixels_from(header, payload)
+                    layer = AnnotationLayer(Annotation.from_dict(a) for a in header.get("annotations", []))
+                    source_path = header.get("source_path")
+                elif image is None:
+                    break
+                elif kind == "patch":
+                    image.paste(_pixels_from(header, payload), tuple(header["box"][:2]))
+                elif kind == "replace":
+                    image = _pixels_from(header, payload)
+                elif kind == "annotation":
+                    old, new = header["old"], header["new"]
+                    if old is None:
+                        layer.insert(header["index"], Annotation.from_dict(new))
+                    elif new is None:
+                        layer.remove_at(header["index"])
+                    else:
+                        layer.replace(header["index"], Annotation.from_dict(new))
+                elif kind == "translate":
+                    layer.translate(header["dx"], header["dy"])
+    except (OSError, zlib.error, ValueError, KeyError, IndexError) as e:
+        print(f"Could not fully read autosave journal {path}: {e}")
+    if image is None:
+        return None
+    return image, layer, source_path
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    if sys.platform.startswith("win"):
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError: # Exists, owned by someone else
+        return True
+    return True
+
+def list_recoverable(directory=None):
+    """
+    Returns the journals left behind by editor sessions that did not close cleanly, newest first.
+
+    Returns:
+        list: {"path", "modified" (timestamp), "size" (bytes)} per journal. Journals of running
+              processes (including this one) are not listed.
+    """
+    directory = directory or AUTOSAVE_DIR
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    journals = []
+    for name in names:
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        try:
+            pid = int(name.split("-", 1)[0])
+        except ValueError:
+            continue
+        if _pid_alive(pid):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        journals.append({"path": path, "modified": stat.st_mtime, "size": stat.st_size})
+    return sorted(journals, key=lambda j: j["modified"], reverse=True)
+
+def discard(path):
+    """Deletes a journal (after it was recovered or the user declined recovery)."""
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Could not delete autosave journal {path}: {e}")
+
+
+if __name__ == "__main__":
+    recoverable = list_recoverable()
+    print(f"Autosave directory: {AUTOSAVE_DIR}")
+    print(f"{len(recoverable)} recoverable journal(s):")
+    for journal in recoverable:
+        print(f"  {journal['path']} ({journal['size'] / 1024:.0f} KB, {time.ctime(journal['modified'])})")
@@ -0,0 +1,196 @@
+"""
+Batch OCR over directories of screenshots, streaming results to a JSONL file.
+
+Images are recognized in a pool of worker processes (one per core by default). Each worker keeps
+its OCR engine loaded between images (see ocr_engines), and at most one image per worker is in
+flight: the main process only passes paths, so memory use does not grow with the number of files.
+
+Every finished image is appended to the output file as one JSON line:
+    {"path": ..., "mtime": ..., "lang": "eng", "engine": "tesserocr", "text": "...",
+     "timings": {"load_ms": 3.1, "preprocess_ms": 6.2, "ocr_ms": 180.4, "total_ms": 189.7}, "cached": false}
+"load_ms" covers decoding and hashing the image for the OCR cache (see ocr_cache), "preprocess_ms" the
+ocr.preprocess preset (see ocr_preprocess, --preprocess) and "detect_ms", if present, the text region
+detection (see text_regions); images go through ocr.recognize like any other OCR, so tall captures
+are recognized in strips. "cached" is true when the text came from the cache, e.g. for a duplicate
+screenshot. Failed images get an "error" field instead of "text". With --layout, records also get a "layout" field: the words, lines and
+blocks with boxes and confidences in the compact columnar form of ocr_result.OcrResult.to_dict(),
+from the same single OCR pass. The output doubles as the checkpoint: when a run is restarted, images
+that already have a successful line for the same language and modification time are skipped, and
+a line cut short by a crash is dropped.
+
+Usage (from the screenshot_tool directory):
+    python -m src.batch_ocr ~/Pictures/Screenshots -o ocr.jsonl --lang eng+chi_sim
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+
+from . import image_ops
+from . import ocr
+from . import ocr_engines
+from . import ocr_preprocess
+
+def _init_worker():
+    # One image per worker process; Tesseract's (OpenMP) and OpenCV's own threads would oversubscribe the cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+
+def ocr_file(path, lang="eng", engine=None, use_cache=True, preprocess=None, layout=False, workers=None):
+    """
+    OCRs one file through ocr.recognize (preprocessing preset, strips for tall images, text regions
+    and the OCR result cache, as for any other OCR in the app). layout=True adds the words, lines and
+    blocks (see ocr_result) to the record.
+
+    Args:
+        workers (int, optional): Parallel strips or regions of the image; 1 in worker processes.
+
+    Returns:
+        dict: The JSONL record for path (see the module docstring).
+    """
+    record = {"path": path, "lang": lang}
+    start = time.perf_counter()
+    timings = {}
+    try:
+        record["mtime"] = os.path.getmtime(path)
+        record["engine"] = ocr_engines.get_engine(engine).name
+        result = ocr.recognize(path, "layout" if layout else "text", lang, engine, use_cache, preprocess,
+                               timings=timings, workers=workers)
+        if layout:
+            record["text"], record["layout"] = result.text, result.to_dict()
+        else:
+            record["text"] = result
+        record["cached"] = timings.pop("cached", False)
+        total = (time.perf_counter() - start) * 1000
+        record["timings"] = {"load_ms": round(total - sum(timings.values()), 1),
+                             "preprocess_ms": round(timings.get("preprocess_ms", 0.0), 1),
+                             "ocr_ms": round(timings.get("ocr_ms", 0.0), 1)}
+        if "detect_ms" in timings:
+            record["timings"]["detect_ms"] = round(timings["detect_ms"], 1)
+        record["timings"]["total_ms"] = round(total, 1)
+    except Exception as e: # Including ocr_engines.OcrError; one bad file must not stop the batch
+        record["error"] = f"{type(e).__name__}: {e}" if not isinstance(e, ocr_engines.OcrError) else str(e)
+        record["timings"] = {"total_ms": round((time.perf_counter() - start) * 1000, 1)}
+    return record
+
+def _ocr_job(job):
+    path, lang, engine, preprocess, layout = job
+    # One image per process already keeps the cores busy; no extra threads for strips or regions
+    return ocr_file(path, lang, engine, preprocess=preprocess, layout=layout, workers=1)
+
+def load_checkpoint(output_path, layout=False):
+    """
+    Reads the results of an earlier run and repairs a line cut short by a crash. With layout=True,
+    records without a "layout" field do not count as done.
+
+    Returns:
+        dict: (absolute path, lang) -> mtime of the images that were recognized successfully.
+    """
+    done = {}
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"): # The last record was being written when the run stopped
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if "error" not in record and "path" in record and (not layout or "layout" in record):
+            done[(os.path.abspath(record["path"]), record.get("lang"))] = record.get("mtime")
+    return done
+
+def run_batch_ocr(paths, output_path, lang="eng", workers=None, engine=None, resume=True, on_result=None, preprocess=None,
+                  layout=False):
+    """
+    OCRs all images in paths (files or directories, searched recursively) into a JSONL file.
+
+    Args:
+        paths (list): Image files and/or directories.
+        output_path (str): JSONL file. Appended to when resuming, otherwise overwritten.
+        lang (str): Tesseract language code(s).
+        workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        engine (str, optional): OCR engine name (see ocr_engines.get_engine).
+        resume (bool): Skip images already recognized in output_path (same lang and mtime).
+        on_result (callable, optional): Called with each record, in completion order.
+        preprocess (str, optional): Preprocessing preset (see ocr_preprocess.PRESETS). Defaults to the
+                                    ocr.preprocess setting.
+        layout (bool): Also store the words, lines and blocks of each image (see ocr_result).
+
+    Returns:
+        dict: {"processed", "failed", "skipped", "seconds", "images_per_second"}
+    """
+    workers = workers or os.cpu_count() or 1
+    preprocess, _ = ocr_preprocess.resolve_preset(preprocess) # Resolved once here, so workers agree
+    done = load_checkpoint(output_path, layout) if resume else {}
+    summary = {"processed": 0, "failed": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    def pending_files():
+        for path in image_ops.collect_images(paths):
+            key = (os.path.abspath(path), lang)
+            if key in done and done[key] == os.path.getmtime(path):
+                summary["skipped"] += 1
+                continue
+            yield path
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+
+        def finish(future):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush() # Each finished image is checkpointed immediately
+            summary["failed" if "error" in record else "processed"] += 1
+            if on_result is not None:
+                on_result(record)
+
+        # Backpressure: never more images submitted than there are workers
+        in_flight = set()
+        for path in pending_files():
+            if len(in_flight) >= workers:
+                finished, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    finish(future)
+            in_flight.add(pool.submit(_ocr_job, (path, lang, engine, preprocess, layout)))
+        for future in concurrent.futures.as_completed(in_flight):
+            finish(future)
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["images_per_second"] = summary["processed"] / summary["seconds"] if summary["seconds"] > 0 else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR directories of screenshots in parallel into a JSONL file.")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories (searched recursively).")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file (also the resume checkpoint).")
+    parser.add_argument("--lang", default="eng", help="Tesseract language code(s), e.g. eng or eng+chi_sim.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of CPUs).")
+    parser.add_argument("--engine", choices=("auto",) + ocr_engines.ENGINES, help="OCR engine (default from config).")
+    parser.add_argument("--preprocess", choices=tuple(ocr_preprocess.PRESETS), help="Preprocessing preset (default from config).")
+    parser.add_argument("--layout", action="store_true", help="Also store word/line/block boxes and confidences.")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping images already in the output.")
+    args = parser.parse_args()
+
+    def report(record):
+        if "error" in record:
+            print(f"FAILED {record['path']}: {record['error']}")
+        else:
+            print(f"{record['path']}: {len(record['text'])} chars in {record['timings']['total_ms']:.0f} ms")
+
+    result = run_batch_ocr(args.inputs, args.output, lang=args.lang, workers=args.workers, engine=args.engine,
+                           resume=not args.no_resume, on_result=report, preprocess=args.preprocess, layout=args.layout)
+    print(f"Recognized {result['processed']} image(s), {result['failed']} failed, {result['skipped']} already done, "
+          f"in {result['seconds']:.1f}s ({result['images_per_second']:.1f} images/s).")
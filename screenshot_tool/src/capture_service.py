@@ -0,0 +1,440 @@
+"""
+Resident background capture service.
+
+Starting a new process (and a new Tk root) for every screenshot costs far more than the capture
+itself. This module runs a long-lived service that keeps the libraries imported, an mss capture
+session open and a hidden Tk root alive, and accepts commands over a Unix domain socket.
+
+Protocol: newline-delimited JSON. Each request is one JSON object with a "cmd" key and optional
+"id"; each response is one JSON object echoing the "id" with "ok": true/false. A client may send
+several requests on one connection without waiting; they are served concurrently and responses
+may arrive out of order (match them by "id").
+
+Commands:
+    ping                               -> {"uptime": seconds, "gui": bool}
+    capture  region?, output?, save?, editor?, interactive?
+                                       -> {"path", "width", "height", "capture_ms", "elapsed_ms"}
+    ocr      path | region, lang?      -> {"text", "elapsed_ms"}
+    record   action: start|stop|status, output?, fps?
+                                       -> {"is_recording", "filename"}
+    shutdown                           -> {}
+
+Regions are {"top", "left", "width", "height"} dicts (or [left, top, width, height] lists).
+
+Usage (from the screenshot_tool directory):
+    python -m src.capture_service serve
+    python -m src.capture_service capture --region 0,0,800,600
+    python -m src.capture_service ocr --path shot.png --lang eng
+    python -m src.capture_service record start
+
+Unix domain sockets are not available on Windows, so the service only runs on Linux/macOS.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+
+from . import config_manager
+
+TK_POLL_MS = 10 # How often the Tk thread picks up work queued by the service
+
+def default_socket_path():
+    """Returns the configured socket path, or a per-user path in the runtime/temp directory."""
+    configured = config_manager.get_setting("service", "socket_path", "")
+    if configured:
+        return configured
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    uid = os.getuid() if hasattr(os, "getuid") else os.getpid()
+    return os.path.join(runtime_dir, f"screenshot_tool-{uid}.sock")
+
+def _parse_region(region):
+    """Normalizes a region given as a dict or [left, top, width, height] into an mss monitor dict."""
+    if region is None:
+        return None
+    if isinstance(region, dict):
+        monitor = {key: int(region[key]) for key in ("top", "left", "width", "height")}
+    else:
+        left, top, width, height = (int(v) for v in region)
+        monitor = {"top": top, "left": left, "width": width, "height": height}
+    if monitor["width"] <= 0 or monitor["height"] <= 0:
+        raise ValueError(f"Invalid region (zero width or height): {monitor}")
+    return monitor
+
+
+class CaptureService:
+    def __init__(self, socket_path=None, with_gui=True, workers=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.with_gui = with_gui
+        self.started_at = None
+
+        # mss instances are bound to the thread that created them, so every grab goes
+        # through a single capture thread which keeps one session open.
+        self._capture_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        self._sct = None
+        # Encoding and OCR release the GIL (Pillow encoders / tesseract subprocess), so they run in parallel.
+        self._work_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers or min(8, (os.cpu_count() or 1) + 2), thread_name_prefix="service-worker")
+
+        self._tk_root = None
+        self._tk_queue = queue.Queue()
+        self._recorder = None
+        self._recorder_lock = threading.Lock()
+
+        self._loop = None
+        self._stop_event = None
+        self._loop_thread = None
+
+        self._commands = {
+            "ping": self._cmd_ping,
+            "capture": self._cmd_capture,
+            "ocr": self._cmd_ocr,
+            "record": self._cmd_record,
+            "shutdown": self._cmd_shutdown,
+        }
+
+    # --- Lifecycle ---
+
+    def run(self):
+        """Runs the service until a shutdown command is received. Blocks the calling (main) thread."""
+        if not hasattr(asyncio, "start_unix_server"):
+            print("Capture service error: Unix domain sockets are not supported on this platform.")
+            return False
+
+        if self.with_gui:
+            try:
+                self._tk_root = tk.Tk()
+                self._tk_root.withdraw()
+            except tk.TclError as e:
+                print(f"No display available ({e}). Running without GUI commands (editor/interactive capture).")
+                self._tk_root = None
+
+        self.started_at = time.time()
+        self._loop_thread = threading.Thread(target=self._run_loop, name="service-loop", daemon=True)
+        self._loop_thread.start()
+        self._work_executor.submit(self._warm_up)
+
+        if self._tk_root is not None:
+            # Tk must stay on the main thread; the asyncio loop hands it work through _tk_queue.
+            self._tk_root.after(TK_POLL_MS, self._drain_tk_queue)
+            self._tk_root.mainloop()
+            self._tk_root.destroy()
+        self._loop_thread.join()
+
+        self._capture_executor.submit(self._close_sct).result()
+        self._capture_executor.shutdown(wait=True)
+        self._work_executor.shutdown(wait=True)
+        with self._recorder_lock:
+            if self._recorder and self._recorder.get_status()["is_recording"]:
+                self._recorder.stop_recording()
+        print("Capture service stopped.")
+        return True
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except Exception as e:
+            print(f"Capture service error: {e}")
+        finally:
+            self._loop.close()
+            if self._tk_root is not None:
+                self._tk_queue.put((self._tk_root.quit, (), {}, None))
+
+    async def _serve(self):
+        self._stop_event = asyncio.Event()
+        if os.path.exists(self.socket_path):
+            # A previous instance that is still alive answers; a stale socket file does not.
+            try:
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                probe.connect(self.socket_path)
+                probe.close()
+                raise RuntimeError(f"Another capture service is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600) # Only the current user may drive captures
+        print(f"Capture service listening on {self.socket_path}")
+        try:
+            await self._stop_event.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _warm_up(self):
+        """Imports the heavy libraries and opens the capture session ahead of the first request."""
+        for module in ("numpy", "cv2", "pytesseract", "mss"):
+            try:
+                __import__(module)
+            except Exception as e:
+                print(f"Warm-up: could not import {module}: {e}")
+        try:
+            from . import editor, ocr, recorder # noqa: F401
+            self._capture_executor.submit(self._ensure_sct).result()
+        except Exception as e:
+            print(f"Warm-up: {e}")
+
+    # --- Thread helpers ---
+
+    def _ensure_sct(self):
+        if self._sct is None:
+            import mss
+            self._sct = mss.mss()
+        return self._sct
+
+    def _close_sct(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+    def _grab(self, region):
+        from .main import grab_image
+        return grab_image(region, sct=self._ensure_sct())
+
+    def _drain_tk_queue(self):
+        while True:
+            try:
+                func, args, kwargs, future = self._tk_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                result = func(*args, **kwargs)
+                if future is not None:
+                    future.set_result(result)
+            except Exception as e:
+                if future is not None:
+                    future.set_exception(e)
+                else:
+                    print(f"Capture service: error in GUI callback: {e}")
+        if self._tk_root is not None and self._tk_root.winfo_exists():
+            self._tk_root.after(TK_POLL_MS, self._drain_tk_queue)
+
+    def _call_in_tk(self, func, *args, **kwargs):
+        """Schedules func on the Tk thread and returns an awaitable for its result."""
+        if self._tk_root is None:
+            raise RuntimeError("This command needs a display, but the service is running without GUI.")
+        future = concurrent.futures.Future()
+        self._tk_queue.put((func, args, kwargs, future))
+        return asyncio.wrap_future(future)
+
+    def _run_in(self, executor, func, *args):
+        return self._loop.run_in_executor(executor, func, *args)
+
+    # --- Connection handling ---
+
+    async def _handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._handle_request(line, writer, write_lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line.decode("utf-8"))
+            request_id = request.get("id")
+            handler = self._commands.get(request.get("cmd"))
+            if handler is None:
+                raise ValueError(f"Unknown command: {request.get('cmd')!r}")
+            response = await handler(request)
+            response["ok"] = True
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        if request_id is not None:
+            response["id"] = request_id
+
+        async with write_lock:
+            writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+    # --- Commands ---
+
+    async def _cmd_ping(self, request):
+        return {"uptime": time.time() - self.started_at, "gui": self._tk_root is not None}
+
+    async def _cmd_capture(self, request):
+        started = time.perf_counter()
+        if request.get("interactive"):
+            from .main import capture_selected_region
+            await self._call_in_tk(capture_selected_region, master=self._tk_root)
+            return {"interactive": True, "elapsed_ms": (time.perf_counter() - started) * 1000.0}
+
+        region = _parse_region(request.get("region"))
+        image = await self._run_in(self._capture_executor, self._grab, region)
+        captured = time.perf_counter()
+        response = {"width": image.width, "height": image.height, "capture_ms": (captured - started) * 1000.0, "path": None}
+
+        if request.get("editor"):
+            from .editor import open_editor_with_image
+            await self._call_in_tk(open_editor_with_image, image, master=self._tk_root)
+
+        if request.get("save", True):
+            from . import image_io
+            path = request.get("output") or image_io.build_capture_path(image_format=request.get("format"))
+            response["path"] = await self._run_in(self._work_executor, image_io.save_image, image, path, request.get("format"))
+
+        response["elapsed_ms"] = (time.perf_counter() - started) * 1000.0
+        return response
+
+    async def _cmd_ocr(self, request):
+        from .ocr import extract_text_from_image
+        started = time.perf_counter()
+        lang = request.get("lang", "eng")
+        if request.get("path"):
+            image_input = request["path"]
+        else:
+            image_input = await self._run_in(self._capture_executor, self._grab, _parse_region(request.get("region")))
+        text = await self._run_in(self._work_executor, extract_text_from_image, image_input, lang)
+        if text is None:
+            raise RuntimeError("OCR failed. See the service output for details.")
+        return {"text": text, "elapsed_ms": (time.perf_counter() - started) * 1000.0}
+
+    async def _cmd_record(self, request):
+        action = request.get("action", "status")
+        return await self._run_in(self._work_executor, self._record, action, request)
+
+    def _record(self, action, request):
+        from .recorder import ScreenRecorder
+        with self._recorder_lock:
+            if action == "start":
+                if self._recorder and self._recorder.get_status()["is_recording"]:
+                    raise RuntimeError("Recording is already in progress.")
+                output = request.get("output")
+                if not output:
+                    video_format = config_manager.get_setting("output", "video_format", "MP4").lower()
+                    output = os.path.join(config_manager.get_setting("general", "default_save_path"),
+                                          f"recording_{time.strftime('%Y%m%d_%H%M%S')}.{video_format}")
+                fps = request.get("fps") or config_manager.get_setting("output", "video_fps", 15.0)
+                self._recorder = ScreenRecorder(output_filename=output, fps=fps)
+                self._recorder.start_recording()
+                if not self._recorder.get_status()["is_recording"]:
+                    raise RuntimeError("Could not start screen recording. See the service output for details.")
+            elif action == "stop":
+                if not self._recorder or not self._recorder.get_status()["is_recording"]:
+                    raise RuntimeError("Recording is not in progress.")
+                self._recorder.stop_recording()
+                return {"is_recording": False, "filename": self._recorder.output_filename}
+            elif action != "status":
+                raise ValueError(f"Unknown record action: {action!r}")
+            if self._recorder is None:
+                return {"is_recording": False, "filename": None}
+            return self._recorder.get_status()
+
+    async def _cmd_shutdown(self, request):
+        # Give the response a moment to flush before the loop stops
+        self._loop.call_later(0.05, self._stop_event.set)
+        return {}
+
+
+def send_command(cmd, socket_path=None, timeout=30.0, **params):
+    """
+    Sends one command to a running capture service and returns its response.
+
+    Args:
+        cmd (str): Command name ("ping", "capture", "ocr", "record", "shutdown").
+        socket_path (str, optional): Socket of the service. Defaults to default_socket_path().
+        timeout (float, optional): Seconds to wait for the response.
+        **params: Command parameters, e.g. region={"top": 0, "left": 0, "width": 100, "height": 100}.
+
+    Returns:
+        dict: The response. "ok" is False and "error" holds the message if the command failed.
+
+    Raises:
+        OSError: If the service is not running (e.g. ConnectionRefusedError, FileNotFoundError).
+    """
+    request = dict(params, cmd=cmd)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or default_socket_path())
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        buffer = b""
+        while not buffer.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            buffer += chunk
+    if not buffer:
+        raise ConnectionError("The capture service closed the connection without a response.")
+    return json.loads(buffer.decode("utf-8"))
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident screenshot capture service.")
+    parser.add_argument("--socket", help="Socket path (default: per-user runtime directory).")
+    sub = parser.add_subparsers(dest="command")
+
+    serve = sub.add_parser("serve", help="Run the service in the foreground.")
+    serve.add_argument("--no-gui", action="store_true", help="Do not create a Tk root (headless).")
+
+    sub.add_parser("ping", help="Check that the service is running.")
+
+    capture = sub.add_parser("capture", help="Take a screenshot.")
+    capture.add_argument("--region", help="left,top,width,height (default: primary monitor).")
+    capture.add_argument("--output", help="Output file (default: configured save path and filename format).")
+    capture.add_argument("--editor", action="store_true", help="Open the capture in the editor.")
+    capture.add_argument("--interactive", action="store_true", help="Let the user select the region.")
+
+    ocr = sub.add_parser("ocr", help="Extract text from a file or a screen region.")
+    ocr.add_argument("--path", help="Image file to OCR.")
+    ocr.add_argument("--region", help="left,top,width,height of the screen region to OCR.")
+    ocr.add_argument("--lang", default="eng")
+
+    record = sub.add_parser("record", help="Control screen recording.")
+    record.add_argument("action", choices=["start", "stop", "status"])
+    record.add_argument("--output")
+    record.add_argument("--fps", type=float)
+
+    sub.add_parser("shutdown", help="Stop the service.")
+    args = parser.parse_args(argv)
+
+    if args.command in (None, "serve"):
+        service = CaptureService(socket_path=args.socket, with_gui=not getattr(args, "no_gui", False))
+        return 0 if service.run() else 1
+
+    params = {}
+    if getattr(args, "region", None):
+        params["region"] = [int(v) for v in args.region.split(",")]
+    for name in ("output", "path", "lang", "fps"):
+        if getattr(args, name, None) is not None:
+            params[name] = getattr(args, name)
+    if args.command == "capture":
+        params["editor"] = args.editor
+        params["interactive"] = args.interactive
+    if args.command == "record":
+        params["action"] = args.action
+
+    try:
+        response = send_command(args.command, socket_path=args.socket, **params)
+    except OSError as e:
+        print(f"Could not reach the capture service ({e}). Start it with: python -m src.capture_service serve")
+        return 1
+    print(json.dumps(response, indent=4, ensure_ascii=False))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
@@ -0,0 +1,293 @@
+"""
+Copying images to the system clipboard, in memory (no temporary files).
+
+On X11 the process becomes the owner of the CLIPBOARD selection and answers paste requests itself
+from a background thread (python-xlib, which pyautogui already depends on). The PNG is encoded
+only when an application actually asks for it, and then cached for later pastes; copying an image
+that is never pasted costs nothing. Large images are sent with the ICCCM INCR protocol. As with
+any X11 clipboard, the content is served while this process runs (clipboard managers fetch a copy
+when the selection changes).
+
+Elsewhere the image is encoded once and handed over through a pipe or API:
+    Wayland:  wl-copy --type image/png
+    X11 without python-xlib: xclip -selection clipboard -t image/png
+    Windows:  CF_DIB through the Win32 clipboard API (ctypes)
+    macOS:    NSPasteboard (needs pyobjc)
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+PNG_COMPRESS_LEVEL = 1 # The clipboard is a local transfer; fast encoding beats small output
+INCR_CHUNK_SIZE = 256 * 1024 # Larger replies are sent in chunks (INCR) to stay under the X request limit
+OWNER_START_TIMEOUT = 2.0 # Seconds to wait for the X server to confirm selection ownership
+
+def encode_png(image, compress_level=PNG_COMPRESS_LEVEL):
+    """Returns image encoded as PNG bytes."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+class XClipboardOwner:
+    """Serves one image on the X11 CLIPBOARD selection until another application takes it over."""
+
+    def __init__(self, image, compress_level=PNG_COMPRESS_LEVEL):
+        """
+        Args:
+            image (PIL.Image.Image): The image to offer. It must not be modified afterwards (pass a copy).
+            compress_level (int): PNG compression level used when a paste is requested.
+        """
+        self.image = image
+        self.compress_level = compress_level
+        self._png = None
+        self._encode_lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+        self._stop_requested = False
+        self._window_id = None
+        self.owns_selection = False
+        self.requests_served = 0
+        self.encodings = 0
+        self.error = None
+
+    def png_data(self):
+        """The PNG bytes, encoded on first use."""
+        with self._encode_lock:
+            if self._png is None:
+                self._png = encode_png(self.image, self.compress_level)
+                self.encodings += 1
+            return self._png
+
+    def start(self):
+        """Claims the selection. Returns True once the X server confirmed the ownership."""
+        self._thread = threading.Thread(target=self._run, name="x-clipboard-owner", daemon=True)
+        self._thread.start()
+        self._ready.wait(OWNER_START_TIMEOUT)
+        return self.owns_selection
+
+    def stop(self):
+        """Gives up the selection (wakes the owner thread with a client message)."""
+        self._stop_requested = True
+        if not self.is_running() or self._window_id is None:
+            return
+        try:
+            from Xlib import X, display
+            from Xlib.protocol import event
+            connection = display.Display()
+            window = connection.create_resource_object("window", self._window_id)
+            wakeup = event.ClientMessage(window=window, client_type=connection.intern_atom("_SCREENSHOT_TOOL_STOP"),
+                                         data=(32, [0, 0, 0, 0, 0]))
+            window.send_event(wakeup, event_mask=X.NoEventMask)
+            connection.close()
+        except Exception as e:
+            print(f"Could not stop the clipboard owner: {e}")
+        self._thread.join(timeout=2)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self):
+        return {"running": self.is_running(), "owns_selection": self.owns_selection,
+                "requests_served": self.requests_served, "encodings": self.encodings, "error": self.error}
+
+    def _run(self):
+        try:
+            from Xlib import X, Xatom, display
+            connection = display.Display()
+        except Exception as e:
+            self.error = str(e)
+            self._ready.set()
+            return
+        try:
+            self._serve(connection, X, Xatom)
+        except Exception as e:
+            self.error = str(e)
+            print(f"Clipboard owner error: {e}")
+        finally:
+            self.owns_selection = False
+            self._ready.set()
+            connection.close()
+
+    def _serve(self, connection, X, Xatom):
+        from Xlib.protocol import event
+
+        atom = connection.intern_atom
+        clipboard, targets, timestamp_atom = atom("CLIPBOARD"), atom("TARGETS"), atom("TIMESTAMP")
+        png, incr = atom("image/png"), atom("INCR")
+        window = connection.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent,
+                                                         event_mask=X.PropertyChangeMask)
+        self._window_id = window.id
+
+        # ICCCM: claim the selection with a real server timestamp, taken from a property change
+        window.change_property(Xatom.WM_NAME, Xatom.STRING, 8, b"screenshot-tool clipboard")
+        while True:
+            e = connection.next_event()
+            if e.type == X.PropertyNotify and e.window.id == window.id:
+                acquired_at = e.time
+                break
+        window.set_selection_owner(clipboard, acquired_at)
+        connection.flush()
+        owner = connection.get_selection_owner(clipboard)
+        self.owns_selection = getattr(owner, "id", owner) == window.id # X.NONE (0) if nobody owns it
+        self._ready.set()
+        if not self.owns_selection:
+            return
+
+        transfers = {} # (requestor id, property) -> [requestor, data, offset] of INCR transfers in progress
+        while not self._stop_requested:
+            e = connection.next_event()
+            if e.type == X.SelectionClear:
+                break # Another application (or a newer copy of ours) owns the clipboard now
+            if e.type == X.ClientMessage:
+                continue # Stop wake-up; the loop condition ends the thread
+            if e.type == X.PropertyNotify and e.state == X.PropertyDelete:
+                key = (e.window.id, e.atom)
+                transfer = transfers.get(key)
+                if transfer is None:
+                    continue
+                requestor, data, offset = transfer
+                chunk = data[offset:offset + INCR_CHUNK_SIZE]
+                requestor.change_property(e.atom, png, 8, chunk) # An empty chunk ends the transfer
+                if chunk:
+                    transfer[2] = offset + len(chunk)
+                else:
+                    del transfers[key]
+                connection.flush()
+                continue
+            if e.type != X.SelectionRequest:
+                continue
+
+            requestor = e.requestor
+            prop = e.property if e.property != X.NONE else e.target # Obsolete clients pass no property
+            if e.target == targets:
+                requestor.change_property(prop, Xatom.ATOM, 32, [targets, timestamp_atom, png])
+            elif e.target == timestamp_atom:
+                requestor.change_property(prop, Xatom.INTEGER, 32, [acquired_at])
+            elif e.target == png:
+                data = self.png_data()
+                if len(data) <= INCR_CHUNK_SIZE:
+                    requestor.change_property(prop, png, 8, data)
+                else:
+                    # Announce the size; the requestor deletes the property to ask for each chunk
+                    requestor.change_attributes(event_mask=X.PropertyChangeMask)
+                    requestor.change_property(prop, incr, 32, [len(data)])
+                    transfers[(requestor.id, prop)] = [requestor, data, 0]
+                self.requests_served += 1
+            else:
+                prop = X.NONE # Refuse targets we cannot provide (including MULTIPLE)
+            reply = event.SelectionNotify(time=e.time, requestor=requestor, selection=e.selection,
+                                          target=e.target, property=prop)
+            requestor.send_event(reply, event_mask=X.NoEventMask)
+            connection.flush()
+        window.destroy()
+
+
+_x_owner = None # The XClipboardOwner serving this process's most recent copy
+_x_owner_lock = threading.Lock()
+
+def _copy_x11(image):
+    global _x_owner
+    with _x_owner_lock:
+        previous = _x_owner
+        _x_owner = XClipboardOwner(image)
+        if not _x_owner.start():
+            raise OSError(_x_owner.error or "the X server did not grant clipboard ownership")
+        if previous is not None and previous.is_running():
+            previous.stop() # Normally already ended by the SelectionClear from the new owner
+    return "x11"
+
+def _copy_with_command(image, command):
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # The helpers fork a child that keeps serving the clipboard; the parent exits once it has read stdin
+    _, stderr = process.communicate(encode_png(image), timeout=10)
+    if process.returncode != 0:
+        raise OSError(f"{command[0]} failed: {stderr.decode(errors='replace').strip()}")
+    return command[0]
+
+def _copy_windows(image):
+    import ctypes
+    from ctypes import wintypes
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="BMP")
+    dib = buffer.getvalue()[14:] # CF_DIB is a BMP file without its 14-byte file header
+    kernel32, user32 = ctypes.windll.kernel32, ctypes.windll.user32
+    kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+    kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalLock.restype = ctypes.c_void_p
+    kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+    user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+    if not user32.OpenClipboard(None):
+        raise OSError("could not open the clipboard")
+    try:
+        user32.EmptyClipboard()
+        handle = kernel32.GlobalAlloc(0x0002, len(dib)) # GMEM_MOVEABLE; owned by the clipboard afterwards
+        ctypes.memmove(kernel32.GlobalLock(handle), dib, len(dib))
+        kernel32.GlobalUnlock(handle)
+        if not user32.SetClipboardData(8, handle): # CF_DIB
+            raise OSError("SetClipboardData failed")
+    finally:
+        user32.CloseClipboard()
+    return "windows"
+
+def _copy_macos(image):
+    from AppKit import NSPasteboard, NSPasteboardTypePNG
+    from Foundation import NSData
+    data = encode_png(image)
+    pasteboard = NSPasteboard.generalPasteboard()
+    pasteboard.clearContents()
+    pasteboard.setData_forType_(NSData.dataWithBytes_length_(data, len(data)), NSPasteboardTypePNG)
+    return "macos"
+
+def copy_image(image):
+    """
+    Puts image on the system clipboard.
+
+    Args:
+        image (PIL.Image.Image): The image. On X11 it is encoded later, when pasted, so it must not be
+                                 modified after this call (pass a copy).
+
+    Returns:
+        str: The mechanism used ("x11", "wl-copy", "xclip", "windows", "macos"), or None if no
+             image clipboard is available (the reason is printed).
+    """
+    try:
+        if sys.platform.startswith("win"):
+            return _copy_windows(image)
+        if sys.platform == "darwin":
+            return _copy_macos(image)
+        if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-copy"):
+            return _copy_with_command(image, ["wl-copy", "--type", "image/png"])
+        if os.environ.get("DISPLAY"):
+            try:
+                import Xlib.display # noqa: F401 - only checks availability
+            except ImportError:
+                if shutil.which("xclip"):
+                    return _copy_with_command(image, ["xclip", "-selection", "clipboard", "-t", "image/png", "-i"])
+                print("Clipboard Error: install python-xlib or xclip to copy images.")
+                return None
+            return _copy_x11(image)
+        print("Clipboard Error: no X11 or Wayland display (or wl-copy is missing).")
+        return None
+    except ImportError as e:
+        print(f"Clipboard Error: a required module is missing: {e}")
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Clipboard Error: {e}")
+    return None
+
+
+if __name__ == "__main__":
+    import time
+    from PIL import Image, ImageDraw
+    demo = Image.new("RGB", (640, 360), "white")
+    ImageDraw.Draw(demo).text((20, 20), "Clipboard test", fill="black")
+    used = copy_image(demo)
+    print(f"Copied with: {used}")
+    if used == "x11":
+        print("Serving the clipboard for 60 seconds; paste the image somewhere...")
+        time.sleep(60)
+        print(_x_owner.get_status())
@@ -5,10 +5,10 @@ import appdirs # For platform-independent config directory
 APP_NAME = "ScreenshotTool"
 APP_AUTHOR = "ScreenshotToolDev" # Or your specific author name
 
-# Determine configuration directory using appdirs
+# Determine configuration directory using appdirs.
+# The directory itself is only created when the config is first saved, so that
+# importing this module does not touch the filesystem.
 CONFIG_DIR = appdirs.user_config_dir(APP_NAME, APP_AUTHOR)
-if not os.path.exists(CONFIG_DIR):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
 
 CONFIG_FILE_PATH = os.path.join(CONFIG_DIR, "config.json")
 
@@ -22,12 +22,52 @@ DEFAULT_CONFIG = {
     "output": {
         "image_format": "PNG", # Options: PNG, JPG, BMP
         "image_quality_jpg": 90, # 1-100
+        "png_compress_level": 6, # 0 (fastest, largest) - 9 (slowest, smallest)
         "video_format": "MP4", # Options: MP4, AVI
         "video_fps": 15.0,
     },
     "interface": {
         "theme": "Light", # Options: Light, Dark (Placeholder)
         "language": "en", # Default UI language
+    },
+    "editor": {
+        "history_memory_mb": 256, # Cap on the compressed undo history per editor window
+        "tile_cache_tiles": 192, # Rendered 256x256 tiles kept per editor window (about 256 KB each)
+        "autosave": True, # Journal edits in the background so they can be recovered after a crash
+    },
+    "redaction": {
+        "mosaic_strength": 12, # Mosaic block size in pixels
+        "gaussian_strength": 8, # Blur radius in pixels
+        "blur_strength": 8, # Box blur radius in pixels
+    },
+    "ocr": {
+        "engine": "auto", # auto (tesserocr if installed, else pytesseract), tesserocr or pytesseract
+        "tessdata_dir": "", # Language data directory; empty = Tesseract's default
+        "preprocess": "fast", # Preprocessing preset before OCR (see ocr_preprocess.PRESETS)
+        "cache_enabled": True, # Reuse OCR results for identical pixels (see ocr_cache)
+        "cache_max_mb": 64, # Size cap of the persistent OCR result cache
+        "strip_height": 2000, # Taller images are OCR'd in overlapping strips of this height, in parallel
+        "strip_overlap": 160, # Rows shared by neighbouring strips; must exceed the tallest text line
+        "tile_workers": 0, # Strips or text regions recognized at once; 0 = number of CPUs
+        "text_regions": "off", # OCR only detected text regions: off, auto (sparse images only) or on
+    },
+    "auto_redact": {
+        "patterns": ["email", "ipv4", "ipv6", "token"], # Built-in patterns to look for (see auto_redact.PATTERNS)
+        "custom_patterns": {}, # Extra {name: regular expression}
+        "method": "mosaic", # mosaic, blur or gaussian
+        "lang": "eng", # OCR language
+        "padding": 2, # Pixels added around each matched word box
+    },
+    "search": {
+        "index_enabled": False, # OCR new screenshots in the background so they can be searched (see ocr_index)
+        "lang": "eng", # Tesseract language code(s) used for indexing
+        "scan_interval": 30, # Seconds between scans of the screenshot folder
+        "tokenizer": "unicode61", # unicode61 (word prefixes) or trigram (substrings, for CJK); applies to new indexes
+        "index_recordings": False, # After a screen recording stops, write a time-coded OCR index next to it (see video_ocr)
+        "recording_sample_interval": 1.0, # Seconds of video between the frames checked for new text
+    },
+    "service": {
+        "socket_path": "", # Unix socket of the background capture service; empty = per-user default
     }
 }
 
@@ -48,8 +88,9 @@ def load_config():
         try:
             with open(CONFIG_FILE_PATH, 'r', encoding='utf-8') as f:
                 loaded_settings = json.load(f)
-                # Basic validation: check if top-level keys exist
-                if all(key in loaded_settings for key in DEFAULT_CONFIG.keys()):
+                # Basic validation: the file must hold at least one known section.
+                # Sections missing from an older config file are filled in from defaults below.
+                if isinstance(loaded_settings, dict) and any(key in loaded_settings for key in DEFAULT_CONFIG.keys()):
                     # Further merge loaded settings with defaults to ensure all keys are present
                     # and new default settings are introduced if config file is from older version
                     config_to_use = {}
@@ -87,6 +128,7 @@ def save_config(config_data):
     """
     global _current_config
     try:
+        os.makedirs(CONFIG_DIR, exist_ok=True)
         with open(CONFIG_FILE_PATH, 'w', encoding='utf-8') as f:
             json.dump(config_data, f, indent=4, ensure_ascii=False)
         _current_config = config_data # Update the global cache
@@ -0,0 +1,378 @@
+"""
+Undo/redo history for the image editor that stores changes instead of full image copies.
+
+Every edit is recorded as a delta: the pixels of the changed bounding box before and after the
+edit, zlib-compressed. Edits that change the image size (e.g. crop) store the whole image before
+and after instead. Undo and redo only decompress and paste one patch, so their cost depends on
+the size of the edit, not of the image.
+
+Changes to the vector annotation layer (see annotations) are recorded as AnnotationDelta and
+LayerTranslateDelta; they hold annotation objects, not pixels, and report no changed pixel area.
+
+Every recorded edit gets a unique id, and EditHistory.state_id identifies the current state in
+O(1): the editor compares it with the id of the last saved state instead of comparing pixels.
+Listeners (add_listener) receive the primitive changes of each record/undo/redo as they happen,
+which is how the autosave journal follows the editor (see autosave).
+
+The total size of the stored deltas is capped (editor.history_memory_mb); when a new edit pushes
+the history over the cap, the oldest deltas are dropped and can no longer be undone.
+"""
+
+import zlib
+
+from PIL import Image, ImageChops
+
+from . import config_manager
+
+DEFAULT_MEMORY_LIMIT_MB = 256
+COMPRESSION_LEVEL = 1 # Screenshots compress well even at the fastest level
+
+
+class _Pixels:
+    """An image (or image patch) kept zlib-compressed in memory."""
+
+    def __init__(self, image):
+        self.mode = image.mode
+        self.size = image.size
+        self.data = zlib.compress(image.tobytes(), COMPRESSION_LEVEL)
+
+    def to_image(self):
+        return Image.frombytes(self.mode, self.size, zlib.decompress(self.data))
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+
+class PatchDelta:
+    """An edit that changed the pixels inside box without changing the image size."""
+
+    def __init__(self, box, before, after):
+        """
+        Args:
+            box (tuple): (x1, y1, x2, y2) of the changed area.
+            before (PIL.Image.Image): The area's pixels before the edit.
+            after (PIL.Image.Image): The area's pixels after the edit.
+        """
+        self.box = box
+        self._before = _Pixels(before)
+        self._after = _Pixels(after)
+
+    @property
+    def nbytes(self):
+        return self._before.nbytes + self._after.nbytes
+
+    def undo(self, image):
+        """Restores the area in image (in place). Returns (image, changed box)."""
+        image.paste(self._before.to_image(), self.box[:2])
+        return image, self.box
+
+    def redo(self, image):
+        """Re-applies the edit to image (in place). Returns (image, changed box)."""
+        image.paste(self._after.to_image(), self.box[:2])
+        return image, self.box
+
+    def steps(self, undo=False):
+        """
+        Returns the primitive changes that redo (or, with undo=True, undo) this delta:
+        ("patch", box, pixels), ("replace", pixels), ("annotation", index, old, new) or
+        ("translate", dx, dy). pixels are compressed and not decoded here.
+        """
+        return [("patch", self.box, self._before if undo else self._after)]
+
+
+class ReplaceDelta:
+    """An edit that replaced the whole image, e.g. a crop."""
+
+    def __init__(self, before, after):
+        self._before = _Pixels(before)
+        self._after = _Pixels(after)
+
+    @property
+    def nbytes(self):
+        return self._before.nbytes + self._after.nbytes
+
+    def undo(self, image):
+        """Returns (restored image, None); None means the whole image changed."""
+        return self._before.to_image(), None
+
+    def redo(self, image):
+        return self._after.to_image(), None
+
+    def steps(self, undo=False):
+        return [("replace", self._before if undo else self._after)]
+
+
+class AnnotationDelta:
+    """Adding, removing or changing one annotation of an annotations.AnnotationLayer."""
+
+    def __init__(self, layer, index, before, after):
+        """
+        Args:
+            layer (annotations.AnnotationLayer): The edited layer.
+            index (int): Position of the annotation in the layer.
+            before (annotations.Annotation): The annotation before the edit; None if it was added.
+            after (annotations.Annotation): The annotation after the edit; None if it was removed.
+        """
+        self.layer = layer
+        self.index = index
+        # Copies, so later edits of the live objects do not change the recorded states
+        self.before = before.copy() if before is not None else None
+        self.after = after.copy() if after is not None else None
+
+    @property
+    def nbytes(self):
+        return sum(64 + 16 * len(a.points) for a in (self.before, self.after) if a is not None)
+
+    def _apply(self, old, new):
+        if old is None:
+            self.layer.insert(self.index, new.copy())
+        elif new is None:
+            self.layer.remove_at(self.index)
+        else:
+            self.layer.replace(self.index, new.copy())
+
+    def undo(self, image):
+        """Returns (image, ()); the empty box means no pixels changed."""
+        self._apply(self.after, self.before)
+        return image, ()
+
+    def redo(self, image):
+        self._apply(self.before, self.after)
+        return image, ()
+
+    def steps(self, undo=False):
+        old, new = (self.after, self.before) if undo else (self.before, self.after)
+        return [("annotation", self.index, old, new)]
+
+
+class LayerTranslateDelta:
+    """Moving every annotation of a layer, e.g. to follow a crop of the image."""
+
+    def __init__(self, layer, dx, dy):
+        self.layer = layer
+        self.dx = dx
+        self.dy = dy
+        self.nbytes = 32
+
+    def undo(self, image):
+        self.layer.translate(-self.dx, -self.dy)
+        return image, ()
+
+    def redo(self, image):
+        self.layer.translate(self.dx, self.dy)
+        return image, ()
+
+    def steps(self, undo=False):
+        return [("translate", -self.dx, -self.dy) if undo else ("translate", self.dx, self.dy)]
+
+
+class CompoundDelta:
+    """Several deltas recorded as one undo step."""
+
+    def __init__(self, deltas):
+        self.deltas = list(deltas)
+
+    @property
+    def nbytes(self):
+        return sum(delta.nbytes for delta in self.deltas)
+
+    def undo(self, image):
+        return self._run([delta.undo for delta in reversed(self.deltas)], image)
+
+    def redo(self, image):
+        return self._run([delta.redo for delta in self.deltas], image)
+
+    def steps(self, undo=False):
+        return [step for delta in (reversed(self.deltas) if undo else self.deltas) for step in delta.steps(undo)]
+
+    @staticmethod
+    def _run(steps, image):
+        changed = ()
+        for step in steps:
+            image, box = step(image)
+            if box is None or changed is None:
+                changed = None
+            elif box:
+                changed = box if not changed else (min(changed[0], box[0]), min(changed[1], box[1]),
+                                                   max(changed[2], box[2]), max(changed[3], box[3]))
+        return image, changed
+
+
+class EditHistory:
+    def __init__(self, image, memory_limit_mb=None):
+        """
+        Args:
+            image (PIL.Image.Image): The image as it was before the first edit.
+            memory_limit_mb (float, optional): Cap on the compressed size of all stored deltas.
+                                               Defaults to editor.history_memory_mb.
+        """
+        if memory_limit_mb is None:
+            memory_limit_mb = config_manager.get_setting("editor", "history_memory_mb", DEFAULT_MEMORY_LIMIT_MB)
+        self.memory_limit = int(float(memory_limit_mb) * 1024 * 1024)
+
+        # Copy of the image at the current history position. Recording an edit compares against it
+        # to get the "before" pixels, so callers do not have to snapshot anything before editing.
+        self._base = image.copy()
+        self._deltas = []
+        self._index = 0 # Number of deltas currently applied
+        self._nbytes = 0
+        # Edits applied relative to the image the history was created with; unlike _index, this
+        # is not affected when old deltas are evicted.
+        self.position = 0
+        self.evicted = 0
+        self._ids = [] # Unique id of each delta in _deltas
+        self._base_id = 0 # Id of the state before the oldest stored delta (0: the original image)
+        self._next_id = 1
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Calls listener(steps) after every record, undo and redo, with the changes as in PatchDelta.steps."""
+        self._listeners.append(listener)
+
+    def _notify(self, delta, undo=False):
+        if self._listeners:
+            steps = delta.steps(undo)
+            for listener in self._listeners:
+                listener(steps)
+
+    @property
+    def state_id(self):
+        """Id of the current state: equal ids mean identical image and annotations, in O(1)."""
+        return self._ids[self._index - 1] if self._index else self._base_id
+
+    def record(self, image, box=None, extra=None):
+        """
+        Records the edit that turned the previous state into image. Discards any redo states.
+
+        Args:
+            image (PIL.Image.Image): The edited image.
+            box (tuple or list, optional): (x1, y1, x2, y2) containing all changed pixels, or a list of
+                                           such boxes for an edit of several separate regions. If
+                                           omitted, the changed area is found by comparing the whole image.
+            extra (list, optional): Non-pixel deltas (e.g. LayerTranslateDelta) that belong to the
+                                    same edit and are undone together with it.
+
+        Returns:
+            bool: False if nothing changed and no delta was stored.
+        """
+        if image.size != self._base.size or image.mode != self._base.mode:
+            delta = ReplaceDelta(self._base, image)
+            self._base = image.copy()
+        else:
+            boxes = box if isinstance(box, list) else [box]
+            delta = []
+            for region in boxes:
+                region = self._changed_box(image, region)
+                if region is not None:
+                    after = image.crop(region)
+                    delta.append(PatchDelta(region, self._base.crop(region), after))
+                    self._base.paste(after, region[:2])
+            delta = delta[0] if len(delta) == 1 else (CompoundDelta(delta) if delta else None)
+
+        deltas = ([delta] if delta is not None else []) + list(extra or [])
+        if not deltas:
+            return False
+        return self.record_delta(deltas[0] if len(deltas) == 1 else CompoundDelta(deltas))
+
+    def record_delta(self, delta):
+        """Records an edit that has already been applied, e.g. an AnnotationDelta. Discards any redo states."""
+        # A new edit after undo makes the undone states unreachable
+        for dropped in self._deltas[self._index:]:
+            self._nbytes -= dropped.nbytes
+        del self._deltas[self._index:]
+        del self._ids[self._index:]
+
+        self._deltas.append(delta)
+        self._ids.append(self._next_id)
+        self._next_id += 1
+        self._index += 1
+        self._nbytes += delta.nbytes
+        self.position += 1
+        self._evict()
+        self._notify(delta)
+        return True
+
+    def _changed_box(self, image, box):
+        """Returns the bounding box of the pixels that differ from _base, within box if given."""
+        width, height = image.size
+        if box is None:
+            box = (0, 0, width, height)
+        x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+        x2, y2 = min(width, int(box[2])), min(height, int(box[3]))
+        if x1 >= x2 or y1 >= y2:
+            return None
+        # Shrink the caller's (usually generous) box to the pixels that actually changed
+        difference = ImageChops.difference(image.crop((x1, y1, x2, y2)), self._base.crop((x1, y1, x2, y2)))
+        # getbbox() on an RGBA image only looks at alpha, so take the union over every band
+        band_boxes = [band.getbbox() for band in difference.split()]
+        band_boxes = [b for b in band_boxes if b is not None]
+        if not band_boxes:
+            return None
+        changed = (min(b[0] for b in band_boxes), min(b[1] for b in band_boxes),
+                   max(b[2] for b in band_boxes), max(b[3] for b in band_boxes))
+        return (x1 + changed[0], y1 + changed[1], x1 + changed[2], y1 + changed[3])
+
+    def _evict(self):
+        # Always keep the newest delta, even if it alone exceeds the limit
+        while self._nbytes > self.memory_limit and self._index > 1:
+            oldest = self._deltas.pop(0)
+            self._base_id = self._ids.pop(0)
+            self._nbytes -= oldest.nbytes
+            self._index -= 1
+            self.evicted += 1
+
+    def can_undo(self):
+        return self._index > 0
+
+    def can_redo(self):
+        return self._index < len(self._deltas)
+
+    def undo(self, image):
+        """
+        Reverts the last edit.
+
+        Args:
+            image (PIL.Image.Image): The current image; patch deltas modify it in place.
+
+        Returns:
+            tuple: (image, box) where box is the changed area, None if the whole image was replaced,
+                   or () if no pixels changed (annotation edits). None if there is nothing to undo.
+        """
+        if not self.can_undo():
+            return None
+        self._index -= 1
+        self.position -= 1
+        delta = self._deltas[self._index]
+        result = delta.undo(image)
+        self._sync_base(result)
+        self._notify(delta, undo=True)
+        return result
+
+    def redo(self, image):
+        """Re-applies the last undone edit. Returns (image, box) like undo(), or None."""
+        if not self.can_redo():
+            return None
+        delta = self._deltas[self._index]
+        self._index += 1
+        self.position += 1
+        result = delta.redo(image)
+        self._sync_base(result)
+        self._notify(delta)
+        return result
+
+    def _sync_base(self, result):
+        image, box = result
+        if box is None:
+            self._base = image.copy()
+        elif box:
+            self._base.paste(image.crop(box), box[:2])
+
+    def get_status(self):
+        return {
+            "undo_steps": self._index,
+            "redo_steps": len(self._deltas) - self._index,
+            "evicted": self.evicted,
+            "memory_bytes": self._nbytes,
+            "memory_limit_bytes": self.memory_limit,
+        }
@@ -1,9 +1,36 @@
+import os
+import threading
 import tkinter as tk
 from tkinter import colorchooser, simpledialog, filedialog, messagebox
-from PIL import Image, ImageTk, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageTk, ImageDraw, ImageFont
+from . import auto_redact
+from . import autosave
+from . import clipboard
+from . import config_manager
+from . import fonts
+from . import i18n
+from . import image_io
+from . import image_ops
+from . import redaction
+from .annotations import Annotation, AnnotationLayer, arrowhead_points, sidecar_path as annotations_sidecar_path
+from .edit_history import AnnotationDelta, CompoundDelta, EditHistory, LayerTranslateDelta
+from .tile_renderer import TileRenderer
+from .tk_dispatch import TkDispatcher
+
+ZOOM_STEP = 1.25
+MIN_ZOOM = 0.02
+MAX_ZOOM = 16.0
 
 class ImageEditor:
-    def __init__(self, master, image_path_or_object):
+    def __init__(self, master, image_path_or_object, annotation_layer=None, source_path=None, recovered=False):
+        """
+        Args:
+            master (tk.Misc): Window the editor is built in.
+            image_path_or_object (str or PIL.Image.Image): Image to edit.
+            annotation_layer (annotations.AnnotationLayer, optional): Annotations to start with.
+            source_path (str, optional): File the image came from, if image_path_or_object is an image.
+            recovered (bool): The image was restored from an autosave journal and has not been saved.
+        """
         self.master = master
         self.master.title("Image Editor")
 
@@ -26,17 +53,47 @@ class ImageEditor:
             return
 
         self.image_display = self.image_original.copy() # Image for display and temporary edits
-        self.tk_image = None # For tkinter display
-
-        # History for undo/redo
-        self.history = [self.image_original.copy()]
-        self.history_index = 0
+        # The canvas shows image_display as tiles rendered at the current zoom; only visible tiles are
+        # rendered, and rendered tiles are cached (see tile_renderer). Edits re-render the tiles of the
+        # affected rectangle (see _mark_dirty).
+        self._tile_renderer = None
+        self._tile_items = {} # (tx, ty) -> (canvas item, PhotoImage) of the tiles currently shown
+        self._tiles_update_scheduled = False
+        self._zoom_mode = "fit" # "fit" follows the canvas size; "manual" after the user zooms
+        self._view_ratio = 1.0 # Zoom: display pixels per image pixel
+        self._view_origin = (0, 0) # Canvas position of the image's top-left corner
+        self._dirty_box = None # Pending dirty rectangle in image coordinates
+        self._dirty_flush_scheduled = False
+        self._resize_job = None
+        self.dispatcher = TkDispatcher(self.master) # Delivers background save results to the Tk thread
+
+        # History for undo/redo. Stores compressed patches of the changed areas, not full copies.
+        self.history = EditHistory(self.image_original)
+
+        # Shapes, text and pen strokes are vector annotations drawn as canvas items over the image.
+        # They are rasterized only when saving or exporting (see _flattened_image).
+        self.annotations = annotation_layer if annotation_layer is not None else AnnotationLayer()
+        self._annotation_items = {} # id(annotation) -> canvas item ids
+        self._stroke_points = [] # Image coordinates of the pen stroke in progress
+        self._moving_index = None # Annotation being dragged by the move tool
+        self._move_total = (0.0, 0.0) # Canvas distance it has been dragged
+
+        # Blur/mosaic: strength per method, live preview of the dragged region, and regions queued
+        # with Shift that are applied together (see apply_pending_redactions)
+        self.redaction_strength = {"mosaic": redaction.default_strength("mosaic"),
+                                   "gaussian": redaction.default_strength("gaussian")}
+        self._redaction_drag_box = None
+        self._redaction_preview_scheduled = False
+        self._redaction_preview_photo = None
+        self._pending_redactions = [] # (image box, method, strength)
+        self._pending_redaction_photos = []
 
         # Drawing defaults
         self.current_color = "red" # Renamed from draw_color
         self.line_width = 3
         self.font_size = 20
-        self.font_family = "Arial" # A common default
+        self.font_family = "Arial" # A common default; resolved to an installed font (see fonts.resolve_family)
+        fonts.preload() # Discover system fonts in the background so the first text insertion is instant
 
         # Current tool
         self.current_tool = None # e.g., "rectangle", "line", "text", "crop"
@@ -73,6 +130,9 @@ class ImageEditor:
         btn_pen = tk.Button(toolbar, text="Pen", command=lambda: self.set_tool("pen"))
         btn_pen.pack(fill=tk.X, pady=2)
 
+        btn_move = tk.Button(toolbar, text="Move", command=lambda: self.set_tool("move"))
+        btn_move.pack(fill=tk.X, pady=2)
+
         btn_crop = tk.Button(toolbar, text="Crop", command=lambda: self.set_tool("crop"))
         btn_crop.pack(fill=tk.X, pady=2)
 
@@ -94,6 +154,20 @@ class ImageEditor:
         btn_font_size = tk.Button(toolbar, text="Font Size", command=self.choose_font_size)
         btn_font_size.pack(fill=tk.X, pady=2)
 
+        btn_strength = tk.Button(toolbar, text="Strength", command=self.choose_redaction_strength)
+        btn_strength.pack(fill=tk.X, pady=2)
+
+        btn_auto_redact = tk.Button(toolbar, text="Auto Redact", command=self.auto_redact_sensitive_text)
+        btn_auto_redact.pack(fill=tk.X, pady=2)
+
+        tk.Label(toolbar, text="View", font=("Arial", 10, "bold")).pack(pady=(10,0))
+        zoom_frame = tk.Frame(toolbar)
+        zoom_frame.pack(fill=tk.X, pady=2)
+        tk.Button(zoom_frame, text="-", width=2, command=self.zoom_out).pack(side=tk.LEFT)
+        tk.Button(zoom_frame, text="Fit", command=self.zoom_fit).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(zoom_frame, text="+", width=2, command=self.zoom_in).pack(side=tk.LEFT)
+        tk.Button(toolbar, text="100%", command=self.zoom_actual_size).pack(fill=tk.X, pady=2)
+
         tk.Label(toolbar, text="Actions", font=("Arial", 10, "bold")).pack(pady=(10,0))
         btn_copy_clipboard = tk.Button(toolbar, text="Copy", command=self.copy_to_clipboard)
         btn_copy_clipboard.pack(fill=tk.X, pady=2)
@@ -104,12 +178,40 @@ class ImageEditor:
         btn_save_as = tk.Button(toolbar, text="Save As", command=self.save_as_image)
         btn_save_as.pack(fill=tk.X, pady=2)
 
-
-        # Canvas for image
-        self.canvas = tk.Canvas(main_frame, bg="lightgrey", highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
+        btn_export_annotations = tk.Button(toolbar, text="Save Annotations", command=self.export_annotations)
+        btn_export_annotations.pack(fill=tk.X, pady=2)
+
+        btn_import_annotations = tk.Button(toolbar, text="Load Annotations", command=self.import_annotations)
+        btn_import_annotations.pack(fill=tk.X, pady=2)
+
+
+        # Canvas for image, scrollable when zoomed in
+        canvas_frame = tk.Frame(main_frame)
+        canvas_frame.pack(fill=tk.BOTH, expand=True)
+        canvas_frame.rowconfigure(0, weight=1)
+        canvas_frame.columnconfigure(0, weight=1)
+        self.canvas = tk.Canvas(canvas_frame, bg="lightgrey", highlightthickness=0)
+        self.v_scrollbar = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.h_scrollbar = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        # Every view change (scrollbars, wheel, panning) reports here, which brings newly visible tiles in
+        self.canvas.config(xscrollcommand=self._on_xscroll, yscrollcommand=self._on_yscroll)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.v_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.h_scrollbar.grid(row=1, column=0, sticky="ew")
         
         self.display_image_on_canvas()
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
+
+        # Zoom and pan: Ctrl+wheel zooms around the cursor, the wheel scrolls, the middle button drags
+        for wheel_event in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(wheel_event, self._on_mouse_wheel)
+        self.canvas.bind("<ButtonPress-2>", self._on_pan_start)
+        self.canvas.bind("<B2-Motion>", self._on_pan_drag)
+        self.master.bind("<Control-plus>", self.zoom_in)
+        self.master.bind("<Control-equal>", self.zoom_in)
+        self.master.bind("<Control-minus>", self.zoom_out)
+        self.master.bind("<Control-0>", self.zoom_fit)
+        self.master.bind("<Control-1>", self.zoom_actual_size)
 
         # Bind mouse events to canvas
         self.canvas.bind("<ButtonPress-1>", self.on_canvas_press)
@@ -117,19 +219,42 @@ class ImageEditor:
         self.canvas.bind("<ButtonRelease-1>", self.on_canvas_release)
         
         # Bind keyboard shortcuts for undo/redo
-        self.master.bind_all("<Control-z>", self.undo)
-        self.master.bind_all("<Control-y>", self.redo) # Or <Control-Shift-Z> on some systems
+        self.master.bind("<Control-z>", self.undo)
+        self.master.bind("<Control-y>", self.redo) # Or <Control-Shift-Z> on some systems
+        # Blur/mosaic regions queued with Shift+drag
+        self.master.bind("<Return>", self.apply_pending_redactions)
+        self.master.bind("<Escape>", self.cancel_pending_redactions)
 
         self.master.protocol("WM_DELETE_WINDOW", self.on_close)
         self.saved_once = False # To track if initial save has happened for "Save" vs "Save As" logic
-        self.current_file_path = None
+        self.current_file_path = source_path
         if isinstance(image_path_or_object, str):
             self.current_file_path = image_path_or_object
 
-
-    def display_image_on_canvas(self):
+        # Dirty tracking: the history id of the state that matches the file on disk (None: nothing does)
+        self._saved_state_id = None if recovered else self.history.state_id
+        self._saving_state_id = None
+        self._save_pending = False # A write was submitted and its _on_save_done has not run yet
+        self._close_after_save = False # "Save before quitting": close once the write has succeeded
+        # Crash recovery: every history change is appended to an autosave journal in the background.
+        # The journal is created on the first edit, starting from the state the editor opened with.
+        self.journal = None
+        self._journal_start_annotations = [a.copy() for a in self.annotations]
+        self.history.add_listener(self._journal_steps)
+        if recovered:
+            self._start_journal() # Keep the recovered state safe even before the next edit
+
+
+    def display_image_on_canvas(self, force=False):
+        """
+        Lays out image_display on the canvas at the current zoom and shows the visible tiles.
+
+        In "fit" mode (the default until the user zooms) the zoom is chosen so the whole image fits,
+        never above 100%. Tiles are rendered by a TileRenderer and cached, so this is cheap to call
+        again. force=True rebuilds the renderer, e.g. after the whole image was replaced by a crop
+        or undo. Edits that touch part of the image should call _mark_dirty() instead.
+        """
         if self.image_display:
-            # Resize image to fit canvas if it's too large, maintaining aspect ratio
             canvas_width = self.canvas.winfo_width()
             canvas_height = self.canvas.winfo_height()
 
@@ -137,29 +262,183 @@ class ImageEditor:
                 self.master.after(50, self.display_image_on_canvas) # Retry after a short delay
                 return
 
+            if self._tile_renderer is None:
+                self._tile_renderer = TileRenderer(
+                    self.image_display, convert=ImageTk.PhotoImage,
+                    cache_tiles=config_manager.get_setting("editor", "tile_cache_tiles", 192))
+            elif force or self._tile_renderer.image is not self.image_display:
+                self._tile_renderer.set_image(self.image_display)
+
             img_w, img_h = self.image_display.size
-            
-            # Maintain aspect ratio
-            ratio = min(canvas_width / img_w, canvas_height / img_h)
-            
-            if ratio < 1.0: # Only scale down if image is larger than canvas
-                new_width = int(img_w * ratio)
-                new_height = int(img_h * ratio)
-                img_to_show = self.image_display.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            else:
-                img_to_show = self.image_display
+            if self._zoom_mode == "fit":
+                # Maintain aspect ratio; only scale down if image is larger than canvas
+                self._view_ratio = min(1.0, canvas_width / img_w, canvas_height / img_h)
+
+            display_w, display_h = self._tile_renderer.display_size(self._view_ratio)
+            # Center the image while it is smaller than the canvas
+            self._view_origin = (max(0, (canvas_width - display_w) // 2), max(0, (canvas_height - display_h) // 2))
+            self.canvas.config(scrollregion=(0, 0, max(canvas_width, display_w), max(canvas_height, display_h)))
+            self._dirty_box = None # Tiles rendered from now on reflect every edit
+
+            # Tiles are positioned for the old zoom/origin; drop their items and show the new ones
+            self.canvas.delete("tile")
+            self._tile_items = {}
+            self._update_visible_tiles()
+            self._redraw_annotations() # Annotation items follow the new view scale and origin
+            if self._pending_redactions:
+                self._redraw_pending_redactions()
+
+    def _visible_display_box(self):
+        """Returns the visible area in display pixels relative to the image's top-left corner."""
+        x1 = self.canvas.canvasx(0) - self._view_origin[0]
+        y1 = self.canvas.canvasy(0) - self._view_origin[1]
+        return (x1, y1, x1 + self.canvas.winfo_width(), y1 + self.canvas.winfo_height())
+
+    def _update_visible_tiles(self):
+        """Creates canvas items for tiles that became visible and removes those that scrolled out of view."""
+        self._tiles_update_scheduled = False
+        if self._tile_renderer is None:
+            return
+        zoom = self._view_ratio
+        tile_size = self._tile_renderer.tile_size
+        visible = set(self._tile_renderer.tiles_in(zoom, self._visible_display_box()))
+        for key in list(self._tile_items):
+            if key not in visible:
+                self.canvas.delete(self._tile_items.pop(key)[0])
+        for tx, ty in visible:
+            if (tx, ty) not in self._tile_items:
+                photo = self._tile_renderer.get_tile(zoom, tx, ty)
+                item = self.canvas.create_image(self._view_origin[0] + tx * tile_size, self._view_origin[1] + ty * tile_size,
+                                                anchor=tk.NW, image=photo, tags=("tile",))
+                self.canvas.tag_lower(item)
+                # The item keeps a reference to its photo: the LRU cache may drop it while it is shown
+                self._tile_items[(tx, ty)] = (item, photo)
+
+    def _schedule_tile_update(self):
+        if not self._tiles_update_scheduled:
+            self._tiles_update_scheduled = True
+            self.master.after_idle(self._update_visible_tiles)
+
+    def _on_xscroll(self, first, last):
+        self.h_scrollbar.set(first, last)
+        self._schedule_tile_update()
+
+    def _on_yscroll(self, first, last):
+        self.v_scrollbar.set(first, last)
+        self._schedule_tile_update()
+
+    def set_zoom(self, zoom, anchor=None):
+        """
+        Sets the zoom (display pixels per image pixel), keeping the image point under anchor in place.
+
+        Args:
+            zoom (float or str): The new zoom, or "fit" to fit the image into the canvas.
+            anchor (tuple, optional): (x, y) widget coordinates to zoom around; defaults to the canvas centre.
+        """
+        if anchor is None:
+            anchor = (self.canvas.winfo_width() / 2, self.canvas.winfo_height() / 2)
+        image_x = (self.canvas.canvasx(anchor[0]) - self._view_origin[0]) / self._view_ratio
+        image_y = (self.canvas.canvasy(anchor[1]) - self._view_origin[1]) / self._view_ratio
+
+        if zoom == "fit":
+            self._zoom_mode = "fit"
+        else:
+            self._zoom_mode = "manual"
+            self._view_ratio = max(MIN_ZOOM, min(MAX_ZOOM, float(zoom)))
+        self.display_image_on_canvas()
+        if self._tile_renderer is None: # Canvas not laid out yet; the zoom applies once it is
+            return
+
+        # Scroll so the same image point is under the anchor again
+        scroll_w = max(self.canvas.winfo_width(), self._tile_renderer.display_size(self._view_ratio)[0])
+        scroll_h = max(self.canvas.winfo_height(), self._tile_renderer.display_size(self._view_ratio)[1])
+        left = self._view_origin[0] + image_x * self._view_ratio - anchor[0]
+        top = self._view_origin[1] + image_y * self._view_ratio - anchor[1]
+        self.canvas.xview_moveto(max(0.0, left) / scroll_w)
+        self.canvas.yview_moveto(max(0.0, top) / scroll_h)
+        self._schedule_tile_update()
+        self.master.title(f"Image Editor - {int(round(self._view_ratio * 100))}%"
+                          + (f" - {os.path.basename(self.current_file_path)}" if self.current_file_path else ""))
+
+    def zoom_in(self, event=None):
+        self.set_zoom(self._view_ratio * ZOOM_STEP)
+
+    def zoom_out(self, event=None):
+        self.set_zoom(self._view_ratio / ZOOM_STEP)
+
+    def zoom_fit(self, event=None):
+        self.set_zoom("fit")
+
+    def zoom_actual_size(self, event=None):
+        self.set_zoom(1.0)
+
+    def _on_mouse_wheel(self, event):
+        # <MouseWheel> on Windows/macOS (event.delta), buttons 4/5 on X11
+        direction = 1 if (getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0) else -1
+        if event.state & 0x0004: # Control held: zoom around the cursor
+            factor = ZOOM_STEP if direction > 0 else 1 / ZOOM_STEP
+            self.set_zoom(self._view_ratio * factor, anchor=(event.x, event.y))
+        elif event.state & 0x0001: # Shift held: scroll horizontally
+            self.canvas.xview_scroll(-direction * 3, "units")
+        else:
+            self.canvas.yview_scroll(-direction * 3, "units")
 
-            self.tk_image = ImageTk.PhotoImage(img_to_show)
-            self.canvas.delete("all") # Clear previous image
-            self.canvas.create_image(canvas_width // 2, canvas_height // 2, 
-                                     anchor=tk.CENTER, image=self.tk_image)
-            self.canvas.config(scrollregion=self.canvas.bbox(tk.ALL))
+    def _on_pan_start(self, event):
+        self.canvas.scan_mark(event.x, event.y)
 
+    def _on_pan_drag(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+
+    def _on_canvas_configure(self, event):
+        # Window resizes arrive as bursts of <Configure> events; relayout once they settle.
+        if self._resize_job is not None:
+            self.master.after_cancel(self._resize_job)
+        self._resize_job = self.master.after(80, self._on_canvas_resized)
+
+    def _on_canvas_resized(self):
+        self._resize_job = None
+        self.display_image_on_canvas()
+
+    def _mark_dirty(self, box):
+        """
+        Records that the rectangle box = (x1, y1, x2, y2) of image_display changed.
+
+        The affected tiles are re-rendered at the next idle moment, so bursts of edits are coalesced
+        into one repaint.
+        """
+        x1, y1, x2, y2 = (int(v) for v in box)
+        if self._dirty_box is not None:
+            dx1, dy1, dx2, dy2 = self._dirty_box
+            x1, y1, x2, y2 = min(x1, dx1), min(y1, dy1), max(x2, dx2), max(y2, dy2)
+        self._dirty_box = (x1, y1, x2, y2)
+        if not self._dirty_flush_scheduled:
+            self._dirty_flush_scheduled = True
+            self.master.after_idle(self._flush_dirty)
+
+    def _flush_dirty(self):
+        """Re-renders only the visible tiles that show the dirty rectangle."""
+        self._dirty_flush_scheduled = False
+        box, self._dirty_box = self._dirty_box, None
+        if box is None or self._tile_renderer is None:
+            return
+        if self._tile_renderer.image is not self.image_display:
+            self.display_image_on_canvas(force=True) # Image replaced; patching does not apply
+            return
+
+        # Updates the renderer's downscaled levels and drops cached tiles showing the area
+        self._tile_renderer.invalidate(box)
+        for key in list(self._tile_items):
+            old_item, _ = self._tile_items[key]
+            photo = self._tile_renderer.get_tile(self._view_ratio, *key) # Re-rendered only if it was dropped
+            self.canvas.itemconfig(old_item, image=photo)
+            self._tile_items[key] = (old_item, photo)
 
     def set_tool(self, tool_name):
         self.current_tool = tool_name
         print(f"Tool set to: {self.current_tool}")
-        if self.current_tool not in ["crop", "blur_region", "mosaic_region"]: # These tools don't need a temp drawing item
+        if self.current_tool == "move":
+            self.canvas.config(cursor="fleur")
+        elif self.current_tool not in ["crop", "blur_region", "mosaic_region"]: # These tools don't need a temp drawing item
             self.canvas.config(cursor="cross")
         else:
             self.canvas.config(cursor="plus") # Cursor for selection type tools
@@ -208,7 +487,14 @@ class ImageEditor:
                  self.temp_drawing_item = self.canvas.create_line(self.start_x, self.start_y, self.start_x, self.start_y,
                                                                  fill=self.current_color, width=self.line_width, arrow=tk.LAST)
         elif self.current_tool == "pen":
-            self.image_draw = ImageDraw.Draw(self.image_display) # Prepare to draw on Pillow image
+            # The stroke is previewed as a canvas line and becomes an annotation on release
+            self._stroke_points = [self._get_image_coords(self.start_x, self.start_y)]
+            self.temp_drawing_item = self.canvas.create_line(self.start_x, self.start_y, self.start_x, self.start_y,
+                                                             fill=self.current_color, width=max(1, int(self.line_width * self._view_ratio)),
+                                                             capstyle=tk.ROUND, joinstyle=tk.ROUND)
+        elif self.current_tool == "move":
+            x, y = self._get_image_coords(self.start_x, self.start_y)
+            self._moving_index = self.annotations.index_at(x, y, tolerance=4 / self._view_ratio)
 
     def on_canvas_drag(self, event):
         cur_x = self.canvas.canvasx(event.x)
@@ -216,32 +502,32 @@ class ImageEditor:
 
         if self.temp_drawing_item and self.current_tool in ["rectangle", "ellipse", "line", "arrow", "crop", "blur_region", "mosaic_region"]:
             self.canvas.coords(self.temp_drawing_item, self.start_x, self.start_y, cur_x, cur_y)
-        elif self.current_tool == "pen" and self.start_x is not None and self.start_y is not None:
-            # Map canvas coordinates to image coordinates for pen tool
-            img_cur_x, img_cur_y = self._get_image_coords(cur_x, cur_y)
-            img_start_x, img_start_y = self._get_image_coords(self.start_x, self.start_y)
-
-            self.image_draw.line([(img_start_x, img_start_y), (img_cur_x, img_cur_y)],
-                                 fill=self.current_color, width=self.line_width, capstyle="round", joinstyle="round")
-            
-            # Update start_x, start_y with the original canvas coordinates for the next segment of this drag
-            self.start_x, self.start_y = cur_x, cur_y 
-            self.display_image_on_canvas() # Update display
+            if self.current_tool in ("blur_region", "mosaic_region"):
+                # Live preview of the effect; motion events between two idle moments share one render
+                sx, sy = self._get_image_coords(self.start_x, self.start_y)
+                ex, ey = self._get_image_coords(cur_x, cur_y)
+                self._redaction_drag_box = (min(sx, ex), min(sy, ey), max(sx, ex), max(sy, ey))
+                if not self._redaction_preview_scheduled:
+                    self._redaction_preview_scheduled = True
+                    self.master.after_idle(self._update_redaction_preview)
+        elif self.current_tool == "pen" and self.temp_drawing_item:
+            # Only the preview line grows; no pixels are touched until the image is saved
+            self._stroke_points.append(self._get_image_coords(cur_x, cur_y))
+            coords = self.canvas.coords(self.temp_drawing_item)
+            coords.extend((cur_x, cur_y))
+            self.canvas.coords(self.temp_drawing_item, *coords)
+        elif self.current_tool == "move" and self._moving_index is not None and self.start_x is not None:
+            # Drag the annotation's canvas items; the annotation itself is updated on release
+            annotation = self.annotations.annotations[self._moving_index]
+            for item in self._annotation_items.get(id(annotation), ()):
+                self.canvas.move(item, cur_x - self.start_x, cur_y - self.start_y)
+            self._move_total = (self._move_total[0] + cur_x - self.start_x, self._move_total[1] + cur_y - self.start_y)
+            self.start_x, self.start_y = cur_x, cur_y
 
     def on_canvas_release(self, event):
         end_x = self.canvas.canvasx(event.x)
         end_y = self.canvas.canvasy(event.y)
 
-        # Ensure coordinates are relative to original image if scaled
-        # This requires mapping canvas coords back to original image coords
-        # For simplicity here, we'll assume 1:1 or handle scaling during actual drawing
-        # A more robust solution maps these coordinates back to the original image space.
-        
-        # For now, let's assume drawing coordinates are directly applicable to self.image_display
-        # This will be accurate if the image is smaller than or fits the canvas without scaling down.
-        # If scaled down, coordinates need adjustment.
-        # Let's add a helper for coordinate mapping
-        
         # For text tool, we use the start_x, start_y directly for placement.
         if self.current_tool == "text":
             # Text tool uses a single click for position, not drag.
@@ -249,62 +535,40 @@ class ImageEditor:
             sx_text, sy_text = self._get_image_coords(self.start_x, self.start_y)
             text_to_add = simpledialog.askstring("Input", "Enter text:", parent=self.master)
             if text_to_add:
-                try:
-                    # Attempt to load a common font, otherwise default
-                    font = ImageFont.truetype(f"{self.font_family.lower()}.ttf", self.font_size)
-                except IOError:
-                    try:
-                        font = ImageFont.truetype("arial.ttf", self.font_size) # Common fallback
-                    except IOError:
-                        font = ImageFont.load_default() # Absolute fallback
-                
-                self.image_draw = ImageDraw.Draw(self.image_display)
-                self.image_draw.text((sx_text, sy_text), text_to_add, font=font, fill=self.current_color)
-                self.add_history_state()
-                self.display_image_on_canvas()
+                self._add_annotation(Annotation("text", [(sx_text, sy_text)], color=self.current_color, text=text_to_add,
+                                                font_family=self.font_family, font_size=self.font_size))
             self.start_x, self.start_y = None, None # Reset after text is placed
             return # Text tool action is complete on press for this implementation
 
+        if self.current_tool == "move":
+            if self._moving_index is not None and self._move_total != (0.0, 0.0):
+                annotation = self.annotations.annotations[self._moving_index]
+                before = annotation.copy()
+                annotation.translate(self._move_total[0] / self._view_ratio, self._move_total[1] / self._view_ratio)
+                self.history.record_delta(AnnotationDelta(self.annotations, self._moving_index, before, annotation))
+            self._moving_index = None
+            self._move_total = (0.0, 0.0)
+            self.start_x, self.start_y = None, None
+            return
+
         # For other tools that use drag:
         sx, sy = self._get_image_coords(self.start_x, self.start_y)
         ex, ey = self._get_image_coords(end_x, end_y)
 
 
         if self.current_tool in ["rectangle", "ellipse", "line", "arrow"]:
-            # Ensure sx < ex and sy < ey for rects/ovals for consistent drawing
-            # However, for lines/arrows, the original start/end points matter for direction
-            self.image_draw = ImageDraw.Draw(self.image_display)
-            if self.current_tool == "rectangle":
-                self.image_draw.rectangle([min(sx,ex), min(sy,ey), max(sx,ex), max(sy,ey)], outline=self.current_color, width=self.line_width)
-            elif self.current_tool == "ellipse":
-                self.image_draw.ellipse([min(sx,ex), min(sy,ey), max(sx,ex), max(sy,ey)], outline=self.current_color, width=self.line_width)
-            elif self.current_tool == "line":
-                 # Use original mapped start/end for lines to preserve direction
-                sx_orig, sy_orig = self._get_image_coords(self.start_x, self.start_y)
-                ex_orig, ey_orig = self._get_image_coords(end_x, end_y)
-                self.image_draw.line([sx_orig, sy_orig, ex_orig, ey_orig], fill=self.current_color, width=self.line_width)
-            elif self.current_tool == "arrow":
-                sx_orig, sy_orig = self._get_image_coords(self.start_x, self.start_y)
-                ex_orig, ey_orig = self._get_image_coords(end_x, end_y)
-                self.image_draw.line([sx_orig, sy_orig, ex_orig, ey_orig], fill=self.current_color, width=self.line_width)
-                self._draw_arrowhead(self.image_draw, sx_orig, sy_orig, ex_orig, ey_orig, self.current_color, self.line_width)
-
+            # Shapes are kept as vector annotations; the start/end order matters for line and arrow direction
             if self.temp_drawing_item:
                 self.canvas.delete(self.temp_drawing_item)
                 self.temp_drawing_item = None
-            self.add_history_state()
-            self.display_image_on_canvas()
+            self._add_annotation(Annotation(self.current_tool, [(sx, sy), (ex, ey)], color=self.current_color, width=self.line_width))
         
         elif self.current_tool == "pen":
-            # Pen drawing happens in on_canvas_drag, just finalize history
-            # Need to ensure sx, sy, ex, ey are mapped for pen as well if we want to use the _get_image_coords
-            # The current pen tool draws directly using canvas coords scaled in on_canvas_drag.
-            # For consistency, pen should also use _get_image_coords.
-            # However, pen draws segments, so this release might just be finalization.
-            if hasattr(self, 'image_draw'): # Ensure drawing was initiated by pen tool
-                del self.image_draw # Finalize drawing object for this continuous stroke
-                self.add_history_state()
-                # display_image_on_canvas() was called during drag
+            if self.temp_drawing_item:
+                self.canvas.delete(self.temp_drawing_item)
+                self.temp_drawing_item = None
+                self._add_annotation(Annotation("pen", self._stroke_points, color=self.current_color, width=self.line_width))
+                self._stroke_points = []
 
         elif self.current_tool == "crop":
             if self.temp_drawing_item:
@@ -315,94 +579,182 @@ class ImageEditor:
             crop_x2, crop_y2 = max(sx, ex), max(sy, ey)
 
             if crop_x1 < crop_x2 and crop_y1 < crop_y2: # Valid crop area
-                self.image_display = self.image_display.crop((crop_x1, crop_y1, crop_x2, crop_y2))
-                self.add_history_state()
-                self.display_image_on_canvas()
+                self.image_display = image_ops.crop(self.image_display, (crop_x1, crop_y1, crop_x2, crop_y2))
+                # Annotations keep their place on the image content
+                self.annotations.translate(-crop_x1, -crop_y1)
+                self.history.record(self.image_display, extra=[LayerTranslateDelta(self.annotations, -crop_x1, -crop_y1)])
+                self.display_image_on_canvas(force=True)
 
         elif self.current_tool == "blur_region" or self.current_tool == "mosaic_region":
             if self.temp_drawing_item:
                 self.canvas.delete(self.temp_drawing_item)
                 self.temp_drawing_item = None
+            self._clear_redaction_preview()
             
             # Use min/max for region box
             reg_x1, reg_y1 = min(sx, ex), min(sy, ey)
             reg_x2, reg_y2 = max(sx, ex), max(sy, ey)
 
             if reg_x1 < reg_x2 and reg_y1 < reg_y2:
-                region_coords = (reg_x1, reg_y1, reg_x2, reg_y2)
-                
-                # Ensure region coords are within image bounds
-                img_w, img_h = self.image_display.size
-                region_coords = (max(0, region_coords[0]), max(0, region_coords[1]),
-                                 min(img_w, region_coords[2]), min(img_h, region_coords[3]))
-
-                if region_coords[0] < region_coords[2] and region_coords[1] < region_coords[3]: # Check again after clamping
-                    crop_region = self.image_display.crop(region_coords)
-                    
-                    if self.current_tool == "blur_region":
-                        processed_region = crop_region.filter(ImageFilter.GaussianBlur(radius=5))
-                    else: # mosaic_region
-                        pixel_size = max(5, int(min(crop_region.width, crop_region.height) * 0.1)) # Mosaic pixel size relative to region
-                        if crop_region.width < pixel_size or crop_region.height < pixel_size : # region too small for mosaic
-                             processed_region = crop_region.filter(ImageFilter.GaussianBlur(radius=2)) # fallback to blur
-                        else:
-                            small = crop_region.resize(
-                                (max(1, crop_region.width // pixel_size), max(1, crop_region.height // pixel_size)), 
-                                Image.Resampling.BILINEAR
-                            )
-                            processed_region = small.resize(crop_region.size, Image.Resampling.NEAREST)
-                    
-                    self.image_display.paste(processed_region, region_coords)
-                    self.add_history_state()
-                    self.display_image_on_canvas()
+                method = self._redaction_method()
+                self._pending_redactions.append(((reg_x1, reg_y1, reg_x2, reg_y2), method, self.redaction_strength[method]))
+                if event.state & 0x0001: # Shift held: queue the region; Enter (or a release without Shift) applies all
+                    self._redraw_pending_redactions()
                 else:
-                    print("Selected region for effect is outside image bounds or too small after clamping.")
+                    self.apply_pending_redactions()
             else:
                 print("Selected region for effect has zero width or height.")
         
         self.start_x, self.start_y = None, None # Reset for next action
 
+
+    def _redaction_method(self):
+        """The redaction.py method used by the current tool."""
+        return "gaussian" if self.current_tool == "blur_region" else "mosaic"
+
+    def choose_redaction_strength(self):
+        method = self._redaction_method() if self.current_tool in ("blur_region", "mosaic_region") else "mosaic"
+        label = "Blur radius" if method == "gaussian" else "Mosaic block size"
+        strength = simpledialog.askinteger("Strength", f"{label} in pixels (e.g., 2-64):",
+                                           parent=self.master, minvalue=1, maxvalue=256,
+                                           initialvalue=self.redaction_strength[method])
+        if strength:
+            self.redaction_strength[method] = strength
+            # Queued regions of this method take the new strength, in the preview and when applied
+            self._pending_redactions = [(box, queued_method, strength if queued_method == method else queued_strength)
+                                        for box, queued_method, queued_strength in self._pending_redactions]
+            self._redraw_pending_redactions()
+            print(f"{label} set to: {strength}")
+
+    def _render_redaction_preview(self, image_box, method, strength):
+        """
+        Renders the effect over image_box at the current zoom. Works on the downscaled view, so the
+        preview costs the same however large the region is in the full image.
+
+        Returns:
+            tuple: (PhotoImage, canvas x, canvas y), or None if the box is not on the image.
+        """
+        zoom = self._view_ratio
+        display_box = (image_box[0] * zoom, image_box[1] * zoom, image_box[2] * zoom, image_box[3] * zoom)
+        try:
+            view = self._tile_renderer.render_region(zoom, display_box)
+        except ValueError:
+            return None
+        # Scale the strength with the zoom so the preview looks like the final result
+        redacted = redaction.redacted_copy(view, method, max(1, int(round(strength * zoom))))
+        canvas_x, canvas_y = self._to_canvas(max(0, int(display_box[0])) / zoom, max(0, int(display_box[1])) / zoom)
+        return ImageTk.PhotoImage(redacted), canvas_x, canvas_y
+
+    def _update_redaction_preview(self):
+        """Shows the effect over the rectangle being dragged (scheduled at idle from on_canvas_drag)."""
+        self._redaction_preview_scheduled = False
+        if self._redaction_drag_box is None or self._tile_renderer is None:
+            return
+        method = self._redaction_method()
+        x1, y1, x2, y2 = self._redaction_drag_box
+        rendered = None
+        if x1 < x2 and y1 < y2:
+            rendered = self._render_redaction_preview(self._redaction_drag_box, method, self.redaction_strength[method])
+        if rendered is None:
+            self.canvas.delete("redaction_drag")
+            self._redaction_preview_photo = None
+            return
+        photo, canvas_x, canvas_y = rendered
+        self.canvas.delete("redaction_drag")
+        self.canvas.create_image(canvas_x, canvas_y, anchor=tk.NW, image=photo, tags=("redaction_drag",))
+        if self.temp_drawing_item:
+            self.canvas.tag_raise(self.temp_drawing_item) # Keep the outline visible above the preview
+        self._redaction_preview_photo = photo # Keep a reference; Tk does not
+
+    def _clear_redaction_preview(self):
+        self._redaction_drag_box = None
+        self.canvas.delete("redaction_drag")
+        self._redaction_preview_photo = None
+
+    def _redraw_pending_redactions(self):
+        """Shows previews (with a dashed outline) of the regions queued with Shift."""
+        self.canvas.delete("redaction_pending")
+        self._pending_redaction_photos = []
+        for box, method, strength in self._pending_redactions:
+            rendered = self._render_redaction_preview(box, method, strength) # What apply_pending_redactions will use
+            if rendered is not None:
+                photo, canvas_x, canvas_y = rendered
+                self.canvas.create_image(canvas_x, canvas_y, anchor=tk.NW, image=photo, tags=("redaction_pending",))
+                self._pending_redaction_photos.append(photo)
+            self.canvas.create_rectangle(*self._to_canvas(box[0], box[1]), *self._to_canvas(box[2], box[3]),
+                                         outline=self.current_color, dash=(4, 2), tags=("redaction_pending",))
+
+    def apply_pending_redactions(self, event=None):
+        """Applies all queued blur/mosaic regions to the image as a single undo step."""
+        if not self._pending_redactions:
+            return
+        changed = []
+        # Regions sharing a method and strength are processed in one call
+        groups = {}
+        for box, method, strength in self._pending_redactions:
+            groups.setdefault((method, strength), []).append(box)
+        for (method, strength), boxes in groups.items():
+            changed.extend(redaction.redact_regions(self.image_display, boxes, method, strength))
+        self.cancel_pending_redactions()
+        if changed:
+            self.add_history_state(changed)
+            for box in changed:
+                self._mark_dirty(box)
+        else:
+            print("Selected region for effect is outside image bounds or too small after clamping.")
+
+    def auto_redact_sensitive_text(self):
+        """
+        Finds emails, tokens and IP addresses with OCR (see auto_redact) on a background thread and
+        queues mosaic regions over them. Review them, then press Enter to apply or Escape to discard.
+        """
+        try:
+            patterns = auto_redact.compile_patterns()
+        except ValueError as e:
+            messagebox.showerror("Auto Redact", str(e), parent=self.master)
+            return
+        snapshot = self.image_display.copy() # Edits made while OCR runs must not race with it
+        self.master.title("Image Editor - Looking for sensitive text...")
+
+        def work():
+            matches = auto_redact.find_sensitive_regions(snapshot, patterns)
+            self.dispatcher.post(self._on_auto_redact_done, matches)
+
+        threading.Thread(target=work, name="auto-redact", daemon=True).start()
+
+    def _on_auto_redact_done(self, matches):
+        self.master.title(f"Image Editor - {os.path.basename(self.current_file_path)}" if self.current_file_path else "Image Editor")
+        if matches is None:
+            messagebox.showerror("Auto Redact", "OCR failed. Is Tesseract installed?", parent=self.master)
+            return
+        if not matches:
+            messagebox.showinfo("Auto Redact", "No sensitive text found.", parent=self.master)
+            return
+        method = config_manager.get_setting("auto_redact", "method", "mosaic")
+        if method not in self.redaction_strength:
+            self.redaction_strength[method] = redaction.default_strength(method)
+        for match in matches:
+            self._pending_redactions.append((match["box"], method, self.redaction_strength[method]))
+        self._redraw_pending_redactions()
+        print(f"Auto Redact: {len(matches)} region(s) queued; press Enter to apply or Escape to discard.")
+
+    def cancel_pending_redactions(self, event=None):
+        self._pending_redactions = []
+        self.canvas.delete("redaction_pending")
+        self._pending_redaction_photos = []
+
     def _get_image_coords(self, canvas_x, canvas_y):
         """Converts canvas coordinates to image_display coordinates."""
-        if not self.image_display or not self.tk_image or self.canvas.winfo_width() < 1 or self.canvas.winfo_height() < 1:
+        if not self.image_display or self._tile_renderer is None:
             # Canvas not ready or no image
             return int(canvas_x), int(canvas_y)
 
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        
         img_disp_w, img_disp_h = self.image_display.size # Current dimensions of the image being edited
-        
-        # Calculate the scaling ratio used for display
-        ratio = 1.0
-        if img_disp_w > 0 and img_disp_h > 0 : # Avoid division by zero
-             ratio = min(canvas_width / img_disp_w, canvas_height / img_disp_h)
-        
-        displayed_img_w_on_canvas = img_disp_w
-        displayed_img_h_on_canvas = img_disp_h
-
-        if ratio < 1.0: # Image was scaled down to fit canvas
-            displayed_img_w_on_canvas = int(img_disp_w * ratio)
-            displayed_img_h_on_canvas = int(img_disp_h * ratio)
-        # If ratio >= 1.0, image is displayed at its actual size or smaller than canvas, so no scaling down of image,
-        # but it's still centered.
-
-        # Top-left corner of the (potentially scaled) image on the canvas (it's centered)
-        img_canvas_origin_x = (canvas_width - displayed_img_w_on_canvas) // 2
-        img_canvas_origin_y = (canvas_height - displayed_img_h_on_canvas) // 2
-
-        # Click position relative to the top-left of the image *as displayed on canvas*
-        relative_x_on_canvas = canvas_x - img_canvas_origin_x
-        relative_y_on_canvas = canvas_y - img_canvas_origin_y
-        
-        # Convert these relative canvas coordinates to actual image_display coordinates
-        if ratio < 1.0: # Scaled down
-            actual_x = relative_x_on_canvas / ratio
-            actual_y = relative_y_on_canvas / ratio
-        else: # Displayed at original size (or canvas is larger)
-            actual_x = relative_x_on_canvas
-            actual_y = relative_y
-            
+
+        # Position relative to the preview's top-left corner, scaled back to image pixels
+        actual_x = (canvas_x - self._view_origin[0]) / self._view_ratio
+        actual_y = (canvas_y - self._view_origin[1]) / self._view_ratio
+
         # Clamp to the boundaries of self.image_display
         actual_x = max(0, min(actual_x, img_disp_w - 1))
         actual_y = max(0, min(actual_y, img_disp_h - 1))
@@ -410,133 +762,172 @@ class ImageEditor:
         return int(actual_x), int(actual_y)
 
 
-    def _draw_arrowhead(self, draw, x1, y1, x2, y2, color, width):
-        """Draws an arrowhead on the line from (x1,y1) to (x2,y2)."""
-        # Calculate angle of the line
-        import math
-        # Ensure x1, y1 is start, x2, y2 is end for correct arrowhead direction
-        angle = math.atan2(y2 - y1, x2 - x1) # Note: y is often inverted in graphics vs math
-        
-        # Arrowhead properties
-        arrow_length = 8 + self.line_width * 2.5 # Adjusted for better proportion
-        arrow_degrees = 0.4 # Radians, approx 22.5 degrees for each wing
-
-        # Arrowhead wing points
-        # Point 1
-        px1 = x2 - arrow_length * math.cos(angle - arrow_degrees)
-        py1 = y2 - arrow_length * math.sin(angle - arrow_degrees)
-        # Point 2
-        px2 = x2 - arrow_length * math.cos(angle + arrow_degrees)
-        py2 = y2 - arrow_length * math.sin(angle + arrow_degrees)
-        
-        # Draw filled polygon for arrowhead
-        draw.polygon([(x2, y2), (px1, py1), (px2, py2)], fill=self.current_color) # Use self.current_color if 'color' param is not specific
+    def _add_annotation(self, annotation):
+        """Adds annotation to the layer, shows it on the canvas and records it for undo."""
+        index = self.annotations.add(annotation)
+        self._draw_annotation_items(annotation)
+        self.history.record_delta(AnnotationDelta(self.annotations, index, None, annotation))
+
+    def _to_canvas(self, x, y):
+        """Converts image_display coordinates to canvas coordinates (inverse of _get_image_coords)."""
+        return self._view_origin[0] + x * self._view_ratio, self._view_origin[1] + y * self._view_ratio
+
+    def _draw_annotation_items(self, annotation):
+        """Creates the canvas items showing annotation at the current view scale."""
+        ratio = self._view_ratio
+        width = max(1, int(round(annotation.width * ratio)))
+        coords = []
+        for x, y in annotation.points:
+            coords.extend(self._to_canvas(x, y))
+        if annotation.kind == "text":
+            # Use the installed family the image will be rendered with, so the preview matches the result
+            family = fonts.resolve_family(annotation.font_family) or annotation.font_family
+            font = (family, -max(1, int(round(annotation.font_size * ratio)))) # Negative size = pixels
+            items = [self.canvas.create_text(coords[0], coords[1], text=annotation.text or "", fill=annotation.color,
+                                             font=font, anchor=tk.NW)]
+        elif annotation.kind == "pen":
+            if len(coords) == 2:
+                coords = coords * 2 # A single click draws a dot
+            items = [self.canvas.create_line(*coords, fill=annotation.color, width=width,
+                                             capstyle=tk.ROUND, joinstyle=tk.ROUND)]
+        elif annotation.kind == "rectangle":
+            items = [self.canvas.create_rectangle(*coords[:4], outline=annotation.color, width=width)]
+        elif annotation.kind == "ellipse":
+            items = [self.canvas.create_oval(*coords[:4], outline=annotation.color, width=width)]
+        else: # line, arrow
+            items = [self.canvas.create_line(*coords[:4], fill=annotation.color, width=width)]
+            if annotation.kind == "arrow":
+                (sx, sy), (ex, ey) = annotation.points[0], annotation.points[-1]
+                head = [c for point in arrowhead_points(sx, sy, ex, ey, annotation.width) for c in self._to_canvas(*point)]
+                items.append(self.canvas.create_polygon(*head, fill=annotation.color, outline=""))
+        for item in items:
+            self.canvas.addtag_withtag("annotation", item)
+        self._annotation_items[id(annotation)] = items
+
+    def _redraw_annotations(self):
+        """Recreates all annotation canvas items, e.g. after the view scale changed or an undo."""
+        self.canvas.delete("annotation")
+        self._annotation_items = {}
+        for annotation in self.annotations:
+            self._draw_annotation_items(annotation)
+
+    def _flattened_image(self):
+        """Returns a copy of the image with all annotations rasterized onto it, for saving and exporting."""
+        return self.annotations.render_onto(self.image_display)
+
+    def export_annotations(self):
+        """Saves the annotation layer to a JSON sidecar file (see annotations.apply_annotations)."""
+        initial = annotations_sidecar_path(self.current_file_path) if self.current_file_path else "annotations.json"
+        file_path = filedialog.asksaveasfilename(
+            initialfile=os.path.basename(initial),
+            initialdir=os.path.dirname(initial) or os.getcwd(),
+            defaultextension=".json",
+            filetypes=[("Annotation files", "*.json"), ("All files", "*.*")],
+            parent=self.master
+        )
+        if file_path:
+            try:
+                self.annotations.save(file_path, image_size=self.image_display.size)
+                messagebox.showinfo("Saved", f"Annotations saved as {file_path}", parent=self.master)
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not save annotations: {e}", parent=self.master)
+
+    def import_annotations(self):
+        """Adds the annotations from a sidecar file on top of the current ones, as one undo step."""
+        initial = annotations_sidecar_path(self.current_file_path) if self.current_file_path else ""
+        file_path = filedialog.askopenfilename(
+            initialdir=os.path.dirname(initial) or os.getcwd(),
+            filetypes=[("Annotation files", "*.json"), ("All files", "*.*")],
+            parent=self.master
+        )
+        if not file_path:
+            return
+        try:
+            loaded = AnnotationLayer.load(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not load annotations: {e}", parent=self.master)
+            return
+        deltas = []
+        for annotation in loaded:
+            index = self.annotations.add(annotation)
+            self._draw_annotation_items(annotation)
+            deltas.append(AnnotationDelta(self.annotations, index, None, annotation))
+        if deltas:
+            self.history.record_delta(CompoundDelta(deltas))
 
 
-    def add_history_state(self):
-        # If we undo and then make a new change, clear the "redo" history
-        if self.history_index < len(self.history) - 1:
-            self.history = self.history[:self.history_index + 1]
-        
-        # Deep copy the current state of image_display for history
-        current_image_state = self.image_display.copy()
-        self.history.append(current_image_state)
-        self.history_index += 1
-        
-        # Optional: Limit history size to prevent excessive memory usage
-        # if len(self.history) > 20:
-        #     self.history = self.history[-20:]
-        #     if self.history_index > 19: # Adjust index if truncated from beginning
-        #         self.history_index = 19 
+    def _start_journal(self):
+        if not config_manager.get_setting("editor", "autosave", True):
+            return
+        self.journal = autosave.AutosaveJournal()
+        # image_original is never modified, so the writer thread can encode it without a copy
+        self.journal.start(self.image_original, self._journal_start_annotations, self.current_file_path)
+
+    def _journal_steps(self, steps):
+        """EditHistory listener: appends each change to the autosave journal."""
+        if self.journal is None:
+            self._start_journal()
+        if self.journal is not None:
+            self.journal.append(steps)
+
+    def is_dirty(self):
+        """True if the image or annotations differ from what was last saved (or opened). O(1)."""
+        return self.history.state_id != self._saved_state_id
+
+    def add_history_state(self, box=None):
+        """
+        Records the latest edit for undo. box is the (x1, y1, x2, y2) area the edit touched; it keeps
+        recording cheap on large images. Without it, the whole image is compared to find the change.
+        """
+        # Recording after an undo discards the "redo" states; the oldest states are dropped
+        # once the history exceeds editor.history_memory_mb.
+        self.history.record(self.image_display, box)
 
 
     def undo(self, event=None):
-        if self.history_index > 0:
-            self.history_index -= 1
-            self.image_display = self.history[self.history_index].copy()
-            self.display_image_on_canvas()
-            print(f"Undo performed. History index: {self.history_index}")
+        result = self.history.undo(self.image_display)
+        if result is not None:
+            self._show_history_result(result)
+            print(f"Undo performed. History: {self.history.get_status()}")
         else:
             print("Nothing to undo.")
             messagebox.showinfo("Undo", "Nothing further to undo.", parent=self.master)
 
 
     def redo(self, event=None):
-        if self.history_index < len(self.history) - 1:
-            self.history_index += 1
-            self.image_display = self.history[self.history_index].copy()
-            self.display_image_on_canvas()
-            print(f"Redo performed. History index: {self.history_index}")
+        result = self.history.redo(self.image_display)
+        if result is not None:
+            self._show_history_result(result)
+            print(f"Redo performed. History: {self.history.get_status()}")
         else:
             print("Nothing to redo.")
             messagebox.showinfo("Redo", "Nothing further to redo.", parent=self.master)
 
+    def _show_history_result(self, result):
+        image, box = result
+        if box is None: # Whole image replaced (e.g. crop undone)
+            self.image_display = image
+            self.display_image_on_canvas(force=True) # Also redraws the annotations
+            return
+        if box: # Patched in place
+            self._mark_dirty(box)
+        self._redraw_annotations()
 
-    def copy_to_clipboard(self):
-        # This is a simplified version. True image clipboard support is complex.
-        # Option 1: Use a library that supports images (e.g., specific Qt bindings if using PyQt/PySide)
-        # Option 2: Save to a temp file and copy file path (not ideal)
-        # Option 3: For Tkinter, try to use its clipboard capabilities for images if possible.
-        # For now, a message or a very basic attempt.
-        try:
-            import io
-            import pyperclip # Added to requirements
-
-            # Convert Pillow image to bytes in PNG format
-            image_bytes = io.BytesIO()
-            self.image_display.save(image_bytes, format="PNG")
-            image_data = image_bytes.getvalue() # This is raw PNG data
-
-            # Pyperclip is primarily for text.
-            # For cross-platform image clipboard, it's non-trivial.
-            # A common workaround is to inform the user the image is "copied"
-            # and have a mechanism for pasting if the app also controlled that.
-            # Or use platform specific tools.
-            
-            # Let's try Tkinter's clipboard for image data if possible.
-            # This is not universally supported for images across all OS versions / Tk versions.
-            # Tkinter's clipboard append/clear expects string data.
-            # A more robust way involves platform specific APIs or larger libraries like Kivy, Qt.
-
-            # Fallback: Inform user, or copy a representation.
-            # For this exercise, let's try to use pyperclip to copy a message
-            # as direct image copy is too complex for a single tool call update.
-            
-            # A more advanced Tkinter approach might involve:
-            # self.master.clipboard_clear()
-            # self.master.clipboard_append(image_data, type='IMAGE') # This is hypothetical, type='IMAGE' is not standard
-            # A common way is to base64 encode the image and put that on clipboard,
-            # then the receiving app decodes it.
-
-            # For now, let's save to a temporary file and copy the path as a placeholder for a more robust solution.
-            import tempfile
-            import os
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            self.image_display.save(temp_file.name)
-            temp_file.close() # Close it so pyperclip can access if needed, path still valid
-            
-            pyperclip.copy(temp_file.name) # Copies the file path to clipboard
-            messagebox.showinfo("Copied to Clipboard", f"Image saved to temporary path and path copied to clipboard: {temp_file.name}\n(Note: This is a file path, not the image data itself for universal pasting)", parent=self.master)
-            # Ideally, the temp file should be cleaned up later.
-
-        except ImportError:
-            messagebox.showwarning("Clipboard Error", "Pyperclip library not found. Please install it (`pip install pyperclip`) to use clipboard functions.", parent=self.master)
-        except Exception as e:
-            messagebox.showerror("Clipboard Error", f"Could not copy to clipboard: {e}", parent=self.master)
 
+    def copy_to_clipboard(self):
+        """
+        Puts the image (with annotations) on the system clipboard, in memory. On X11 it is encoded
+        only when an application pastes it (see clipboard).
+        """
+        used = clipboard.copy_image(self._flattened_image()) # A fresh copy; later edits do not affect it
+        if used is None:
+            messagebox.showerror("Clipboard Error", "Could not copy the image to the clipboard. On Linux, install python-xlib, xclip or wl-clipboard.", parent=self.master)
+            return
+        self.master.title("Image Editor - Copied to clipboard" + (f" ({os.path.basename(self.current_file_path)})" if self.current_file_path else ""))
 
     def save_image(self):
         if self.current_file_path and self.saved_once: # If previously saved and path known
-            try:
-                # Ensure RGB if saving as JPEG (common requirement)
-                image_to_save = self.image_display
-                if self.current_file_path.lower().endswith(('.jpg', '.jpeg')):
-                    if image_to_save.mode == 'RGBA' or image_to_save.mode == 'P':
-                        image_to_save = image_to_save.convert('RGB')
-                image_to_save.save(self.current_file_path)
-                messagebox.showinfo("Saved", f"Image saved to {self.current_file_path}", parent=self.master)
-            except Exception as e:
-                messagebox.showerror("Error", f"Could not save image: {e}", parent=self.master)
+            self._save_to(self.current_file_path)
         else:
             # If not saved before, or path not known, trigger "Save As"
             self.save_as_image()
@@ -558,130 +949,76 @@ class ImageEditor:
             parent=self.master
         )
         if file_path:
-            try:
-                image_to_save = self.image_display
-                # Handle transparency for formats that don't support alpha (e.g., JPEG, BMP)
-                file_ext = file_path.lower().split('.')[-1]
-                if file_ext in ['jpg', 'jpeg', 'bmp']:
-                    if image_to_save.mode == 'RGBA' or image_to_save.mode == 'P':
-                        # Create a white background image
-                        background = Image.new('RGB', image_to_save.size, (255, 255, 255))
-                        background.paste(image_to_save, mask=image_to_save.split()[3] if image_to_save.mode == 'RGBA' else None) # Paste using alpha channel as mask
-                        image_to_save = background
-                    elif image_to_save.mode == 'LA': # Luminance + Alpha
-                        background = Image.new('L', image_to_save.size, 255) # White background for grayscale
-                        background.paste(image_to_save, mask=image_to_save.split()[1])
-                        image_to_save = background.convert('RGB') # JPEGs are typically RGB
-                
-                image_to_save.save(file_path)
-                self.current_file_path = file_path # Update current path
-                self.saved_once = True # Mark as saved
-                self.master.title(f"Image Editor - {os.path.basename(file_path)}")
-                messagebox.showinfo("Saved", f"Image saved as {file_path}", parent=self.master)
-            except Exception as e:
-                messagebox.showerror("Error", f"Could not save image: {e}", parent=self.master)
+            self._save_to(file_path)
+
+    def _save_to(self, file_path):
+        """
+        Encodes and writes the image on the shared writer pool so the editor stays responsive.
+        Format conversion (e.g. flattening transparency for JPEG/BMP), JPEG quality and PNG
+        compression level follow the output settings (see image_io.save_image).
+        """
+        # Snapshot the pixels: edits made while the file is being encoded must not end up in it.
+        image_to_save = self._flattened_image()
+        self._saving_state_id = self.history.state_id
+        self._save_pending = True
+        self.master.title(f"Image Editor - Saving {os.path.basename(file_path)}...")
+        image_io.get_writer_pool().submit(image_to_save, file_path,
+                                          on_done=self._on_save_done,
+                                          dispatcher=self.dispatcher)
+
+    def _on_save_done(self, file_path, error):
+        self._save_pending = False
+        if error is not None:
+            self._close_after_save = False # Stay open with the edits (and their journal) intact
+            self.master.title(f"Image Editor - {os.path.basename(self.current_file_path)}" if self.current_file_path else "Image Editor")
+            messagebox.showerror("Error", f"Could not save image: {error}", parent=self.master)
+            return
+        self.current_file_path = file_path # Update current path
+        self.saved_once = True # Mark as saved
+        self._saved_state_id = self._saving_state_id
+        if self.journal is not None: # Start the journal over from the saved state so it stays small
+            self.journal.rebase(self.image_display.copy(), self.annotations, file_path)
+        if self._close_after_save:
+            self._close()
+            return
+        self.master.title(f"Image Editor - {os.path.basename(file_path)}")
+        messagebox.showinfo("Saved", f"Image saved as {file_path}", parent=self.master)
     
     def on_close(self):
-        # Check if the current image_display state is different from the last saved state in history
-        # or if it's different from the initial state and never saved.
-        
-        is_modified_since_last_save = True # Assume modified unless proven otherwise
-        if self.saved_once and self.history_index < len(self.history):
-            # Compare current image_display with the version that was last explicitly saved.
-            # This is tricky because "Save" updates current_file_path but doesn't necessarily mean
-            # the current history[history_index] is that saved state if user undid after save.
-            # A simpler check: is image_display different from history[history_index]?
-            # And was it saved at least once?
-            # A more robust check would involve comparing self.image_display to the actual file content
-            # or a copy made at the time of saving.
-
-            # Simpler: If history_index points to a state that is different from image_display, it's "dirty".
-            # Or if (self.history_index == len(self.history) -1) means no undo since last change.
-            
-            # If saved_once is true, we can assume the current file_path holds a saved version.
-            # The question is whether self.image_display is *that* version.
-            # For simplicity: if there are changes (history_index > 0 for initial load, or more states)
-            # and the current image is not identical to the last state in history (if any undos happened)
-            # or not identical to the original image if no saves occurred.
-
-        # Simplified check: if current image is different from the one at history_index, it means changes were made
-        # and potentially not saved in their current state.
-        # Or, if current image is different from the original image and we haven't saved at all.
-        
-        # Let's check against the *latest* state in history (self.history[-1])
-        # If self.image_display is not self.history[self.history_index], it means user has undone to a previous state.
-        # If self.image_display *is* self.history[self.history_index] but this is different from self.history[0] (original)
-        # and not self.saved_once, then it's unsaved.
-        
-        # A practical approach:
-        # If the image_display is different from what's at self.current_file_path (if it exists and saved_once)
-        # Or if not saved_once and image_display is different from initial image (history[0])
-        
-        # Current check:
-        # 1. Has more than the initial state in history? (len(self.history) > 1)
-        # 2. Is the current self.image_display different from the very first image loaded (self.history[0])?
-        # This covers "made any change at all".
-        made_any_change = False
-        if len(self.history) > 0: # Should always be true after init
-             if self.image_display.tobytes() != self.history[0].tobytes():
-                 made_any_change = True
-
-        if made_any_change:
-            # Now, are these changes saved?
-            # If not saved_once, then definitely unsaved changes.
-            # If saved_once, are the current changes *the ones* that were saved?
-            # This is hard to track perfectly without storing a pristine copy of the last saved version.
-            # A common heuristic: if made_any_change and current_file_path exists,
-            # assume changes after the last save might exist.
-            
-            # Let's use a flag: self.is_dirty
-            # Set self.is_dirty = True after any modification.
-            # Set self.is_dirty = False after save/save_as.
-            # (This needs adding self.is_dirty logic throughout)
-
-            # For now, using existing logic:
-            # If (there are changes from original) AND ( (never saved) OR (current display is not the latest history item, implying undo after last op) )
-            # The original logic is:
-            # (len(self.history) > 1 AND self.image_display.tobytes() != self.history[0].tobytes()) : This means "modified from original"
-            # AND
-            # (not self.saved_once OR self.image_display.tobytes() != self.history[self.history_index].tobytes()):
-            #    If not saved_once, it's true.
-            #    If saved_once, it's true if current display is not what current history index points to (e.g. undo after change).
-            # This logic seems mostly fine for prompting.
-
-            prompt_needed = False
-            if made_any_change: # Modified from original
-                if not self.saved_once:
-                    prompt_needed = True
-                else:
-                    # If saved, are the current changes committed to file?
-                    # This requires comparing self.image_display to the file at self.current_file_path
-                    # which is too slow for on_close.
-                    # A simpler proxy: if the current image_display is not the *latest* possible state in history,
-                    # it implies an undo or some operation made it different from the tip of history.
-                    # Or, if any operation happened since the last save.
-                    # The current logic `self.image_display.tobytes() != self.history[self.history_index].tobytes()`
-                    # is problematic because image_display *is* usually history[history_index].
-                    # We need a flag like `changes_since_last_save`.
-
-                    # Let's assume if made_any_change and saved_once, we should still ask,
-                    # unless we are certain the current state IS the saved state.
-                    # The safest is to ask if any changes were made since the last save.
-                    # For now, if `made_any_change` is true, we'll ask if not sure.
-                    # This might lead to asking even if saved and no new changes.
-                    # To improve: add `self.dirty = True` on edits, `self.dirty = False` on save.
-                    prompt_needed = True # Over-prompting is safer than data loss.
-
-            if prompt_needed:
-                if messagebox.askyesno("Quit", "You have unsaved changes. Do you want to save before quitting?", parent=self.master):
-                    self.save_image() # This will trigger save_as if not saved before or path unknown
-            
+        if self._close_after_save:
+            return # Already closing once the pending save is written
+        if self.is_dirty():
+            if messagebox.askyesno("Quit", "You have unsaved changes. Do you want to save before quitting?", parent=self.master):
+                self.save_image() # This will trigger save_as if not saved before or path unknown
+                # The write runs on the writer pool: keep the window and the autosave journal until
+                # it has succeeded (see _on_save_done). A cancelled "Save As" keeps the editor open.
+                if self._save_pending:
+                    self._close_after_save = True
+                return
+        self._close()
+
+    def _close(self):
+        if self.journal is not None:
+            self.journal.stop(discard=True) # A clean close leaves nothing to recover
         self.master.destroy()
 
-def open_editor_with_image(image_path_or_object):
-    """Helper function to create a root window and launch the editor."""
-    root = tk.Tk()
-    editor_app = ImageEditor(root, image_path_or_object)
+def open_editor_with_image(image_path_or_object, master=None, **editor_options):
+    """
+    Helper function to create a window and launch the editor.
+
+    Args:
+        image_path_or_object (str or PIL.Image.Image): Image to edit.
+        master (tk.Misc, optional): Existing Tk root. When given, the editor opens in a Toplevel of it and
+                                    this function returns immediately (the caller's mainloop drives it).
+                                    Otherwise a new Tk root is created and its mainloop runs until the
+                                    editor is closed.
+        **editor_options: Passed to ImageEditor (annotation_layer, source_path, recovered).
+
+    Returns:
+        ImageEditor: The editor instance.
+    """
+    root = tk.Tk() if master is None else tk.Toplevel(master)
+    editor_app = ImageEditor(root, image_path_or_object, **editor_options)
     # Determine initial window size based on image, but with limits
     img_w, img_h = editor_app.image_original.size
     screen_w = root.winfo_screenwidth()
@@ -700,7 +1037,9 @@ def open_editor_with_image(image_path_or_object):
     window_h = canvas_h + 50
 
     root.geometry(f"{window_w}x{window_h}")
-    root.mainloop()
+    if master is None:
+        root.mainloop()
+    return editor_app
 
 if __name__ == '__main__':
     # This is for testing the editor directly
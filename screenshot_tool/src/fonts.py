@@ -0,0 +1,155 @@
+"""
+Registry of the system's TrueType/OpenType fonts for rendering text onto images.
+
+Fonts are discovered once per process: through fontconfig (`fc-list`) where available, otherwise
+by scanning the usual font directories. Loaded fonts are kept in an LRU cache keyed by family and
+size, so drawing text does not touch the disk after the first use of a font.
+
+Family names are matched case-insensitively. Common names that are often missing (e.g. "Arial" on
+Linux) resolve to a metric-compatible or similar installed font instead of Pillow's tiny bitmap
+default.
+"""
+
+import functools
+import os
+import subprocess
+import sys
+import threading
+
+from PIL import ImageFont
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+FONT_CACHE_SIZE = 64
+
+# Tried in order when a family is not installed
+FAMILY_ALIASES = {
+    "arial": ["Liberation Sans", "Arimo", "Helvetica", "DejaVu Sans"],
+    "helvetica": ["Liberation Sans", "Arimo", "Arial", "DejaVu Sans"],
+    "times new roman": ["Liberation Serif", "Tinos", "Times", "DejaVu Serif"],
+    "courier new": ["Liberation Mono", "Cousine", "Courier", "DejaVu Sans Mono"],
+    "sans": ["DejaVu Sans", "Liberation Sans", "Arial", "Helvetica", "Noto Sans"],
+    "serif": ["DejaVu Serif", "Liberation Serif", "Times New Roman", "Noto Serif"],
+    "monospace": ["DejaVu Sans Mono", "Liberation Mono", "Courier New", "Noto Sans Mono"],
+}
+DEFAULT_FAMILIES = FAMILY_ALIASES["sans"] + ["Segoe UI", "Verdana", "Noto Sans CJK SC"]
+
+_registry = None # family (lower case) -> {"name": family, "styles": {style (lower case): path}}
+_registry_lock = threading.Lock()
+
+def _font_directories():
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        return [os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(home, ".fonts"),
+            os.path.join(home, ".local", "share", "fonts")]
+
+def _discover_with_fontconfig():
+    """Returns [(family, style, path)] from fc-list, or None if fontconfig is not available."""
+    try:
+        output = subprocess.run(["fc-list", "--format", "%{family}\t%{style}\t%{file}\n"],
+                                capture_output=True, text=True, timeout=10, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    fonts = []
+    for line in output.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3 or not parts[2].lower().endswith(FONT_EXTENSIONS):
+            continue
+        # fc-list joins localized names with commas; the first one is the canonical name
+        family, style, path = parts[0].split(",")[0], parts[1].split(",")[0], parts[2]
+        fonts.append((family, style or "Regular", path))
+    return fonts
+
+def _discover_by_scanning():
+    """Returns [(family, style, path)] for the font files in the usual directories."""
+    fonts = []
+    for directory in _font_directories():
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if not filename.lower().endswith(FONT_EXTENSIONS):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    family, style = ImageFont.truetype(path, 12).getname()
+                except Exception: # Unreadable or unsupported font file
+                    continue
+                fonts.append((family, style or "Regular", path))
+    return fonts
+
+def _get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            fonts = _discover_with_fontconfig()
+            if not fonts:
+                fonts = _discover_by_scanning()
+            registry = {}
+            for family, style, path in fonts:
+                entry = registry.setdefault(family.lower(), {"name": family, "styles": {}})
+                entry["styles"].setdefault(style.lower(), path)
+            _registry = registry
+        return _registry
+
+def preload():
+    """Discovers the system fonts on a background thread, so the first text insertion is instant."""
+    threading.Thread(target=_get_registry, name="font-discovery", daemon=True).start()
+
+def list_families():
+    """Returns the names of all installed font families, sorted."""
+    return sorted(entry["name"] for entry in _get_registry().values())
+
+def resolve_family(family):
+    """
+    Returns the installed family name used for family: itself if installed, otherwise the first
+    installed alias or default family. None if no scalable font is installed at all.
+    """
+    registry = _get_registry()
+    key = (family or "").lower()
+    for candidate in [key] + [c.lower() for c in FAMILY_ALIASES.get(key, [])] + [c.lower() for c in DEFAULT_FAMILIES]:
+        if candidate in registry:
+            return registry[candidate]["name"]
+    if registry: # Anything scalable beats the bitmap default
+        return registry[sorted(registry)[0]]["name"]
+    return None
+
+def font_path(family, style="Regular"):
+    """Returns the file of family (resolved as in resolve_family) in style, or None."""
+    resolved = resolve_family(family)
+    if resolved is None:
+        return None
+    styles = _get_registry()[resolved.lower()]["styles"]
+    for candidate in (style.lower(), "regular", "book", "roman", "normal"):
+        if candidate in styles:
+            return styles[candidate]
+    return styles[sorted(styles)[0]]
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(family, size, style="Regular"):
+    """
+    Returns a cached FreeTypeFont for family at size (pixels).
+
+    Falls back to Pillow's default font, scaled to size where the Pillow version supports it,
+    if no scalable font is installed.
+    """
+    path = font_path(family, style)
+    if path is not None:
+        try:
+            return ImageFont.truetype(path, int(size))
+        except Exception as e:
+            print(f"Could not load font {path}: {e}")
+    try:
+        return ImageFont.load_default(size=int(size))
+    except TypeError: # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+if __name__ == "__main__":
+    families = list_families()
+    print(f"{len(families)} font families found:")
+    for name in families:
+        print(f"  {name}")
+    for requested in ("Arial", "sans", "monospace"):
+        print(f"{requested!r} -> {resolve_family(requested)!r} ({font_path(requested)})")
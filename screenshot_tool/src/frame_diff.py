@@ -0,0 +1,88 @@
+"""
+Cheap image fingerprints for detecting whether the screen content changed between two captures.
+
+A fingerprint is a tiny grayscale thumbnail of the image. Comparing two of them costs a few
+microseconds regardless of the capture size, which makes it suitable for telling apart different
+scenes (e.g. grouping similar captures). It is blind to small changes, though: a line of text
+that changes on a full-HD screen moves no thumbnail value. To decide whether a frame is new,
+compare sampled full-resolution pixels instead (downsample_frame/changed_fraction).
+
+downsample_bgra()/changed_fraction() work on raw screen data instead and report *how much* of
+a region changed, for watchers that poll a region frequently; changed_mask() tells *where*.
+"""
+
+from PIL import Image
+
+DEFAULT_FINGERPRINT_SIZE = 32
+
+def fingerprint(image, size=DEFAULT_FINGERPRINT_SIZE):
+    """
+    Computes a fingerprint of image.
+
+    Args:
+        image (PIL.Image.Image): The image to fingerprint.
+        size (int, optional): Edge length of the thumbnail. Larger values notice smaller changes
+                              but cost slightly more to compute and compare.
+
+    Returns:
+        bytes: size * size grayscale values.
+    """
+    # BOX averages every source pixel into the thumbnail, so small changes still shift the values.
+    # Resizing before the grayscale conversion keeps the conversion cost negligible.
+    thumbnail = image.resize((size, size), Image.Resampling.BOX)
+    return thumbnail.convert("L").tobytes()
+
+def fingerprint_distance(fp1, fp2):
+    """
+    Returns the mean absolute difference (0-255) between two fingerprints of the same size.
+
+    Identical fingerprints return 0.0 without comparing values.
+    """
+    if fp1 == fp2:
+        return 0.0
+    if len(fp1) != len(fp2):
+        return 255.0
+    return sum(abs(a - b) for a, b in zip(fp1, fp2)) / len(fp1)
+
+def downsample_bgra(bgra, width, height, step=4):
+    """
+    Turns raw BGRA screen data (e.g. mss ScreenShot.bgra) into a small intensity array.
+
+    Every step-th pixel in each direction is kept (no filtering) and its B, G and R values are summed,
+    so the cost is proportional to the number of *kept* pixels rather than the full capture size.
+
+    Returns:
+        numpy.ndarray: uint16 array of shape (ceil(height / step), ceil(width / step)), values 0-765.
+    """
+    import numpy as np
+    pixels = np.frombuffer(bgra, dtype=np.uint8).reshape(height, width, 4)
+    return downsample_frame(pixels, step)
+
+def downsample_frame(pixels, step=4):
+    """
+    Like downsample_bgra(), for a frame that is already a (height, width, channels) uint8 array
+    with 3 or 4 channels, e.g. a BGR frame decoded by cv2.VideoCapture.
+    """
+    import numpy as np
+    sampled = pixels[::step, ::step, :3]
+    return sampled.sum(axis=2, dtype=np.uint16)
+
+def changed_fraction(samples1, samples2, pixel_tolerance=24):
+    """
+    Returns the fraction (0.0-1.0) of sampled pixels whose intensity differs by more than
+    pixel_tolerance (per channel, 0-255) between two downsample_bgra() results.
+    """
+    import numpy as np
+    if samples1.shape != samples2.shape:
+        return 1.0
+    mask = changed_mask(samples1, samples2, pixel_tolerance)
+    return float(np.count_nonzero(mask)) / mask.size
+
+def changed_mask(samples1, samples2, pixel_tolerance=24):
+    """
+    Returns a boolean array, of the shape of the samples, that is True where two downsample_bgra()
+    results differ by more than pixel_tolerance (as in changed_fraction).
+    """
+    import numpy as np
+    diff = np.abs(samples1.astype(np.int32) - samples2.astype(np.int32))
+    return diff > pixel_tolerance * 3
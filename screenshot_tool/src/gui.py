@@ -1,14 +1,13 @@
 import tkinter as tk
-from tkinter import Menu, Button, Label, messagebox, filedialog, scrolledtext
+from tkinter import Menu, Button, Label, messagebox, filedialog, scrolledtext, simpledialog
 import os
+import time
 
 # Assuming other modules are in the same directory or package
 from . import i18n 
-from .main import capture_fullscreen, capture_selected_region # Assuming these are importable
-from .editor import open_editor_with_image # This is used by capture_fullscreen/region indirectly
-from .scrolling_capture import capture_scrolling
-from .ocr import extract_text_from_image
-from .recorder import ScreenRecorder # For placeholder integration
+# Capture, editor, OCR and recording modules pull in mss/cv2/numpy/pyautogui/pytesseract.
+# They are imported inside the _trigger_* handlers so the main window can appear
+# before any of those libraries are loaded (see benchmarks/startup_benchmark.py).
 
 class MainApplication(tk.Tk):
     def __init__(self):
@@ -16,6 +15,9 @@ class MainApplication(tk.Tk):
         self.recorder_instance = None # For screen recording
         self.is_recording = False
         self._init_ui()
+        self.search_indexer = None # Background OCR indexing of the screenshot folder (see ocr_index)
+        self.after(200, self._offer_crash_recovery)
+        self.after(2000, self._start_search_indexer)
 
     def _init_ui(self):
         self.title(i18n._("app_title"))
@@ -149,6 +151,7 @@ class MainApplication(tk.Tk):
         self.status_bar.config(text="Capturing fullscreen...")
         self.update_idletasks() # Ensure status bar updates
         try:
+            from .main import capture_fullscreen
             # Assuming capture_fullscreen now handles opening the editor
             capture_fullscreen() 
             self.status_bar.config(text=i18n._("status_idle"))
@@ -161,6 +164,7 @@ class MainApplication(tk.Tk):
         self.status_bar.config(text="Select region for capture...")
         self.update_idletasks()
         try:
+            from .main import capture_selected_region
             # Assuming capture_selected_region now handles opening the editor
             # Hide main window during region selection
             self.withdraw() 
@@ -177,6 +181,8 @@ class MainApplication(tk.Tk):
         self.status_bar.config(text="Starting scrolling capture. Focus target window...")
         self.update_idletasks()
         try:
+            from .scrolling_capture import capture_scrolling
+            from .tk_dispatch import TkDispatcher
             # Hide main window during scrolling capture to avoid it being part of capture
             self.withdraw()
             time.sleep(0.5) # Give it a moment to hide
@@ -187,21 +193,35 @@ class MainApplication(tk.Tk):
                 os.makedirs(captures_dir, exist_ok=True)
             output_file = os.path.join(captures_dir, "gui_scrolling_capture.png")
             
-            capture_scrolling(output_filename=output_file) # Uses its own prints for progress
+            # Uses its own prints for progress. The stitched image is encoded in the background;
+            # _on_scrolling_capture_saved runs on this (Tk) thread once the file is written.
+            save_future = capture_scrolling(output_filename=output_file,
+                                            on_saved=self._on_scrolling_capture_saved,
+                                            dispatcher=TkDispatcher(self))
             
             self.deiconify()
-            messagebox.showinfo("Scrolling Capture", f"Scrolling capture attempt finished. Saved to {output_file}", parent=self)
-            self.status_bar.config(text=i18n._("status_idle"))
-            
-            # Optional: Open the stitched image in the editor
-            if messagebox.askyesno("Open Editor", "Open the scrolling capture in the editor?", parent=self):
-                open_editor_with_image(output_file)
+            if save_future is None:
+                messagebox.showinfo("Scrolling Capture", "Scrolling capture finished, but nothing was captured.", parent=self)
+                self.status_bar.config(text=i18n._("status_idle"))
+            else:
+                self.status_bar.config(text=f"Saving scrolling capture to {output_file}...")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed scrolling capture: {e}", parent=self)
             self.status_bar.config(text=i18n._("status_idle"))
             if not self.winfo_viewable(): self.deiconify()
 
+    def _on_scrolling_capture_saved(self, output_file, error):
+        self.status_bar.config(text=i18n._("status_idle"))
+        if error is not None:
+            messagebox.showerror("Error", f"Could not save scrolling capture: {error}", parent=self)
+            return
+        messagebox.showinfo("Scrolling Capture", f"Scrolling capture attempt finished. Saved to {output_file}", parent=self)
+
+        # Optional: Open the stitched image in the editor
+        if messagebox.askyesno("Open Editor", "Open the scrolling capture in the editor?", parent=self):
+            from .editor import open_editor_with_image
+            open_editor_with_image(output_file, master=self)
 
     def _toggle_screen_recording(self):
         # Add "start/stop" variants to TRANSLATIONS for button/menu record
@@ -214,6 +234,7 @@ class MainApplication(tk.Tk):
 
 
         if not self.is_recording:
+            from .recorder import ScreenRecorder
             # Start recording
             videos_dir = "videos"
             if not os.path.exists(videos_dir):
@@ -223,7 +244,7 @@ class MainApplication(tk.Tk):
             output_filename = os.path.join(videos_dir, f"recording_{timestamp}.mp4")
             
             # Ask for FPS (optional, could be a setting later)
-            fps_str = tk.simpledialog.askstring("FPS", "Enter recording FPS (e.g., 15, 20, 30):", initialvalue="15.0", parent=self)
+            fps_str = simpledialog.askstring("FPS", "Enter recording FPS (e.g., 15, 20, 30):", initialvalue="15.0", parent=self)
             try:
                 fps = float(fps_str) if fps_str else 15.0
             except ValueError:
@@ -255,6 +276,7 @@ class MainApplication(tk.Tk):
                 self.recorder_instance = None
                 self.status_bar.config(text=f"Recording stopped. Saved to {saved_file}")
                 messagebox.showinfo("Screen Recording", f"Recording stopped. Saved to {saved_file}", parent=self)
+                self._index_recording(saved_file)
             else: # Should not happen if is_recording is true
                 self.is_recording = False 
                 self.status_bar.config(text="Error: Recorder instance not found.")
@@ -277,13 +299,14 @@ class MainApplication(tk.Tk):
         # Ask for language (can be a setting later)
         # Example: 'eng', 'chi_sim', 'jpn', 'deu', 'fra'
         # For multiple languages: 'eng+fra'
-        lang_code = tk.simpledialog.askstring("OCR Language", 
+        lang_code = simpledialog.askstring("OCR Language", 
                                               "Enter language code(s) for OCR (e.g., 'eng', 'chi_sim', 'eng+fra'):", 
                                               initialvalue=i18n.get_language(), # Default to current UI lang if suitable or 'eng'
                                               parent=self)
         if not lang_code: # User cancelled or entered empty
             lang_code = 'eng' # Default to English if nothing provided
 
+        from .ocr import extract_text_from_image
         extracted_text = extract_text_from_image(filepath, lang=lang_code)
         
         result_display_window = tk.Toplevel(self)
@@ -300,6 +323,46 @@ class MainApplication(tk.Tk):
 
         self.status_bar.config(text=i18n._("status_idle"))
 
+    def _offer_crash_recovery(self):
+        """Offers to reopen editor sessions that were not closed normally (see autosave)."""
+        from . import autosave
+        journals = autosave.list_recoverable()
+        if not journals:
+            return
+        answer = messagebox.askyesnocancel(i18n._("recovery_title"),
+                                           i18n._("recovery_prompt").format(count=len(journals)), parent=self)
+        if answer is None: # Keep the journals and ask again on the next launch
+            return
+        for journal in journals:
+            if answer:
+                recovered = autosave.read_journal(journal["path"])
+                if recovered is None:
+                    continue # Unreadable; keep the file for manual inspection
+                image, layer, source_path = recovered
+                from .editor import open_editor_with_image
+                # The new editor journals the recovered state right away, so the old file can go
+                open_editor_with_image(image, master=self, annotation_layer=layer, source_path=source_path, recovered=True)
+            autosave.discard(journal["path"])
+
+    def _start_search_indexer(self):
+        """Starts OCR-indexing the screenshot folder in the background, so captures become searchable."""
+        from . import config_manager
+        if not config_manager.get_setting("search", "index_enabled", False):
+            return
+        from .ocr_index import OcrIndexer
+        self.search_indexer = OcrIndexer()
+        self.search_indexer.start()
+
+    def _index_recording(self, video_path):
+        """Writes the time-coded OCR index of a finished recording in the background (see video_ocr)."""
+        from . import config_manager
+        if not config_manager.get_setting("search", "index_recordings", False):
+            return
+        import threading
+        from . import video_ocr
+        # Daemon thread: quitting the app just leaves the index written so far
+        threading.Thread(target=video_ocr.build_timeline, args=(video_path,), name="recording-ocr", daemon=True).start()
+
 if __name__ == '__main__':
     # This allows testing gui.py directly if needed,
     # but the main entry point will be from main.py
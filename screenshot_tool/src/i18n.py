@@ -27,6 +27,9 @@ TRANSLATIONS = {
     "ocr_select_image_title": {"en": "Select Image for OCR", "zh": "选择图像进行OCR"},
     "ocr_result_title": {"en": "OCR Result", "zh": "OCR识别结果"},
     "ocr_no_text_found": {"en": "No text found or OCR failed.", "zh": "未找到文本或OCR失败。"},
+    "recovery_title": {"en": "Recover Unsaved Edits", "zh": "恢复未保存的编辑"},
+    "recovery_prompt": {"en": "The image editor did not close normally. Reopen {count} unsaved image(s)?\n\nYes: reopen  No: discard  Cancel: ask again next time",
+                        "zh": "图像编辑器未正常关闭。是否重新打开 {count} 个未保存的图像？\n\n是：重新打开  否：丢弃  取消：下次再询问"},
     "settings_placeholder_title": {"en": "Settings", "zh": "设置"},
     "settings_placeholder_message": {"en": "Settings dialog will be implemented here.", "zh": "设置对话框将在此实现。"},
 }
@@ -0,0 +1,199 @@
+"""
+Helpers for writing captured images to disk using the user's output settings.
+
+The "output" section of the configuration decides the image format, JPEG quality and PNG
+compression level, and the "general" section decides where captures go and how they are named.
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+
+from PIL import Image
+
+from . import config_manager
+
+# Maps the image_format setting to Pillow's format name and a file extension
+FORMATS = {
+    "PNG": ("PNG", ".png"),
+    "JPG": ("JPEG", ".jpg"),
+    "JPEG": ("JPEG", ".jpg"),
+    "BMP": ("BMP", ".bmp"),
+    "GIF": ("GIF", ".gif"),
+}
+
+def format_from_path(path, default=None):
+    """
+    Returns the image_format key (e.g. "PNG", "JPG") matching the extension of path, or default.
+    Extensions not in FORMATS but known to Pillow (e.g. ".tiff") return Pillow's format name.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    for key, (_, key_ext) in FORMATS.items():
+        if ext == key_ext or (key == "JPEG" and ext == ".jpeg"):
+            return key
+    return Image.registered_extensions().get(ext, default)
+
+def _pil_format(image_format):
+    """Maps an image_format key to Pillow's format name; other names are assumed to be Pillow's already."""
+    key = image_format.upper()
+    return FORMATS[key][0] if key in FORMATS else key
+
+def build_capture_path(directory=None, image_format=None, prefix=None):
+    """
+    Builds the output path for a new capture from the configured save path and filename format.
+
+    The "{datetime}" placeholder of screenshot_filename_format is expanded to the current local time
+    (with milliseconds, so that rapid captures do not collide), and the extension is replaced to match
+    image_format.
+
+    Args:
+        directory (str, optional): Target directory. Defaults to general.default_save_path.
+        image_format (str, optional): "PNG", "JPG" or "BMP". Defaults to output.image_format.
+        prefix (str, optional): Replaces the part of the filename before "{datetime}", e.g. "timelapse_".
+
+    Returns:
+        str: The full path. The directory is created if needed.
+    """
+    directory = directory or config_manager.get_setting("general", "default_save_path")
+    image_format = (image_format or config_manager.get_setting("output", "image_format", "PNG")).upper()
+    filename_format = config_manager.get_setting("general", "screenshot_filename_format", "screenshot_{datetime}.png")
+
+    now = time.time()
+    stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}"
+    if prefix is not None and "{datetime}" in filename_format:
+        filename_format = prefix + filename_format[filename_format.index("{datetime}"):]
+    try:
+        filename = filename_format.format(datetime=stamp)
+    except (KeyError, IndexError, ValueError): # Unknown placeholders in a user-edited format
+        filename = f"screenshot_{stamp}"
+
+    ext = FORMATS.get(image_format, FORMATS["PNG"])[1]
+    filename = os.path.splitext(filename)[0] + ext
+
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+def prepare_for_format(image, image_format):
+    """
+    Returns an image that can be written in image_format.
+
+    JPEG and BMP have no alpha channel, so transparent images are flattened onto a white background.
+    """
+    pil_format = _pil_format(image_format)
+    if pil_format in ("JPEG", "BMP"):
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[3])
+            return background
+        if image.mode not in ("RGB", "L"):
+            return image.convert("RGB")
+    return image
+
+def save_options(image_format):
+    """Returns the keyword arguments for Image.save() for image_format, based on the output settings."""
+    pil_format = _pil_format(image_format)
+    options = {"format": pil_format}
+    if pil_format == "JPEG":
+        options["quality"] = int(config_manager.get_setting("output", "image_quality_jpg", 90))
+    elif pil_format == "PNG":
+        options["compress_level"] = int(config_manager.get_setting("output", "png_compress_level", 6))
+    return options
+
+def save_image(image, path, image_format=None):
+    """
+    Saves image to path using the configured output settings.
+
+    The file is written under a temporary name and renamed into place once complete, so a reader
+    (or a crash) never sees a half-written image.
+
+    Args:
+        image (PIL.Image.Image): Image to save. It must not be modified while this runs.
+        path (str): Destination file path.
+        image_format (str, optional): Overrides the format; by default it is derived from the path's
+                                      extension, falling back to output.image_format.
+
+    Returns:
+        str: The path that was written.
+    """
+    image_format = image_format or format_from_path(path) or config_manager.get_setting("output", "image_format", "PNG")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    prepared = prepare_for_format(image, image_format)
+    partial_path = path + ".part"
+    try:
+        prepared.save(partial_path, **save_options(image_format))
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return path
+
+
+class ImageWriterPool:
+    """
+    Writes images to disk on background threads.
+
+    At most max_pending images are queued or being written at any time, so memory use stays bounded
+    even if the disk is slower than the producer. Pillow releases the GIL while encoding, so several
+    workers encode in parallel.
+
+    Completion callbacks run on the writer thread, or on the Tk thread if a
+    tk_dispatch.TkDispatcher is passed to submit(). Pillow encodes a file in one call, so only
+    completion is reported, not progress.
+    """
+
+    def __init__(self, max_workers=2, max_pending=4):
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, image, path, image_format=None, block=True, on_done=None, dispatcher=None):
+        """
+        Queues image to be saved to path (see save_image).
+
+        Args:
+            block (bool, optional): If all slots are busy, wait for one (True) or drop the image (False).
+            on_done (callable, optional): on_done(path, error); error is None on success.
+            dispatcher (tk_dispatch.TkDispatcher, optional): Deliver the callbacks on the Tk thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the written path. None if the image was dropped.
+        """
+        if dispatcher is not None:
+            on_done = dispatcher.wrap(on_done)
+        if not self._slots.acquire(blocking=block):
+            return None
+        try:
+            future = self._executor.submit(save_image, image, path, image_format)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, path, on_done))
+        return future
+
+    def _on_done(self, future, path, on_done):
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            print(f"Error saving image to {path}: {error}")
+        if on_done is not None:
+            on_done(path, error)
+
+    def shutdown(self, wait=True):
+        """Stops accepting images; with wait=True, returns once all queued images are written."""
+        self._executor.shutdown(wait=wait)
+
+
+_shared_writer_pool = None
+_shared_writer_pool_lock = threading.Lock()
+
+def get_writer_pool():
+    """Returns the process-wide writer pool used for interactive saves (editor, scrolling capture)."""
+    global _shared_writer_pool
+    with _shared_writer_pool_lock:
+        if _shared_writer_pool is None:
+            _shared_writer_pool = ImageWriterPool(max_workers=max(1, min(4, os.cpu_count() or 1)), max_pending=8)
+        return _shared_writer_pool
@@ -0,0 +1,287 @@
+"""
+Headless image operations: the editor's drawing, crop, blur and mosaic without a Tk window.
+
+An operation list is a JSON array of objects applied in order, for example:
+
+    [
+        {"op": "mosaic", "regions": [[0, 0, 400, 60]], "strength": 16},
+        {"op": "arrow", "points": [[900, 700], [620, 480]], "color": "red", "width": 6},
+        {"op": "text", "points": [[20, -60]], "text": "Internal", "font_size": 28, "color": "#ff0000"},
+        {"op": "crop", "box": [0, 0, 1920, 1080]}
+    ]
+
+Supported ops:
+    crop                        box
+    mosaic / blur / gaussian    regions, strength (optional; see redaction)
+    rectangle / ellipse / line / arrow / pen / text
+                                the fields of annotations.Annotation (points, color, width, text,
+                                font_family, font_size)
+    watermark                   text, position ("top-left", "top-right", "bottom-left",
+                                "bottom-right", "center"), font_size, color, opacity (0-1), margin
+    annotations                 file: an annotation layer saved by the editor
+    auto_redact                 OCR the image and redact emails, tokens, IPs... (see auto_redact);
+                                optional patterns, custom_patterns, method, strength, lang, padding
+
+Negative coordinates count pixels from the right/bottom edge, so one list fits screenshots of
+different sizes: -1 is the last pixel column or row, -300 the 300th from the edge. A box includes
+its end pixels when they are negative, so [-300, -80, -1, -1] is the bottom-right 300x80 corner.
+
+Batch use (from the screenshot_tool directory):
+    python -m src.image_ops ops.json ~/Pictures/Screenshots --output-dir redacted/ --workers 8
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+
+from PIL import Image, ImageDraw
+
+from . import annotations
+from . import redaction
+
+DRAWING_OPS = ("rectangle", "ellipse", "line", "arrow", "pen", "text")
+REDACTION_OPS = redaction.METHODS
+OPS = ("crop", "watermark", "annotations", "auto_redact") + DRAWING_OPS + REDACTION_OPS
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+def _resolve(value, extent, end=False):
+    """
+    Maps a possibly negative coordinate to an absolute one: -n is the n-th pixel from the edge
+    (extent - n). For the end of a box (end=True) that pixel is included, so its far edge is returned.
+    """
+    value = float(value)
+    if value >= 0:
+        return value
+    return value + extent + (1 if end else 0)
+
+def resolve_box(box, size):
+    """Resolves negative coordinates of an (x1, y1, x2, y2) box against an image size."""
+    width, height = size
+    return (_resolve(box[0], width), _resolve(box[1], height),
+            _resolve(box[2], width, end=True), _resolve(box[3], height, end=True))
+
+def resolve_points(points, size):
+    width, height = size
+    return [(_resolve(x, width), _resolve(y, height)) for x, y in points]
+
+def crop(image, box):
+    """Returns image cropped to box (clamped to the image). Raises ValueError if the box is empty."""
+    x1, y1, x2, y2 = (int(round(v)) for v in box)
+    x1, x2 = max(0, min(x1, x2)), min(image.width, max(x1, x2))
+    y1, y2 = max(0, min(y1, y2)), min(image.height, max(y1, y2))
+    if x1 >= x2 or y1 >= y2:
+        raise ValueError(f"Crop box {tuple(box)} is empty or outside the {image.width}x{image.height} image")
+    return image.crop((x1, y1, x2, y2))
+
+def draw_annotation(image, annotation):
+    """Rasterizes an annotations.Annotation onto image in place."""
+    annotation.draw(ImageDraw.Draw(image))
+
+def watermark(image, text, position="bottom-right", font_size=24, color="white", opacity=0.5,
+              margin=16, font_family="sans"):
+    """Returns image with a semi-transparent text watermark in one corner (or the center)."""
+    font = annotations.load_font(font_family, font_size)
+    overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    text_w, text_h = right - left, bottom - top
+    x = margin if "left" in position else image.width - text_w - margin
+    y = margin if "top" in position else image.height - text_h - margin
+    if position == "center":
+        x, y = (image.width - text_w) // 2, (image.height - text_h) // 2
+    fill = Image.new("RGBA", (1, 1), color).getpixel((0, 0))
+    draw.text((x - left, y - top), text, font=font, fill=fill[:3] + (int(255 * max(0.0, min(1.0, opacity))),))
+    return Image.alpha_composite(image.convert("RGBA"), overlay).convert(image.mode)
+
+def validate_operations(operations):
+    """Raises ValueError describing the first invalid operation in the list."""
+    if not isinstance(operations, list):
+        raise ValueError("The operation list must be a JSON array")
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in OPS:
+            raise ValueError(f"Operation {index}: 'op' must be one of {OPS}")
+        op = operation["op"]
+        required = {"crop": ("box",), "watermark": ("text",), "annotations": ("file",), "auto_redact": (),
+                    "text": ("points", "text")}
+        for key in required.get(op, ("regions",) if op in REDACTION_OPS else ("points",)):
+            if key not in operation:
+                raise ValueError(f"Operation {index} ({op}): missing '{key}'")
+
+def load_operations(path):
+    """Reads and validates an operation list from a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        operations = json.load(f)
+    validate_operations(operations)
+    return operations
+
+def apply_operations(image, operations):
+    """
+    Applies an operation list to image.
+
+    Args:
+        image (PIL.Image.Image): Source image. It may be modified in place.
+        operations (list): Operation dicts (see the module docstring).
+
+    Returns:
+        PIL.Image.Image: The result; a new object if an operation (e.g. crop) replaced the image.
+    """
+    for operation in operations:
+        op = operation["op"]
+        if op == "crop":
+            image = crop(image, resolve_box(operation["box"], image.size))
+        elif op in REDACTION_OPS:
+            regions = [resolve_box(box, image.size) for box in operation["regions"]]
+            redaction.redact_regions(image, regions, op, operation.get("strength"))
+        elif op in DRAWING_OPS:
+            fields = dict(operation, kind=op, points=resolve_points(operation["points"], image.size))
+            draw_annotation(image, annotations.Annotation.from_dict(fields))
+        elif op == "watermark":
+            options = {k: operation[k] for k in ("position", "font_size", "color", "opacity", "margin", "font_family")
+                       if k in operation}
+            image = watermark(image, operation["text"], **options)
+        elif op == "annotations":
+            image = annotations.AnnotationLayer.load(operation["file"]).render_onto(image)
+        elif op == "auto_redact":
+            from . import auto_redact
+            patterns = auto_redact.compile_patterns(operation.get("patterns"), operation.get("custom_patterns"))
+            matches = auto_redact.auto_redact(image, patterns, operation.get("method"), operation.get("strength"),
+                                              operation.get("lang"), operation.get("padding"))
+            if matches is None: # Never write out an image that was supposed to be redacted but was not
+                raise RuntimeError("OCR failed; the image was not redacted")
+    return image
+
+def process_file(input_path, output_path, operations, image_format=None):
+    """Loads input_path, applies operations and saves the result to output_path. Returns output_path."""
+    from . import image_io
+    with Image.open(input_path) as source:
+        image = source.convert("RGBA") if source.mode not in ("RGB", "RGBA") else source.copy()
+    result = apply_operations(image, operations)
+    return image_io.save_image(result, output_path, image_format)
+
+def _init_worker():
+    # Each worker process handles one image at a time; OpenCV's and Tesseract's (OpenMP) own
+    # thread pools would only oversubscribe the cores the pool is already using.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+
+def _process_job(job):
+    """Process-pool entry point. Returns (input, output, error message or None, seconds)."""
+    input_path, output_path, operations, image_format = job
+    start = time.perf_counter()
+    try:
+        process_file(input_path, output_path, operations, image_format)
+        return input_path, output_path, None, time.perf_counter() - start
+    except Exception as e:
+        return input_path, output_path, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+def collect_images(paths, recursive=True):
+    """Expands files and directories into a sorted list of image files."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                images.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMAGE_EXTENSIONS))
+                if not recursive:
+                    break
+        elif os.path.isfile(path):
+            images.append(path)
+        else:
+            print(f"Skipping {path}: not found")
+    return images
+
+def output_path_for(input_path, output_dir, image_format=None, base_dir=None):
+    """Mirrors input_path under output_dir (relative to base_dir if given), changing the extension for image_format."""
+    from . import image_io
+    relative = os.path.relpath(input_path, base_dir) if base_dir else os.path.basename(input_path)
+    if relative.startswith(".."):
+        relative = os.path.basename(input_path)
+    if image_format:
+        relative = os.path.splitext(relative)[0] + image_io.FORMATS.get(image_format.upper(), (None, "." + image_format.lower()))[1]
+    return os.path.join(output_dir, relative)
+
+def run_batch(jobs, operations, workers=None, max_in_flight=None, image_format=None, on_result=None):
+    """
+    Applies operations to many images in parallel.
+
+    Files are spread over a process pool so that throughput scales with the number of cores. At most
+    max_in_flight files are queued or being processed at any time; since workers load their own
+    images, memory use is bounded by max_in_flight images regardless of the number of files.
+
+    Args:
+        jobs (iterable): (input path, output path) pairs. Consumed lazily.
+        operations (list): The operation list (validated before starting).
+        workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        max_in_flight (int, optional): Defaults to twice the number of workers.
+        image_format (str, optional): Output format; by default derived from each output path.
+        on_result (callable, optional): Called as on_result(input, output, error, seconds) for each
+                                        file, in completion order, on the calling thread.
+
+    Returns:
+        dict: {"processed": n, "failed": n, "seconds": wall time}
+    """
+    validate_operations(operations)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(workers, max_in_flight or workers * 2)
+    summary = {"processed": 0, "failed": 0, "seconds": 0.0}
+    start = time.perf_counter()
+
+    def finish(future):
+        input_path, output_path, error, seconds = future.result()
+        summary["failed" if error else "processed"] += 1
+        if on_result is not None:
+            on_result(input_path, output_path, error, seconds)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        in_flight = set()
+        for input_path, output_path in jobs:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    finish(future)
+            in_flight.add(pool.submit(_process_job, (input_path, output_path, operations, image_format)))
+        for future in concurrent.futures.as_completed(in_flight):
+            finish(future)
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply an operation list (JSON) to many images in parallel.")
+    parser.add_argument("operations", help="JSON file with the operation list.")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories (searched recursively).")
+    parser.add_argument("--output-dir", required=True, help="Where results are written (mirrors input directories).")
+    parser.add_argument("--format", dest="image_format", help="Output format, e.g. PNG or JPG (default: keep the extension).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of CPUs).")
+    parser.add_argument("--max-in-flight", type=int, help="Maximum files queued at once (default: 2 x workers).")
+    args = parser.parse_args()
+
+    try:
+        operation_list = load_operations(args.operations)
+    except (OSError, ValueError) as e:
+        parser.error(f"Invalid operation list: {e}")
+
+    def batch_jobs():
+        for input_arg in args.inputs:
+            base = input_arg if os.path.isdir(input_arg) else None
+            for image_path in collect_images([input_arg]):
+                yield image_path, output_path_for(image_path, args.output_dir, args.image_format, base)
+
+    def report(input_path, output_path, error, seconds):
+        if error:
+            print(f"FAILED {input_path}: {error}")
+        else:
+            print(f"{input_path} -> {output_path} ({seconds * 1000:.0f} ms)")
+
+    result = run_batch(batch_jobs(), operation_list, workers=args.workers, max_in_flight=args.max_in_flight,
+                       image_format=args.image_format, on_result=report)
+    rate = result["processed"] / result["seconds"] if result["seconds"] > 0 else 0.0
+    print(f"Processed {result['processed']} image(s), {result['failed']} failed, "
+          f"in {result['seconds']:.1f}s ({rate:.1f} images/s).")
@@ -1,45 +1,53 @@
-import mss
-import mss.tools
 import tkinter as tk
 from PIL import Image # For converting mss screenshot to Pillow Image
 from .editor import open_editor_with_image # Import the editor launcher
 
-def capture_fullscreen(output_path="screenshot.png"): # output_path is no longer directly used for saving here
+def screenshot_to_image(sct_img):
+    """
+    Converts an mss ScreenShot into an RGBA Pillow Image.
+
+    mss provides BGRA data in sct_img.bgra; Pillow's "raw" decoder reorders the channels for us.
+    """
+    if hasattr(sct_img, 'bgra') and sct_img.bgra:
+        return Image.frombytes("RGBA", (sct_img.width, sct_img.height), sct_img.bgra, "raw", "BGRA")
+    # Fallback: sct_img.rgb is packed 24-bit RGB
+    return Image.frombytes("RGB", (sct_img.width, sct_img.height), sct_img.rgb).convert("RGBA")
+
+def grab_image(monitor=None, sct=None):
+    """
+    Grabs part of the screen and returns it as a Pillow Image, without opening the editor.
+
+    Args:
+        monitor (dict, optional): Region to grab as {"top", "left", "width", "height"}.
+                                  Defaults to the primary monitor.
+        sct (mss.base.MSSBase, optional): An open mss instance to reuse. Opening one connects to the
+                                          display server, so callers that capture repeatedly should keep
+                                          one around. mss instances must only be used from the thread
+                                          that created them.
+
+    Returns:
+        PIL.Image.Image: The captured region in RGBA mode.
+    """
+    if sct is None:
+        import mss # Imported lazily to keep GUI startup fast
+        with mss.mss() as own_sct:
+            return grab_image(monitor, own_sct)
+    if monitor is None:
+        # sct.monitors[0] is all monitors together, sct.monitors[1] is primary
+        monitor = sct.monitors[1]
+    return screenshot_to_image(sct.grab(monitor))
+
+def capture_fullscreen(output_path="screenshot.png", master=None): # output_path is no longer directly used for saving here
     """
     Captures the entire screen and opens it in the ImageEditor.
+
+    Args:
+        master (tk.Misc, optional): Existing Tk root to open the editor under (see open_editor_with_image).
     """
     try:
-        with mss.mss() as sct:
-            # Grab the primary monitor (monitor 1)
-            # sct.monitors[0] is all monitors together, sct.monitors[1] is primary
-            monitor = sct.monitors[1] 
-            sct_img = sct.grab(monitor)
-            
-            # Convert to Pillow Image object
-            # mss provides BGRA data in sct_img.rgb (despite the name) or sct_img.bgra
-            # Pillow's frombytes expects RGB or RGBA, so we might need to reorder color channels
-            # Or, ensure mss provides it in a compatible format if possible.
-            # For simplicity, let's assume BGRA and convert to RGBA for Pillow
-            # img = Image.frombytes('RGB', (sct_img.width, sct_img.height), sct_img.rgb, 'raw', 'BGR') - this is one way
-            
-            # More direct: mss.tools.to_png writes to a BytesIO stream, then Image.open()
-            # Or, create from bgra attribute directly:
-            if hasattr(sct_img, 'bgra') and sct_img.bgra:
-                 pil_image = Image.frombytes("RGBA", (sct_img.width, sct_img.height), sct_img.bgra, "raw", "BGRA")
-            else: # Fallback if bgra is not available, try rgb (might need channel swap)
-                 # Assuming sct_img.rgb is actually BGRA as is common with mss
-                 raw_bgra = sct_img.rgb
-                 # Create an RGBA image by swapping B and R channels
-                 # This is a bit manual:
-                 byte_array = bytearray(raw_bgra)
-                 for i in range(0, len(byte_array), 4):
-                     b, g, r, a = byte_array[i], byte_array[i+1], byte_array[i+2], byte_array[i+3]
-                     byte_array[i], byte_array[i+1], byte_array[i+2] = r, g, b # Swapping B and R
-                 pil_image = Image.frombytes("RGBA", (sct_img.width, sct_img.height), bytes(byte_array))
-
-
-            print(f"Fullscreen screenshot captured. Opening in editor...")
-            open_editor_with_image(pil_image)
+        pil_image = grab_image()
+        print(f"Fullscreen screenshot captured. Opening in editor...")
+        open_editor_with_image(pil_image, master=master)
 
     except Exception as e:
         print(f"Error capturing fullscreen screenshot or opening editor: {e}")
@@ -120,17 +128,22 @@ class RegionSelector:
         self.selection_coordinates = None
         self.master.destroy()
 
-def capture_selected_region(output_path="region_capture.png"):
+def capture_selected_region(output_path="region_capture.png", master=None):
     """
     Allows the user to select a region of the screen and captures it, then opens in editor.
 
     Args:
         output_path (str, optional): Not directly used for saving here. Kept for signature consistency if needed.
                                      Defaults to "region_capture.png".
+        master (tk.Misc, optional): Existing Tk root to run the selection and the editor under.
+                                    If omitted, a temporary root is created and destroyed.
     """
     try:
-        root = tk.Tk()
-        root.withdraw()  # Hide the main Tkinter window
+        if master is None:
+            root = tk.Tk()
+            root.withdraw()  # Hide the main Tkinter window
+        else:
+            root = master
 
         # Create the selection window as a Toplevel
         selector_window = tk.Toplevel(root)
@@ -138,32 +151,21 @@ def capture_selected_region(output_path="region_capture.png"):
         # selector_window.wait_visibility(selector_window) # Wait for window to be visible before making it transparent
         
         selector = RegionSelector(selector_window)
-        selector_window.mainloop()  # This loop finishes when selector_window is destroyed
+        if master is None:
+            selector_window.mainloop()  # This loop finishes when selector_window is destroyed
 
-        # Ensure the hidden root window is also destroyed
-        if root.winfo_exists():
-            root.destroy()
+            # Ensure the hidden root window is also destroyed
+            if root.winfo_exists():
+                root.destroy()
+        else:
+            root.wait_window(selector_window) # Caller's mainloop keeps running
 
         if selector.selection_coordinates:
             monitor = selector.selection_coordinates
             if monitor["width"] > 0 and monitor["height"] > 0:
-                with mss.mss() as sct:
-                    sct_img = sct.grab(monitor) # sct_img is a mss.ScreenShot object
-                    
-                    # Convert to Pillow Image
-                    # Similar to fullscreen, assuming sct_img.bgra or sct_img.rgb (as BGRA)
-                    if hasattr(sct_img, 'bgra') and sct_img.bgra:
-                         pil_image = Image.frombytes("RGBA", (sct_img.width, sct_img.height), sct_img.bgra, "raw", "BGRA")
-                    else: # Fallback for sct_img.rgb (assuming BGRA)
-                         raw_bgra = sct_img.rgb
-                         byte_array = bytearray(raw_bgra)
-                         for i in range(0, len(byte_array), 4):
-                             b, g, r, a = byte_array[i], byte_array[i+1], byte_array[i+2], byte_array[i+3]
-                             byte_array[i], byte_array[i+1], byte_array[i+2] = r, g, b
-                         pil_image = Image.frombytes("RGBA", (sct_img.width, sct_img.height), bytes(byte_array))
-
-                    print(f"Selected region captured (Coordinates: {monitor}). Opening in editor...")
-                    open_editor_with_image(pil_image)
+                pil_image = grab_image(monitor)
+                print(f"Selected region captured (Coordinates: {monitor}). Opening in editor...")
+                open_editor_with_image(pil_image, master=master)
             else:
                 print("Invalid region selected (zero width or height). Screenshot not taken.")
         else:
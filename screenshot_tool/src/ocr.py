@@ -44,11 +44,153 @@ The `lang` parameter in `extract_text_from_image` should match the installed lan
 (e.g., 'eng', 'chi_sim', 'jpn', 'eng+fra' for multiple languages).
 """
 
-import pytesseract
 from PIL import Image, ImageDraw, ImageFont
 import os
+import threading
+import time
 
-# Optional: Specify Tesseract command path if not in system PATH
+from . import ocr_cache
+from . import ocr_engines
+from . import ocr_preprocess
+from . import ocr_tiles
+from . import text_regions
+from .ocr_result import OcrResult
+
+# The OCR engine (see ocr_engines) is created on first use, so importing this module (e.g. from the
+# GUI) does not load tesserocr/pytesseract or any language data until OCR is actually used. With
+# tesserocr installed the models stay loaded between calls; otherwise each call runs `tesseract`.
+
+_timings_lock = threading.Lock()
+
+def _add_time(timings, key, start):
+    """Adds the milliseconds since start (time.perf_counter) to timings[key]; strips and regions run in threads."""
+    if timings is not None:
+        elapsed = (time.perf_counter() - start) * 1000
+        with _timings_lock:
+            timings[key] = timings.get(key, 0.0) + elapsed
+
+def _recognize(kind, image_input, lang, engine, use_cache, preprocess=None, timings=None):
+    """
+    Runs the engine on the preprocessed image (see ocr_preprocess), through the OCR result cache
+    (see ocr_cache) unless it is disabled.
+
+    Returns:
+        str: The text, for kind "text".
+        dict: For kind "layout", an ocr_result.OcrResult.to_dict() in the coordinates of image_input.
+    """
+    ocr_engine = ocr_engines.get_engine(engine)
+    preprocess, _ = ocr_preprocess.resolve_preset(preprocess)
+
+    def compute(image):
+        if timings is not None:
+            timings["cached"] = False
+        start = time.perf_counter()
+        prepared, transform = ocr_preprocess.preprocess(image, preprocess)
+        _add_time(timings, "preprocess_ms", start)
+        start = time.perf_counter()
+        try:
+            if kind == "text":
+                return ocr_engine.image_to_string(prepared, lang=lang)
+            # One image_to_data pass gives words, lines and blocks together
+            data = ocr_preprocess.map_data(ocr_engine.image_to_data(prepared, lang=lang), transform, _image_size(image))
+            return OcrResult.from_data(data).to_dict()
+        finally:
+            _add_time(timings, "ocr_ms", start)
+
+    cache = ocr_cache.get_cache() if use_cache else None
+    if cache is None:
+        return compute(image_input)
+    value, _ = cache.get_or_compute(image_input, lang, ocr_engine.name, kind, compute,
+                                    config=ocr_engine.cache_config + ocr_preprocess.cache_tag(preprocess))
+    return value
+
+def _image_size(image_input):
+    if isinstance(image_input, str):
+        with Image.open(image_input) as opened: # Reads only the header
+            return opened.size
+    return image_input.size
+
+def _recognize_split(image_input, lang, engine, use_cache, preprocess, detect_regions, timings=None, workers=None):
+    """
+    Recognizes images that are better split up before OCR: very tall ones in strips (see
+    ocr_tiles), sparse ones by text region (see text_regions). Each part goes through _recognize.
+
+    Returns:
+        OcrResult: In the coordinates of image_input.
+        None: If the image should be recognized in one pass.
+    """
+    detect_regions = text_regions.resolve_mode(detect_regions)
+    tall = ocr_tiles.needs_tiling(_image_size(image_input)[1])
+    if not tall and detect_regions == "off":
+        return None
+    if isinstance(image_input, str):
+        with Image.open(image_input) as opened:
+            image_input = opened.copy()
+
+    def recognize_part(part):
+        return OcrResult.from_dict(_recognize("layout", part, lang, engine, use_cache, preprocess, timings))
+
+    if tall:
+        return ocr_tiles.recognize_tiled(image_input, recognize_part, workers)
+    start = time.perf_counter()
+    regions = text_regions.find_text_regions(image_input)
+    _add_time(timings, "detect_ms", start)
+    if detect_regions == "auto" and text_regions.coverage(regions, image_input.size) > text_regions.AUTO_MAX_COVERAGE:
+        return None
+    return text_regions.recognize_regions(image_input, regions, recognize_part, workers)
+
+def recognize(image_input, kind="text", lang='eng', engine=None, use_cache=True, preprocess=None, detect_regions=None,
+              timings=None, workers=None):
+    """
+    The OCR path behind extract_text_from_image and extract_layout (and batch_ocr), which raises
+    errors instead of printing them.
+
+    Args:
+        image_input, lang, engine, use_cache, preprocess, detect_regions: As in extract_text_from_image.
+        kind (str): "text" or "layout".
+        timings (dict, optional): Filled with the milliseconds spent in "preprocess_ms", "ocr_ms"
+                                  (the engine) and "detect_ms" (text regions), summed over strips and
+                                  regions, and "cached": True if no part needed the engine.
+        workers (int, optional): Parallel strips or regions (see ocr_tiles, text_regions).
+
+    Returns:
+        str: The text (stripped), for kind "text".
+        OcrResult: For kind "layout".
+
+    Raises:
+        ocr_engines.OcrError: If the engine is missing or fails; OSError if the image cannot be read.
+    """
+    if timings is not None:
+        timings["cached"] = bool(use_cache)
+    detect_regions = text_regions.resolve_mode(detect_regions)
+    tall = ocr_tiles.needs_tiling(_image_size(image_input)[1])
+    if detect_regions == "off" and not tall:
+        value = _recognize(kind, image_input, lang, engine, use_cache, preprocess, timings)
+    else:
+        def compute(image):
+            if timings is not None:
+                timings["cached"] = False
+            split = _recognize_split(image, lang, engine, use_cache, preprocess, detect_regions, timings, workers)
+            if split is not None:
+                return split.text if kind == "text" else split.to_dict()
+            # Stored below under the whole-image key; a second entry for the same pass is not needed
+            return _recognize(kind, image, lang, engine, False, preprocess, timings)
+
+        # Look the whole image up before decoding it for region detection, so a repeated lookup of an
+        # unchanged file stays a (path, size, mtime) memo hit; the parts are cached as well, which
+        # helps when a tall capture only grew at the bottom.
+        cache = ocr_cache.get_cache() if use_cache else None
+        if cache is None:
+            value = compute(image_input)
+        else:
+            ocr_engine = ocr_engines.get_engine(engine)
+            strip_height, strip_overlap = ocr_tiles.strip_settings()
+            config = (ocr_engine.cache_config + ocr_preprocess.cache_tag(preprocess)
+                      + f"|regions={detect_regions}|strips={strip_height},{strip_overlap}")
+            value, _ = cache.get_or_compute(image_input, lang, ocr_engine.name, kind, compute, config=config)
+    return value.strip() if kind == "text" else OcrResult.from_dict(value)
+
+# Optional: Specify Tesseract command path if not in system PATH (pytesseract engine)
 # Example:
 # if os.name == 'nt': # Windows
 #     pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -56,10 +198,14 @@ import os
 #     pass # Or specify path if needed, e.g., '/usr/local/bin/tesseract'
 
 
-def extract_text_from_image(image_input, lang='eng'):
+def extract_text_from_image(image_input, lang='eng', engine=None, use_cache=True, preprocess=None, detect_regions=None):
     """
     Extracts text from an image using Tesseract OCR.
 
+    Very tall images (e.g. scrolling captures) are recognized in overlapping strips in parallel
+    (see ocr_tiles), and sparse ones only where text was detected (see text_regions); their text
+    is then assembled from the recognized lines.
+
     Args:
         image_input (str or PIL.Image.Image): Path to an image file or a Pillow Image object.
                                               The image can be in formats like PNG, JPEG, TIFF, BMP, etc.
@@ -68,6 +214,12 @@ def extract_text_from_image(image_input, lang='eng'):
         lang (str, optional): Language code(s) for OCR (e.g., 'eng', 'chi_sim', 'eng+fra').
                               Defaults to 'eng'. Ensure the corresponding language data
                               (traineddata file) is installed in Tesseract's 'tessdata' directory.
+        engine (str, optional): "tesserocr", "pytesseract" or "auto". Defaults to the ocr.engine setting.
+        use_cache (bool, optional): Look the image up in the OCR result cache first (see ocr_cache).
+        preprocess (str, optional): Preprocessing preset (see ocr_preprocess.PRESETS). Defaults to the
+                                    ocr.preprocess setting.
+        detect_regions (str, optional): "off", "auto" or "on": OCR only the detected text regions
+                                        (see text_regions). Defaults to the ocr.text_regions setting.
 
     Returns:
         str: The extracted text.
@@ -75,25 +227,53 @@ def extract_text_from_image(image_input, lang='eng'):
               An error message will be printed to stderr.
     """
     try:
-        # pytesseract.image_to_string can directly handle both file paths and Pillow Image objects.
-        text = pytesseract.image_to_string(image_input, lang=lang)
-        return text.strip()
-    except pytesseract.TesseractNotFoundError:
-        print("OCR Error: Tesseract OCR engine not found or not in PATH.")
-        print("Please ensure Tesseract is installed and its path is configured correctly.")
-        print("See module documentation for installation details.")
+        return recognize(image_input, "text", lang, engine, use_cache, preprocess, detect_regions)
+    except ocr_engines.OcrError as e:
+        print(f"OCR Error: {e}")
+        if "not found or not in PATH" in str(e):
+            print("See module documentation for installation details.")
         return None
-    except pytesseract.TesseractError as e: # Catches other Tesseract-specific errors
-        print(f"OCR Error: Tesseract failed to process the image. Message: {e}")
-        print(f"This could be due to an unsupported image format, corrupted image, missing language data for '{lang}', or other Tesseract issues.")
+    except Exception as e:
+        print(f"OCR Error: An unexpected error occurred: {e}")
         return None
-    except FileNotFoundError: # If image_input is a path and the file doesn't exist
-        print(f"OCR Error: Image file not found at path: {image_input}")
+
+def extract_layout(image_input, lang='eng', engine=None, use_cache=True, preprocess=None, detect_regions=None):
+    """
+    Recognizes an image's words, lines and blocks with their bounding boxes and confidences, in one
+    engine pass (per strip for very tall images, see extract_text_from_image).
+
+    Args:
+        image_input (str or PIL.Image.Image): Path to an image file or a Pillow Image object.
+        lang (str, optional): Language code(s) for OCR, as in extract_text_from_image.
+        engine (str, optional), use_cache (bool, optional), preprocess (str, optional),
+        detect_regions (str, optional): As in extract_text_from_image. Boxes are in the coordinates
+            of image_input whatever the preset.
+
+    Returns:
+        ocr_result.OcrResult: The words in reading order, with lines() and blocks().
+        None: If an error occurred during OCR (the message is printed, as in extract_text_from_image).
+    """
+    try:
+        return recognize(image_input, "layout", lang, engine, use_cache, preprocess, detect_regions)
+    except ocr_engines.OcrError as e:
+        print(f"OCR Error: {e}")
         return None
     except Exception as e:
         print(f"OCR Error: An unexpected error occurred: {e}")
         return None
 
+def extract_words(image_input, lang='eng', engine=None, use_cache=True, preprocess=None, detect_regions=None):
+    """
+    Extracts the individual words of an image with their bounding boxes (see extract_layout).
+
+    Returns:
+        list: One dict per recognized word, in reading order:
+              {"text", "box": (x1, y1, x2, y2), "conf" (0-100), "line": (block, paragraph, line)}.
+        None: If an error occurred during OCR (the message is printed, as in extract_text_from_image).
+    """
+    layout = extract_layout(image_input, lang, engine, use_cache, preprocess, detect_regions)
+    return layout.words() if layout is not None else None
+
 if __name__ == "__main__":
     print("Testing OCR functionality...")
 
@@ -120,7 +300,8 @@ if __name__ == "__main__":
         # Simple text drawing (may need adjustment based on font metrics for perfection)
         draw.text((10, 10), text_to_draw, fill="black", font=font)
 
-        print(f"Attempting OCR on generated image with text: \"{text_to_draw.replace('\\n', ' ')}\"")
+        flat_text = text_to_draw.replace('\n', ' ')
+        print(f"Attempting OCR on generated image with text: \"{flat_text}\"")
         extracted_text_generated = extract_text_from_image(generated_image, lang='eng')
 
         if extracted_text_generated is not None:
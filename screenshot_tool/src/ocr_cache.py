@@ -0,0 +1,245 @@
+"""
+Persistent cache of OCR results, keyed by the image content.
+
+The key is a SHA-256 of the pixel data (mode, size and raw bytes), the language, the engine and
+any other settings that change the result (e.g. a preprocessing preset). The same screenshot
+re-opened from another file, identical dashboard frames and re-runs of batch jobs therefore hit the
+cache, while an edited image does not.
+
+Results are stored in an SQLite database in the user cache directory (WAL mode, so several
+processes of a batch job can share it). Its size is capped by ocr.cache_max_mb; when it grows past
+the cap, the least recently used entries are deleted. A small in-memory LRU sits in front of it,
+and file paths are remembered by (path, size, mtime), so repeated lookups of the same file return
+in microseconds without decoding or hashing the image again.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import appdirs
+
+from . import config_manager
+
+CACHE_PATH = os.path.join(appdirs.user_cache_dir(config_manager.APP_NAME, config_manager.APP_AUTHOR), "ocr_cache.sqlite")
+DEFAULT_MAX_MB = 64
+MEMORY_ENTRIES = 256 # Results kept in the in-memory LRU in front of the database
+PATH_ENTRIES = 4096 # File -> content key memo entries
+
+def image_digest(image):
+    """SHA-256 (hex) of an image's mode, size and pixels."""
+    digest = hashlib.sha256(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def make_key(pixel_digest, lang, engine, kind, config=""):
+    """Cache key for one OCR result; kind is e.g. "text" or "layout", config any result-changing settings."""
+    return hashlib.sha256("\0".join((pixel_digest, lang, engine, kind, config)).encode("utf-8")).hexdigest()
+
+
+class OcrCache:
+    def __init__(self, path=None, max_mb=None):
+        """
+        Args:
+            path (str, optional): SQLite file. Defaults to CACHE_PATH.
+            max_mb (float, optional): Size cap of the stored results. Defaults to ocr.cache_max_mb.
+        """
+        self.path = path or CACHE_PATH
+        if max_mb is None:
+            max_mb = config_manager.get_setting("ocr", "cache_max_mb", DEFAULT_MAX_MB)
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict() # key -> value, least recently used first
+        self._paths = collections.OrderedDict() # (path, size, mtime_ns) -> pixel digest
+        self._db = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL") # A lost cache entry after a power cut is harmless
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                             "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        return self._db
+
+    def digest_for(self, image_input):
+        """
+        Returns (pixel digest, image or None) for a PIL image or a path. For a path seen before with
+        the same size and mtime, the image is not loaded at all and None is returned for it.
+        """
+        if not isinstance(image_input, str):
+            return image_digest(image_input), image_input
+        stat = os.stat(image_input)
+        path_key = (os.path.abspath(image_input), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._paths.get(path_key)
+            if digest is not None:
+                self._paths.move_to_end(path_key)
+                return digest, None
+        from PIL import Image
+        with Image.open(image_input) as opened:
+            image = opened.copy()
+        digest = image_digest(image)
+        with self._lock:
+            self._paths[path_key] = digest
+            while len(self._paths) > PATH_ENTRIES:
+                self._paths.popitem(last=False)
+        return digest, image
+
+    def get(self, key):
+        """Returns the cached value for key, or None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return value
+            try:
+                db = self._connect()
+                row = db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error as e:
+                print(f"OCR cache error: {e}")
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores a JSON-serializable value, evicting least recently used entries over the size cap."""
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        size = len(data.encode("utf-8")) + len(key)
+        with self._lock:
+            self._remember(key, value)
+            try:
+                db = self._connect()
+                old = db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                db.execute("INSERT OR REPLACE INTO results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                           (key, data, size, time.time()))
+                self._total_bytes += size - (old[0] if old else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict(db)
+            except sqlite3.Error as e:
+                print(f"OCR cache error: {e}")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _evict(self, db):
+        # Other processes may have written too; recount, then drop the oldest entries down to 90 % of the cap.
+        # Hits on the in-memory LRU do not update last_used, so the entries it holds go last.
+        self._total_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        rows = db.execute("SELECT key, size FROM results ORDER BY last_used").fetchall()
+        rows.sort(key=lambda row: row[0] in self._memory) # Stable: by last_used within each group
+        freed, doomed = 0, []
+        for key, size in rows:
+            if self._total_bytes - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+        db.executemany("DELETE FROM results WHERE key = ?", doomed)
+        for (key,) in doomed:
+            self._memory.pop(key, None)
+        self._total_bytes -= freed
+        self.evictions += len(doomed)
+
+    def get_or_compute(self, image_input, lang, engine, kind, compute, config=""):
+        """
+        Returns (value, hit): the cached result for the image, or compute(image) stored in the cache.
+
+        Args:
+            image_input (str or PIL.Image.Image): Image or image path.
+            lang (str), engine (str), kind (str), config (str): See make_key.
+            compute (callable): compute(image or path) -> JSON-serializable result. Results that are
+                                None are returned but not cached (failures are not remembered).
+        """
+        digest, image = self.digest_for(image_input)
+        key = make_key(digest, lang, engine, kind, config)
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute(image if image is not None else image_input)
+        if value is not None:
+            self.put(key, value)
+        return value, False
+
+    def count(self):
+        """Number of results stored in the database."""
+        with self._lock:
+            try:
+                return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"OCR cache error: {e}")
+                return 0
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._paths.clear()
+            try:
+                self._connect().execute("DELETE FROM results")
+            except sqlite3.Error as e:
+                print(f"OCR cache error: {e}")
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_status(self):
+        lookups = self.hits + self.misses
+        return {"path": self.path, "hits": self.hits, "memory_hits": self.memory_hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "evictions": self.evictions,
+                "memory_entries": len(self._memory), "stored_bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Returns the process-wide cache, or None if disabled (ocr.cache_enabled)."""
+    global _cache
+    if not config_manager.get_setting("ocr", "cache_enabled", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show or clear the OCR result cache.")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached results.")
+    args = parser.parse_args()
+    cache = OcrCache()
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    entries = cache.count()
+    status = cache.get_status()
+    print(f"{cache.path}: {entries} result(s), {status['stored_bytes'] / 1024:.0f} KB of {status['max_bytes'] / 1024 / 1024:.0f} MB")
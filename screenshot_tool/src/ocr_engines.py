@@ -0,0 +1,246 @@
+"""
+OCR engines behind ocr.extract_text_from_image and ocr.extract_words.
+
+"tesserocr" runs libtesseract in-process through the tesserocr binding. Loaded APIs (language
+models) are kept in a pool per language: a call checks one out and returns it, so recognizing a
+small region costs only the recognition itself, whichever thread asks. The pool grows to at most
+one API per CPU (max_apis), when that many threads recognize at once. tesserocr releases the GIL
+while recognizing, so threads (or the worker processes of the batch tools, each with its own
+engine) run in parallel.
+
+"pytesseract" starts a `tesseract` process per call, which writes a temporary image and reloads
+the language data every time (hundreds of milliseconds of overhead). It is the fallback when
+tesserocr is not installed.
+
+The engine is chosen with the ocr.engine setting: "auto" (tesserocr if available, else
+pytesseract), "tesserocr" or "pytesseract". Installing the binding: `pip install tesserocr` (it
+needs the libtesseract headers, e.g. `sudo apt-get install libtesseract-dev libleptonica-dev`).
+"""
+
+import contextlib
+import os
+import queue
+import threading
+
+from PIL import Image
+
+from . import config_manager
+
+ENGINES = ("tesserocr", "pytesseract")
+# Columns of Tesseract's TSV output, in order (the same keys as pytesseract's image_to_data dict)
+DATA_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                "left", "top", "width", "height", "conf", "text")
+
+
+class OcrError(Exception):
+    """OCR failed; the message is meant for the user."""
+
+
+def _load_image(image_input):
+    """Returns a PIL image for a path or image, in a mode Tesseract accepts."""
+    if isinstance(image_input, Image.Image):
+        image = image_input
+    else:
+        try:
+            with Image.open(image_input) as opened:
+                image = opened.copy()
+        except FileNotFoundError:
+            raise OcrError(f"Image file not found at path: {image_input}")
+    # Tesseract works on gray or RGB; dropping alpha here avoids a conversion inside the engine
+    return image if image.mode in ("L", "RGB") else image.convert("RGB")
+
+def parse_tsv(tsv, has_header=False):
+    """Parses Tesseract TSV output into a dict of columns (like pytesseract.Output.DICT)."""
+    data = {column: [] for column in DATA_COLUMNS}
+    lines = tsv.splitlines()[1 if has_header else 0:]
+    for line in lines:
+        fields = line.split("\t")
+        if len(fields) < len(DATA_COLUMNS) - 1:
+            continue
+        if len(fields) == len(DATA_COLUMNS) - 1: # Rows without a word have no text column
+            fields.append("")
+        for column, value in zip(DATA_COLUMNS, fields):
+            data[column].append(value if column == "text" else (float(value) if column == "conf" else int(value)))
+    return data
+
+
+class TesserocrEngine:
+    """libtesseract in-process; a bounded pool of loaded APIs per language."""
+
+    name = "tesserocr"
+
+    def __init__(self, tessdata_dir=None, max_apis=None):
+        import tesserocr # ImportError tells get_engine to fall back
+        self._tesserocr = tesserocr
+        self.tessdata_dir = tessdata_dir or None
+        self.max_apis = max_apis or os.cpu_count() or 1 # Per language
+        self._idle = {} # lang -> LifoQueue of loaded APIs not in use (the most recently used first)
+        self._loaded = {} # lang -> number of APIs loaded, idle or in use
+        self._apis_lock = threading.Lock()
+
+    @property
+    def api_count(self):
+        """Number of loaded APIs over all languages."""
+        with self._apis_lock:
+            return sum(self._loaded.values())
+
+    @contextlib.contextmanager
+    def _api(self, lang):
+        """Checks out a loaded API for lang, loading one if all are busy and fewer than max_apis exist."""
+        with self._apis_lock:
+            idle = self._idle.setdefault(lang, queue.LifoQueue())
+            load = idle.empty() and self._loaded.get(lang, 0) < self.max_apis
+            if load:
+                self._loaded[lang] = self._loaded.get(lang, 0) + 1
+        if load:
+            options = {"lang": lang}
+            if self.tessdata_dir:
+                options["path"] = self.tessdata_dir
+            try:
+                api = self._tesserocr.PyTessBaseAPI(**options)
+            except RuntimeError as e:
+                with self._apis_lock:
+                    self._loaded[lang] -= 1
+                raise OcrError(f"Could not load Tesseract language data for '{lang}': {e}")
+        else:
+            api = idle.get() # Waits for another thread to return one
+        try:
+            yield api
+        finally:
+            idle.put(api)
+
+    @property
+    def cache_config(self):
+        """Engine settings that change results, for ocr_cache keys."""
+        return self.tessdata_dir or ""
+
+    def image_to_string(self, image_input, lang="eng"):
+        image = _load_image(image_input)
+        with self._api(lang) as api:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+    def image_to_data(self, image_input, lang="eng"):
+        image = _load_image(image_input)
+        with self._api(lang) as api:
+            api.SetImage(image)
+            api.Recognize()
+            return parse_tsv(api.GetTSVText(0))
+
+    def close(self):
+        """Frees the idle APIs (all of them when no recognition is running); later calls load new ones."""
+        with self._apis_lock:
+            for lang, idle in self._idle.items():
+                while not idle.empty():
+                    idle.get_nowait().End()
+                    self._loaded[lang] -= 1
+
+
+class PytesseractEngine:
+    """The tesseract command line program, one process per call."""
+
+    name = "pytesseract"
+
+    def __init__(self, tessdata_dir=None):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self._config = f'--tessdata-dir "{tessdata_dir}"' if tessdata_dir else ""
+        self.cache_config = tessdata_dir or ""
+
+    def _call(self, func, image_input, lang):
+        pytesseract = self._pytesseract
+        try:
+            # pytesseract handles both file paths and Pillow Image objects
+            return func(image_input, lang=lang, config=self._config)
+        except pytesseract.TesseractNotFoundError:
+            raise OcrError("Tesseract OCR engine not found or not in PATH. "
+                           "Please ensure Tesseract is installed and its path is configured correctly.")
+        except pytesseract.TesseractError as e:
+            raise OcrError(f"Tesseract failed to process the image. Message: {e}. This could be due to an unsupported "
+                           f"image format, corrupted image, missing language data for '{lang}', or other Tesseract issues.")
+        except FileNotFoundError:
+            raise OcrError(f"Image file not found at path: {image_input}")
+
+    def image_to_string(self, image_input, lang="eng"):
+        return self._call(self._pytesseract.image_to_string, image_input, lang)
+
+    def image_to_data(self, image_input, lang="eng"):
+        return self._call(lambda image, **kw: self._pytesseract.image_to_data(image, output_type=self._pytesseract.Output.DICT, **kw),
+                          image_input, lang)
+
+    def close(self):
+        pass
+
+
+_ENGINE_CLASSES = {"tesserocr": TesserocrEngine, "pytesseract": PytesseractEngine}
+_engines = {} # name -> engine instance, one per process
+_engines_lock = threading.Lock()
+
+def available_engines():
+    """Names of the engines whose Python package is installed (the Tesseract data may still be missing)."""
+    available = []
+    for name in ENGINES:
+        try:
+            __import__(name)
+            available.append(name)
+        except ImportError:
+            pass
+    return available
+
+def get_engine(name=None):
+    """
+    Returns the shared engine instance for name (default: the ocr.engine setting).
+
+    "auto" picks tesserocr when it is installed, otherwise pytesseract.
+
+    Raises:
+        OcrError: If the requested engine (or, for "auto", any engine) is not installed.
+    """
+    if name is None:
+        name = config_manager.get_setting("ocr", "engine", "auto")
+    candidates = list(ENGINES) if name == "auto" else [name]
+    with _engines_lock:
+        for candidate in candidates:
+            if candidate in _engines:
+                return _engines[candidate]
+            if candidate not in _ENGINE_CLASSES:
+                raise OcrError(f"Unknown OCR engine {candidate!r}; expected 'auto' or one of {ENGINES}")
+            try:
+                engine = _ENGINE_CLASSES[candidate](config_manager.get_setting("ocr", "tessdata_dir", "") or None)
+            except ImportError:
+                continue
+            _engines[candidate] = engine
+            return engine
+    if name == "auto":
+        raise OcrError("No OCR engine is installed. Install pytesseract (`pip install pytesseract`) or tesserocr.")
+    raise OcrError(f"The OCR engine {name!r} is not installed (`pip install {name}`).")
+
+def close_engines():
+    """Frees the loaded models of all engines (e.g. before a worker process exits)."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.close()
+        _engines.clear()
+
+
+if __name__ == "__main__":
+    import time
+    from PIL import ImageDraw
+    from . import fonts
+
+    print(f"Installed engines: {available_engines() or 'none'}")
+    region = Image.new("RGB", (320, 48), "white")
+    ImageDraw.Draw(region).text((8, 8), "Persistent OCR 12345", fill="black", font=fonts.get_font("sans", 24))
+    for engine_name in available_engines():
+        try:
+            engine = get_engine(engine_name)
+            start = time.perf_counter()
+            first = engine.image_to_string(region)
+            first_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            for _ in range(10):
+                engine.image_to_string(region)
+            warm_ms = (time.perf_counter() - start) * 100
+            print(f"{engine_name}: first call {first_ms:.0f} ms, then {warm_ms:.0f} ms per small region -> {first.strip()!r}")
+        except OcrError as e:
+            print(f"{engine_name}: {e}")
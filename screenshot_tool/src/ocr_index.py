@@ -0,0 +1,440 @@
+"""
+Full-text search over saved screenshots: an SQLite FTS5 index of their OCR text and word boxes.
+
+Each indexed image has a row in `files` (path, mtime, size, SHA-256 of the file, language and the
+words/lines layout from ocr_result, stored compactly) and its text in the FTS5 table
+`text_index`, under the same rowid. Queries run against the FTS index, so they take milliseconds
+even for tens of thousands of screenshots; only the layouts of the returned files are decoded,
+to turn the matched words into highlight regions.
+
+The index is updated incrementally (OcrIndex.update):
+  - files whose mtime and size are unchanged are skipped without reading them, except files whose
+    OCR failed, which are tried again once RETRY_FAILED_AFTER seconds have passed,
+  - a changed mtime with the same content hash only updates the row,
+  - content already indexed under another path (a copied or moved screenshot) reuses that
+    layout instead of running OCR again,
+  - everything else is OCR'd (with batch_ocr.ocr_file, in worker processes when workers > 1),
+  - rows of files that disappeared from the indexed directories are deleted.
+OcrIndexer repeats this in a background thread for the screenshot folder (general.default_save_path),
+so new captures become searchable shortly after they are saved.
+
+The FTS tokenizer is set by search.tokenizer when the index is created: "unicode61" (words,
+prefix search) or "trigram" (substring search, better for Chinese/Japanese text without spaces).
+
+Usage (from the screenshot_tool directory):
+    python -m src.ocr_index update ~/Pictures/Screenshots --workers 4
+    python -m src.ocr_index search "connection refused"
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import appdirs
+
+from . import config_manager
+
+INDEX_PATH = os.path.join(appdirs.user_data_dir(config_manager.APP_NAME, config_manager.APP_AUTHOR), "ocr_index.sqlite")
+TOKENIZERS = {"unicode61": "unicode61 remove_diacritics 2", "trigram": "trigram"}
+COMMIT_EVERY = 50 # Rows written per transaction during an update
+DEFAULT_SCAN_INTERVAL = 30 # Seconds between scans of the background indexer
+RETRY_FAILED_AFTER = 300 # Seconds before OCR of a file that failed is tried again
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 (hex) of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _init_worker():
+    # One image per worker process; Tesseract's (OpenMP) and OpenCV's own threads would oversubscribe the cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+
+def _ocr_job(job):
+    from . import batch_ocr
+    path, lang = job
+    # One image at a time in the background (or per worker process): no extra threads for strips or regions
+    return batch_ocr.ocr_file(path, lang, layout=True, workers=1)
+
+def _tokens(text):
+    """The words of text as FTS5's unicode61 tokenizer sees them (roughly): runs of word characters, case-folded."""
+    return re.findall(r"\w+", text.casefold())
+
+
+class OcrIndex:
+    def __init__(self, path=None, tokenizer=None):
+        """
+        Args:
+            path (str, optional): SQLite file. Defaults to INDEX_PATH.
+            tokenizer (str, optional): "unicode61" or "trigram", used when the index is created.
+                                       Defaults to the search.tokenizer setting.
+        """
+        self.path = path or INDEX_PATH
+        self.tokenizer = tokenizer or config_manager.get_setting("search", "tokenizer", "unicode61")
+        if self.tokenizer not in TOKENIZERS:
+            raise ValueError(f"Unknown FTS tokenizer {self.tokenizer!r}; expected one of {tuple(TOKENIZERS)}")
+        self._lock = threading.RLock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL") # Searches can run while the indexer writes
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, "
+                       "mtime REAL, size INTEGER, sha256 TEXT, lang TEXT, layout TEXT, error TEXT, indexed_at REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = db.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()
+            if row is None:
+                db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS text_index USING fts5(text, tokenize='{TOKENIZERS[self.tokenizer]}')")
+                db.execute("INSERT INTO meta (key, value) VALUES ('tokenizer', ?)", (self.tokenizer,))
+                db.commit()
+            else:
+                self.tokenizer = row[0] # An existing index keeps the tokenizer it was built with
+            self._db = db
+        return self._db
+
+    # --- Updating ---
+
+    def update(self, paths, lang="eng", workers=1, on_result=None, should_stop=None, retry_failed_after=RETRY_FAILED_AFTER):
+        """
+        Brings the index up to date for the images in paths (files or directories, searched recursively).
+
+        Args:
+            paths (list): Image files and/or directories.
+            lang (str): Tesseract language code(s) for images that need OCR.
+            workers (int): OCR worker processes; 1 runs OCR in this process.
+            on_result (callable, optional): Called with the batch_ocr record of each OCR'd image.
+            should_stop (callable, optional): Returns True to end the update early (e.g. on shutdown).
+            retry_failed_after (float): Seconds after a failed OCR before the file is tried again,
+                                        even if it did not change.
+
+        Returns:
+            dict: {"unchanged", "touched", "reused", "ocr", "failed", "removed", "seconds"}
+        """
+        from . import image_ops
+        start = time.perf_counter()
+        summary = {"unchanged": 0, "touched": 0, "reused": 0, "ocr": 0, "failed": 0, "removed": 0}
+        roots = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            db = self._connect()
+            known = {path: (file_id, mtime, size, sha256, file_lang, error, indexed_at)
+                     for file_id, path, mtime, size, sha256, file_lang, error, indexed_at in
+                     db.execute("SELECT id, path, mtime, size, sha256, lang, error, indexed_at FROM files")}
+        retry_before = time.time() - retry_failed_after
+
+        present, pending = set(), []
+        for path in image_ops.collect_images(paths):
+            path = os.path.abspath(path)
+            present.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            row = known.get(path)
+            if (row is not None and row[1] == stat.st_mtime and row[2] == stat.st_size and row[4] == lang
+                    and (row[5] is None or row[6] > retry_before)):
+                summary["unchanged"] += 1
+                continue
+            pending.append((path, stat))
+
+        # Hash the new and changed files; identical content needs no OCR
+        to_ocr = []
+        for count, (path, stat) in enumerate(pending, 1):
+            if should_stop is not None and should_stop():
+                break
+            try:
+                sha256 = file_digest(path)
+            except OSError:
+                continue
+            row = known.get(path)
+            with self._lock:
+                if row is not None and row[3] == sha256 and row[4] == lang and row[5] is None:
+                    self._db.execute("UPDATE files SET mtime = ?, size = ? WHERE id = ?", (stat.st_mtime, stat.st_size, row[0]))
+                    summary["touched"] += 1
+                elif self._copy_layout(path, stat, sha256, lang):
+                    summary["reused"] += 1
+                else:
+                    to_ocr.append((path, stat.st_size, sha256))
+                if count % COMMIT_EVERY == 0:
+                    self._db.commit()
+        with self._lock:
+            self._db.commit()
+
+        def store(record, size, sha256):
+            if "error" in record:
+                summary["failed"] += 1
+                self._write(record["path"], record.get("mtime"), size, sha256, lang, None, None, record["error"])
+            else:
+                summary["ocr"] += 1
+                self._write(record["path"], record["mtime"], size, sha256, lang, record["text"], record["layout"], None)
+            if (summary["ocr"] + summary["failed"]) % COMMIT_EVERY == 0:
+                with self._lock:
+                    self._db.commit()
+            if on_result is not None:
+                on_result(record)
+
+        if workers <= 1:
+            for path, size, sha256 in to_ocr:
+                if should_stop is not None and should_stop():
+                    break
+                store(_ocr_job((path, lang)), size, sha256)
+        elif to_ocr:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Backpressure as in batch_ocr: never more images submitted than there are workers
+                in_flight = {}
+                for path, size, sha256 in to_ocr:
+                    if should_stop is not None and should_stop():
+                        break
+                    if len(in_flight) >= workers:
+                        finished, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in finished:
+                            store(future.result(), *in_flight.pop(future))
+                    in_flight[pool.submit(_ocr_job, (path, lang))] = (size, sha256)
+                for future in concurrent.futures.as_completed(in_flight):
+                    store(future.result(), *in_flight[future])
+
+        # Forget files that were deleted from (or moved out of) the indexed directories
+        with self._lock:
+            for path, row in known.items():
+                if path in present or os.path.exists(path):
+                    continue
+                if any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots):
+                    self._delete(row[0])
+                    summary["removed"] += 1
+            self._db.commit()
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+    def _copy_layout(self, path, stat, sha256, lang):
+        """Indexes path with the layout of an already indexed file with the same content. Returns True if one existed."""
+        source = self._db.execute("SELECT f.layout, t.text FROM files f JOIN text_index t ON t.rowid = f.id "
+                                  "WHERE f.sha256 = ? AND f.lang = ? AND f.layout IS NOT NULL LIMIT 1",
+                                  (sha256, lang)).fetchone()
+        if source is None:
+            return False
+        self._write(path, stat.st_mtime, stat.st_size, sha256, lang, source[1], source[0], None, commit=False)
+        return True
+
+    def _write(self, path, mtime, size, sha256, lang, text, layout, error, commit=False):
+        if layout is not None and not isinstance(layout, str):
+            layout = json.dumps(layout, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                self._delete(row[0])
+            cursor = db.execute("INSERT INTO files (path, mtime, size, sha256, lang, layout, error, indexed_at) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (path, mtime, size, sha256, lang, layout, error, time.time()))
+            if text is not None:
+                db.execute("INSERT INTO text_index (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+            if commit:
+                db.commit()
+
+    def _delete(self, file_id):
+        self._db.execute("DELETE FROM text_index WHERE rowid = ?", (file_id,))
+        self._db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    # --- Searching ---
+
+    def _match_expression(self, query):
+        """Turns plain words into an FTS5 query matching all of them (as prefixes with unicode61)."""
+        terms = re.findall(r"\w+", query)
+        suffix = "*" if self.tokenizer == "unicode61" else ""
+        return " ".join(f'"{term}"{suffix}' for term in terms)
+
+    def search(self, query, limit=20, raw=False):
+        """
+        Finds the screenshots containing query, best matches first.
+
+        Args:
+            query (str): Words that must all occur (word prefixes match too), or with raw=True an
+                         FTS5 query expression ("error NOT warning", '"exact phrase"', ...).
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: {"path", "snippet" (matches in [brackets]), "score" (lower is better),
+                   "regions": [(x1, y1, x2, y2), ...] of the matched words, merged per line}.
+        """
+        expression = query if raw else self._match_expression(query)
+        if not expression.strip():
+            return []
+        terms = _tokens(re.sub(r"\b(AND|OR|NOT|NEAR)\b", " ", query))
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    "SELECT f.path, f.layout, snippet(text_index, 0, '[', ']', '...', 12), bm25(text_index) "
+                    "FROM text_index JOIN files f ON f.id = text_index.rowid "
+                    "WHERE text_index MATCH ? ORDER BY bm25(text_index) LIMIT ?", (expression, limit)).fetchall()
+            except sqlite3.OperationalError as e:
+                print(f"Search Error: {e}")
+                return []
+        return [{"path": path, "snippet": snippet.replace("\n", " "), "score": score,
+                 "regions": self._regions(layout, terms)} for path, layout, snippet, score in rows]
+
+    def _regions(self, layout_json, terms):
+        from .ocr_result import OcrResult
+        if not layout_json or not terms:
+            return []
+        layout = OcrResult.from_dict(json.loads(layout_json))
+        substring = self.tokenizer == "trigram"
+        regions = []
+        for line in layout.lines():
+            current = None
+            for i in line["words"]:
+                text = layout.word_text(i).casefold()
+                if substring:
+                    hit = any(term in text for term in terms)
+                else: # "user@example.com" is three tokens; the whole word is highlighted when one matches
+                    hit = any(token.startswith(term) for token in _tokens(text) for term in terms)
+                if not hit:
+                    current = None
+                    continue
+                box = layout.word_box(i)
+                if current is None:
+                    current = list(box)
+                    regions.append(current)
+                else: # Consecutive matched words (a phrase) become one region
+                    current[:] = [min(current[0], box[0]), min(current[1], box[1]), max(current[2], box[2]), max(current[3], box[3])]
+        return [tuple(region) for region in regions]
+
+    def stats(self):
+        with self._lock:
+            db = self._connect()
+            files, failed = db.execute("SELECT COUNT(*), COUNT(error) FROM files").fetchone()
+        return {"path": self.path, "files": files, "failed": failed, "tokenizer": self.tokenizer,
+                "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+class OcrIndexer:
+    """Keeps the index up to date for a set of directories, from a background thread."""
+
+    def __init__(self, directories=None, lang=None, interval=None, index=None):
+        """
+        Args:
+            directories (list, optional): Defaults to [general.default_save_path].
+            lang (str, optional): Defaults to the search.lang setting.
+            interval (float, optional): Seconds between scans. Defaults to search.scan_interval.
+            index (OcrIndex, optional): Defaults to a new OcrIndex on INDEX_PATH.
+        """
+        self.directories = directories or [config_manager.get_setting("general", "default_save_path")]
+        self.lang = lang or config_manager.get_setting("search", "lang", "eng")
+        self.interval = interval or config_manager.get_setting("search", "scan_interval", DEFAULT_SCAN_INTERVAL)
+        self.index = index or OcrIndex()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.scans = 0
+        self.indexed = 0
+        self.last_summary = None
+        self.last_error = None
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ocr-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.index.close()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self):
+        return {"running": self.is_running(), "directories": self.directories, "scans": self.scans,
+                "indexed": self.indexed, "last_summary": self.last_summary, "last_error": self.last_error}
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            directories = [d for d in self.directories if os.path.isdir(d)]
+            try:
+                summary = self.index.update(directories, lang=self.lang, should_stop=self._stop_event.is_set)
+                self.indexed += summary["ocr"] + summary["reused"]
+                self.last_summary = summary
+            except Exception as e: # Keep watching; a locked or broken database may recover
+                self.last_error = str(e)
+                print(f"OCR indexer error: {e}")
+            self.scans += 1
+            self._stop_event.wait(self.interval)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Index screenshots for full-text search and query the index.")
+    parser.add_argument("--index", help=f"Index file (default: {INDEX_PATH}).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    update = commands.add_parser("update", help="Index new and changed images, forget deleted ones.")
+    update.add_argument("inputs", nargs="*", help="Image files or directories (default: the screenshot folder).")
+    update.add_argument("--lang", default=None, help="Tesseract language code(s) (default: search.lang).")
+    update.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="OCR worker processes.")
+    search = commands.add_parser("search", help="Find screenshots containing the given words.")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--raw", action="store_true", help="Pass the query to FTS5 as is (AND/OR/NOT, \"phrases\").")
+    search.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    watch = commands.add_parser("watch", help="Keep indexing the screenshot folder until interrupted.")
+    watch.add_argument("directories", nargs="*")
+    commands.add_parser("stats", help="Show the size of the index.")
+    args = parser.parse_args()
+
+    ocr_index = OcrIndex(args.index)
+    if args.command == "update":
+        inputs = args.inputs or [config_manager.get_setting("general", "default_save_path")]
+        lang = args.lang or config_manager.get_setting("search", "lang", "eng")
+
+        def report(record):
+            print(f"FAILED {record['path']}: {record['error']}" if "error" in record else f"Indexed {record['path']}")
+
+        result = ocr_index.update(inputs, lang=lang, workers=args.workers, on_result=report)
+        print(f"{result['ocr']} OCR'd, {result['reused']} reused, {result['touched']} touched, {result['unchanged']} unchanged, "
+              f"{result['failed']} failed, {result['removed']} removed in {result['seconds']:.1f}s")
+    elif args.command == "search":
+        start = time.perf_counter()
+        results = ocr_index.search(args.query, limit=args.limit, raw=args.raw)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            for result in results:
+                print(f"{result['path']}\n    {result['snippet']}\n    regions: {result['regions']}")
+            print(f"{len(results)} result(s) in {elapsed_ms:.1f} ms")
+    elif args.command == "watch":
+        indexer = OcrIndexer(args.directories or None, index=ocr_index)
+        indexer.start()
+        print(f"Indexing {indexer.directories} every {indexer.interval}s; Ctrl+C to stop.")
+        try:
+            while indexer.is_running():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        indexer.stop()
+        print(indexer.get_status())
+    else:
+        print(ocr_index.stats())
+    ocr_index.close()
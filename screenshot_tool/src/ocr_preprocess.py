@@ -0,0 +1,224 @@
+"""
+Image preprocessing before OCR, vectorized with NumPy/OpenCV.
+
+Screenshots are a poor match for Tesseract's defaults: RGBA at 1x DPI, small anti-aliased UI text,
+and dark themes with light text on a dark background. Each step below addresses one of these:
+
+    grayscale    RGB(A) -> 8-bit gray, so Tesseract does not convert (and we can threshold)
+    invert_dark  light-on-dark images are inverted to dark-on-light
+    crop_border  uniform margins (window backgrounds, letterboxing) are trimmed
+    upscale      enlarges the image, by a fixed factor or ("auto") until the typical glyph is
+                 TARGET_TEXT_HEIGHT pixels tall, estimated from connected components
+    threshold    "adaptive" (local mean, robust to gradients and colored panels) or "otsu" (global)
+                 binarization, replacing Tesseract's own, slower one
+
+Steps are combined into named PRESETS; the ocr.preprocess setting picks the one used by
+ocr.extract_text_from_image, ocr.extract_words and batch_ocr. benchmarks/ocr_preprocess_benchmark.py
+measures the speed and accuracy of every preset, to choose the fastest one that is accurate enough.
+
+Cropping and upscaling move the text, so preprocess() also returns the transform that maps boxes
+found in the processed image back to the original (map_box, map_data).
+"""
+
+import time
+
+from PIL import Image
+
+from . import config_manager
+
+PRESETS = {
+    "none": {},
+    "gray": {"grayscale": True},
+    "fast": {"grayscale": True, "invert_dark": True},
+    "ui": {"grayscale": True, "invert_dark": True, "crop_border": True, "upscale": "auto"},
+    "small_text": {"grayscale": True, "invert_dark": True, "crop_border": True, "upscale": 3.0},
+    "binarize": {"grayscale": True, "invert_dark": True, "crop_border": True, "upscale": "auto", "threshold": "adaptive"},
+    "otsu": {"grayscale": True, "invert_dark": True, "crop_border": True, "upscale": "auto", "threshold": "otsu"},
+}
+DEFAULT_PRESET = "fast"
+
+DARK_MEAN_LEVEL = 110 # Images whose mean gray level is below this are treated as dark-themed
+BORDER_TOLERANCE = 12 # Gray levels a margin pixel may differ from the background and still be cropped
+BORDER_PADDING = 8 # Pixels of background kept around the content (Tesseract needs a little margin)
+TARGET_TEXT_HEIGHT = 20 # Typical glyph height "auto" upscaling aims for; Tesseract is least accurate below ~10 px
+MAX_UPSCALE = 4.0
+MAX_OUTPUT_PIXELS = 40_000_000 # Upscaling never produces a larger image than this
+ADAPTIVE_BLOCK_SIZE = 31 # Neighborhood of the adaptive threshold, in pixels of the (upscaled) image
+ADAPTIVE_OFFSET = 12 # A pixel becomes black when it is this much darker than its neighborhood mean
+
+IDENTITY = (1.0, 0, 0) # (scale, left, top): original = processed / scale + (left, top)
+
+def resolve_preset(preset=None):
+    """
+    Returns (name, steps) for a preset name (default: the ocr.preprocess setting).
+
+    Raises:
+        ValueError: For an unknown preset name.
+    """
+    if preset is None:
+        preset = config_manager.get_setting("ocr", "preprocess", DEFAULT_PRESET)
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown OCR preprocessing preset {preset!r}; expected one of {tuple(PRESETS)}")
+    return preset, PRESETS[preset]
+
+def cache_tag(preset=None):
+    """Part of the OCR cache key (see ocr_cache.make_key) for a preset; empty for "none"."""
+    name, steps = resolve_preset(preset)
+    return f"|preprocess={name}" if steps else ""
+
+def to_gray(image):
+    """Returns image (PIL) as a 2-D uint8 NumPy array."""
+    import cv2
+    import numpy as np
+    if image.mode in ("I;16", "I", "F"):
+        image = image.convert("L")
+    elif image.mode not in ("L", "RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    pixels = np.asarray(image)
+    if image.mode == "RGBA":
+        return cv2.cvtColor(pixels, cv2.COLOR_RGBA2GRAY)
+    if image.mode == "RGB":
+        return cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+    return pixels.copy()
+
+def _invert_dark(gray):
+    # A strided sample is enough to tell a dark theme from a light one
+    if gray[::4, ::4].mean() < DARK_MEAN_LEVEL:
+        return 255 - gray, True
+    return gray, False
+
+def _crop_border(gray):
+    """Returns (cropped, left, top) with uniform margins trimmed down to BORDER_PADDING."""
+    import numpy as np
+    height, width = gray.shape
+    corners = np.array([gray[0, 0], gray[0, -1], gray[-1, 0], gray[-1, -1]], dtype=np.int16)
+    background = int(np.median(corners))
+    content = np.abs(gray.astype(np.int16) - background) > BORDER_TOLERANCE
+    rows = np.flatnonzero(content.any(axis=1))
+    if rows.size == 0:
+        return gray, 0, 0 # Blank image; nothing to crop to
+    columns = np.flatnonzero(content[rows[0]:rows[-1] + 1].any(axis=0))
+    top, bottom = max(0, rows[0] - BORDER_PADDING), min(height, rows[-1] + 1 + BORDER_PADDING)
+    left, right = max(0, columns[0] - BORDER_PADDING), min(width, columns[-1] + 1 + BORDER_PADDING)
+    return gray[top:bottom, left:right], int(left), int(top)
+
+def estimate_text_height(gray):
+    """
+    Median height (pixels) of the glyph-like connected components of a dark-on-light gray image,
+    or None if there are too few to tell.
+    """
+    import cv2
+    import numpy as np
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return None
+    widths, heights = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    # Glyphs: not specks, not lines or panels
+    glyphs = heights[(heights >= 4) & (heights <= 200) & (widths <= heights * 4)]
+    if glyphs.size < 5:
+        return None
+    return float(np.median(glyphs))
+
+def _upscale_factor(gray, upscale):
+    if upscale == "auto":
+        text_height = estimate_text_height(gray)
+        if text_height is None:
+            return 1.0
+        factor = TARGET_TEXT_HEIGHT / text_height
+    else:
+        factor = float(upscale)
+    factor = min(factor, MAX_UPSCALE, (MAX_OUTPUT_PIXELS / max(1, gray.size)) ** 0.5)
+    return factor if factor >= 1.25 else 1.0 # Small enlargements cost time without helping
+
+def _threshold(gray, method):
+    import cv2
+    if method == "otsu":
+        return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    if method == "adaptive":
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+                                     ADAPTIVE_BLOCK_SIZE, ADAPTIVE_OFFSET)
+    raise ValueError(f"Unknown threshold method {method!r}; expected 'adaptive' or 'otsu'")
+
+def preprocess(image_input, preset=None, timings=None):
+    """
+    Prepares an image for OCR.
+
+    Args:
+        image_input (str or PIL.Image.Image): Image or image path.
+        preset (str, optional): Name in PRESETS. Defaults to the ocr.preprocess setting.
+        timings (dict, optional): Filled with the milliseconds spent in each step, by step name.
+
+    Returns:
+        tuple: (image, transform). image is the input unchanged for "none", otherwise a new "L"
+               image; transform maps boxes back to the input (see map_box).
+    """
+    _, steps = resolve_preset(preset)
+    if not steps:
+        return image_input, IDENTITY
+    import cv2
+
+    def timed(step, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        if timings is not None:
+            timings[step] = timings.get(step, 0.0) + (time.perf_counter() - start) * 1000
+        return result
+
+    if isinstance(image_input, str):
+        with Image.open(image_input) as opened:
+            image_input = timed("load", opened.copy)
+    gray = timed("grayscale", to_gray, image_input)
+    left = top = 0
+    scale = 1.0
+    if steps.get("invert_dark"):
+        gray, _ = timed("invert_dark", _invert_dark, gray)
+    if steps.get("crop_border"):
+        gray, left, top = timed("crop_border", _crop_border, gray)
+    if steps.get("upscale"):
+        scale = timed("upscale", _upscale_factor, gray, steps["upscale"])
+        if scale > 1.0:
+            size = (int(round(gray.shape[1] * scale)), int(round(gray.shape[0] * scale)))
+            gray = timed("upscale", cv2.resize, gray, size, None, 0, 0, cv2.INTER_CUBIC)
+    if steps.get("threshold"):
+        gray = timed("threshold", _threshold, gray, steps["threshold"])
+    return Image.fromarray(gray), (scale, left, top)
+
+def map_box(box, transform):
+    """Maps an (x1, y1, x2, y2) box in a preprocessed image back to the original image."""
+    scale, left, top = transform
+    if transform == IDENTITY:
+        return tuple(box)
+    x1, y1, x2, y2 = box
+    return (int(x1 / scale) + left, int(y1 / scale) + top,
+            int(-(-x2 // scale)) + left, int(-(-y2 // scale)) + top) # Round outwards so text stays covered
+
+def map_data(data, transform, size=None):
+    """
+    Maps the boxes of an engine's image_to_data result (see ocr_engines) back to the original image,
+    in place. The page rows (level 1) are set to size, the (width, height) of the original, if given.
+    """
+    if transform == IDENTITY:
+        return data
+    for i in range(len(data["left"])):
+        if size is not None and int(data["level"][i]) == 1:
+            data["left"][i], data["top"][i], (data["width"][i], data["height"][i]) = 0, 0, size
+            continue
+        x1, y1, x2, y2 = map_box((data["left"][i], data["top"][i], data["left"][i] + data["width"][i],
+                                  data["top"][i] + data["height"][i]), transform)
+        data["left"][i], data["top"][i], data["width"][i], data["height"][i] = x1, y1, x2 - x1, y2 - y1
+    return data
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Preprocess an image for OCR and save the result, to inspect a preset.")
+    parser.add_argument("image", help="Input image.")
+    parser.add_argument("output", help="Where to save the preprocessed image.")
+    parser.add_argument("--preset", default="ui", choices=tuple(PRESETS))
+    args = parser.parse_args()
+    step_ms = {}
+    processed, (scale, left, top) = preprocess(args.image, args.preset, timings=step_ms)
+    processed.save(args.output)
+    steps_text = ", ".join(f"{step} {ms:.1f} ms" for step, ms in step_ms.items()) or "no steps"
+    print(f"{args.preset}: {processed.size[0]}x{processed.size[1]} (scale {scale:.2f}, offset {left},{top}); {steps_text}")
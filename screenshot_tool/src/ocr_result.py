@@ -0,0 +1,242 @@
+"""
+Structured OCR results: words, lines and blocks with bounding boxes and confidences.
+
+An OcrResult is built from one image_to_data pass of an OCR engine (see ocr_engines) and stores it
+in columns rather than one object per word: the boxes and confidences are typed arrays, the word
+texts one concatenated string with offsets, and lines and blocks are ranges of words. A word costs
+about 30 bytes this way instead of several hundred as a dict, which matters for batch results of
+thousands of screenshots. Dicts for single words, lines and blocks are created on demand.
+
+    result = ocr.extract_layout("shot.png")
+    for line in result.lines():
+        print(line["box"], line["conf"], line["text"])
+"""
+
+import bisect
+from array import array
+
+class OcrResult:
+    """Words of one image in reading order, grouped into lines and blocks."""
+
+    __slots__ = ("width", "height", "_text", "_offsets", "_left", "_top", "_right", "_bottom", "_conf",
+                 "_line_starts", "_line_keys", "_block_starts")
+
+    def __init__(self, width=0, height=0):
+        """
+        Args:
+            width (int), height (int): Size of the recognized image (0 if unknown).
+        """
+        self.width = width
+        self.height = height
+        self._text = "" # All word texts concatenated
+        self._offsets = array("I", [0]) # Word i is _text[_offsets[i]:_offsets[i + 1]]
+        self._left, self._top = array("i"), array("i")
+        self._right, self._bottom = array("i"), array("i")
+        self._conf = array("f")
+        self._line_starts = array("I") # Index of the first word of each line
+        self._line_keys = array("I") # (block, paragraph, line) of each line, flattened
+        self._block_starts = array("I") # Index of the first line of each block
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Builds a result from an engine's image_to_data dict (Tesseract TSV columns, see ocr_engines).
+        The image size is taken from the page row; the other rows without text (block, paragraph
+        and line rows) are skipped.
+        """
+        result = cls()
+        for i, level in enumerate(data.get("level", ())):
+            if int(level) == 1:
+                result.width, result.height = int(data["width"][i]), int(data["height"][i])
+                break
+        texts = []
+        length = 0
+        previous_key = previous_block = None
+        for i, text in enumerate(data["text"]):
+            text = (text or "").strip()
+            if not text:
+                continue
+            key = (int(data["block_num"][i]), int(data["par_num"][i]), int(data["line_num"][i]))
+            word_index = len(result._conf)
+            if key != previous_key:
+                if key[0] != previous_block:
+                    result._block_starts.append(len(result._line_starts))
+                    previous_block = key[0]
+                result._line_starts.append(word_index)
+                result._line_keys.extend(key)
+                previous_key = key
+            left, top = int(data["left"][i]), int(data["top"][i])
+            result._left.append(left)
+            result._top.append(top)
+            result._right.append(left + int(data["width"][i]))
+            result._bottom.append(top + int(data["height"][i]))
+            result._conf.append(float(data["conf"][i]))
+            texts.append(text)
+            length += len(text)
+            result._offsets.append(length)
+        result._text = "".join(texts)
+        return result
+
+    @classmethod
+    def from_lines(cls, pieces, width=0, height=0):
+        """
+        Builds a result from lines of other results, e.g. of the strips of a tall image (see ocr_tiles).
+
+        Args:
+            pieces (iterable): (result, line index, dx, dy, block) tuples in reading order. The line's
+                               words are moved by (dx, dy) and put in block number block; consecutive
+                               lines with the same block number form one block.
+            width (int), height (int): Size of the combined image.
+        """
+        merged = cls(width, height)
+        texts = []
+        length = 0
+        previous_block = None
+        for result, line, dx, dy, block in pieces:
+            if block != previous_block:
+                merged._block_starts.append(len(merged._line_starts))
+                previous_block = block
+            merged._line_starts.append(len(merged._conf))
+            merged._line_keys.extend((block,) + tuple(result._line_keys[line * 3 + 1:line * 3 + 3]))
+            for i in result._line_words(line):
+                merged._left.append(result._left[i] + dx)
+                merged._top.append(result._top[i] + dy)
+                merged._right.append(result._right[i] + dx)
+                merged._bottom.append(result._bottom[i] + dy)
+                merged._conf.append(result._conf[i])
+                text = result.word_text(i)
+                texts.append(text)
+                length += len(text)
+                merged._offsets.append(length)
+        merged._text = "".join(texts)
+        return merged
+
+    def __len__(self):
+        """Number of words."""
+        return len(self._conf)
+
+    @property
+    def line_count(self):
+        return len(self._line_starts)
+
+    @property
+    def block_count(self):
+        return len(self._block_starts)
+
+    @property
+    def text(self):
+        """The recognized text: words separated by spaces, lines by newlines, blocks by blank lines."""
+        return "\n\n".join("\n".join(self._line_text(j) for j in self._block_lines(b)) for b in range(self.block_count))
+
+    def word_text(self, i):
+        return self._text[self._offsets[i]:self._offsets[i + 1]]
+
+    def word_box(self, i):
+        return (self._left[i], self._top[i], self._right[i], self._bottom[i])
+
+    def word(self, i):
+        """Word i as {"text", "box": (x1, y1, x2, y2), "conf" (0-100), "line": (block, paragraph, line)}."""
+        line = self._line_of(i)
+        return {"text": self.word_text(i), "box": self.word_box(i), "conf": self._conf[i],
+                "line": tuple(self._line_keys[line * 3:line * 3 + 3])}
+
+    def words(self):
+        """All words as dicts (see word), in reading order."""
+        result = []
+        for line in range(self.line_count):
+            key = tuple(self._line_keys[line * 3:line * 3 + 3])
+            for i in self._line_words(line):
+                result.append({"text": self.word_text(i), "box": self.word_box(i), "conf": self._conf[i], "line": key})
+        return result
+
+    def line_key(self, line):
+        """(block, paragraph, line) numbers of line index line, as reported by the engine."""
+        return tuple(self._line_keys[line * 3:line * 3 + 3])
+
+    def lines(self):
+        """
+        All lines, in reading order, as dicts:
+            {"text", "box" (union of the word boxes), "conf" (mean word confidence),
+             "line": (block, paragraph, line), "words": range of word indices}
+        """
+        return [self._line(j) for j in range(self.line_count)]
+
+    def blocks(self):
+        """All blocks as dicts: {"text", "box", "conf" (mean word confidence), "lines": range of line indices}."""
+        result = []
+        for b in range(self.block_count):
+            lines = self._block_lines(b)
+            first, last = self._line_words(lines[0])[0], self._line_words(lines[-1])[-1]
+            words = range(first, last + 1)
+            result.append({"text": "\n".join(self._line_text(j) for j in lines), "box": self._union(words),
+                           "conf": self._mean_conf(words), "lines": lines})
+        return result
+
+    def to_dict(self):
+        """A JSON-serializable form (for caches and result files); see from_dict."""
+        return {"size": [self.width, self.height], "text": self._text, "offsets": self._offsets.tolist(),
+                "boxes": [self._left.tolist(), self._top.tolist(), self._right.tolist(), self._bottom.tolist()],
+                "conf": [round(c, 2) for c in self._conf], "line_starts": self._line_starts.tolist(),
+                "line_keys": self._line_keys.tolist(), "block_starts": self._block_starts.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        result = cls(*d["size"])
+        result._text = d["text"]
+        result._offsets = array("I", d["offsets"])
+        result._left, result._top, result._right, result._bottom = (array("i", column) for column in d["boxes"])
+        result._conf = array("f", d["conf"])
+        result._line_starts = array("I", d["line_starts"])
+        result._line_keys = array("I", d["line_keys"])
+        result._block_starts = array("I", d["block_starts"])
+        return result
+
+    def nbytes(self):
+        """Approximate memory used by the columns, in bytes."""
+        columns = (self._offsets, self._left, self._top, self._right, self._bottom, self._conf,
+                   self._line_starts, self._line_keys, self._block_starts)
+        return len(self._text.encode("utf-8")) + sum(column.itemsize * len(column) for column in columns)
+
+    def _line_words(self, line):
+        end = self._line_starts[line + 1] if line + 1 < len(self._line_starts) else len(self._conf)
+        return range(self._line_starts[line], end)
+
+    def _block_lines(self, block):
+        end = self._block_starts[block + 1] if block + 1 < len(self._block_starts) else len(self._line_starts)
+        return range(self._block_starts[block], end)
+
+    def _line_of(self, i):
+        return bisect.bisect_right(self._line_starts, i) - 1
+
+    def _line_text(self, line):
+        return " ".join(self.word_text(i) for i in self._line_words(line))
+
+    def _union(self, words):
+        return (min(self._left[i] for i in words), min(self._top[i] for i in words),
+                max(self._right[i] for i in words), max(self._bottom[i] for i in words))
+
+    def _mean_conf(self, words):
+        return sum(self._conf[i] for i in words) / len(words)
+
+    def _line(self, line):
+        words = self._line_words(line)
+        return {"text": self._line_text(line), "box": self._union(words), "conf": self._mean_conf(words),
+                "line": tuple(self._line_keys[line * 3:line * 3 + 3]), "words": words}
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Print the lines of an image with their boxes and confidences.")
+    parser.add_argument("image", help="Image to recognize.")
+    parser.add_argument("--lang", default="eng")
+    args = parser.parse_args()
+    from . import ocr
+    layout = ocr.extract_layout(args.image, lang=args.lang)
+    if layout is None:
+        sys.exit(1)
+    for line in layout.lines():
+        print(f"{line['box']} {line['conf']:5.1f}  {line['text']}")
+    dict_bytes = sum(sys.getsizeof(w) + sys.getsizeof(w["text"]) + sys.getsizeof(w["box"]) for w in layout.words())
+    print(f"{len(layout)} words, {layout.line_count} lines, {layout.block_count} blocks: "
+          f"{layout.nbytes()} bytes in columns ({dict_bytes} as word dicts)")
@@ -0,0 +1,172 @@
+"""
+OCR of very tall images (e.g. from ScrollingCapture) in overlapping horizontal strips.
+
+Tesseract processes one image on one core and fails on images taller than 32767 pixels. Here a
+tall image is cut into strips of ocr.strip_height pixels that overlap by ocr.strip_overlap
+pixels (more than the tallest text line), and the strips are recognized in parallel on a thread
+pool that lives as long as the process (map_parts, shared with text_regions), so repeated calls
+neither start threads nor load engine instances again.
+Both engines run outside the GIL (tesserocr releases it, pytesseract waits on a subprocess; see
+ocr_engines), so the wall time drops with the number of cores. Each strip goes through the
+normal OCR path, including preprocessing and the result cache, so re-running OCR on a capture
+that only grew at the bottom recognizes just the new strips.
+
+Merging: every line is owned by exactly one strip. Lines touching a cut edge of their strip are
+incomplete and dropped (the neighbouring strip has them whole), the remaining lines are assigned
+to the strip on their side of the middle of the overlap, and lines whose boxes still coincide
+with a line kept from the previous strip are dropped as duplicates. Word boxes are moved back to
+the coordinates of the full image.
+"""
+
+import concurrent.futures
+import os
+import threading
+
+from . import config_manager
+from .ocr_result import OcrResult
+
+DEFAULT_STRIP_HEIGHT = 2000
+DEFAULT_STRIP_OVERLAP = 160
+EDGE_MARGIN = 2 # Lines within this many pixels of a cut edge are treated as cut off
+DUPLICATE_OVERLAP = 0.5 # Boxes overlapping by this fraction (of the smaller box, both ways) are the same line
+THREAD_PREFIX = "ocr-part"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def strip_settings():
+    """Returns (strip height, overlap) from the ocr.strip_height and ocr.strip_overlap settings."""
+    height = int(config_manager.get_setting("ocr", "strip_height", DEFAULT_STRIP_HEIGHT))
+    overlap = int(config_manager.get_setting("ocr", "strip_overlap", DEFAULT_STRIP_OVERLAP))
+    return height, min(overlap, height // 2)
+
+def needs_tiling(height, strip_height=None):
+    """True if an image of this height is worth splitting (more than 1.5 strips tall)."""
+    if strip_height is None:
+        strip_height, _ = strip_settings()
+    return height > strip_height * 1.5
+
+def default_workers():
+    """Parts recognized at once: the ocr.tile_workers setting, or the number of CPUs if that is 0."""
+    return int(config_manager.get_setting("ocr", "tile_workers", 0)) or os.cpu_count() or 1
+
+def _shared_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=default_workers(), thread_name_prefix=THREAD_PREFIX)
+        return _executor
+
+def map_parts(func, items, workers=None):
+    """
+    Calls func on each item (strips or regions of an image), at most workers at a time, on the
+    shared thread pool.
+
+    Args:
+        func (callable): func(item) -> result; exceptions are passed on.
+        items (list): The parts, in the order they should start.
+        workers (int, optional): Parts at once. Defaults to default_workers(); 1 (or a call from a
+                                 pool thread, e.g. a tall region) runs them one by one in this thread.
+
+    Returns:
+        list: The results, in the order of items.
+    """
+    workers = workers or default_workers()
+    if workers <= 1 or len(items) <= 1 or threading.current_thread().name.startswith(THREAD_PREFIX):
+        return [func(item) for item in items]
+    pool = _shared_executor()
+    futures, running = [], set()
+    for item in items:
+        if len(running) >= workers:
+            _, running = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        future = pool.submit(func, item)
+        futures.append(future)
+        running.add(future)
+    return [future.result() for future in futures]
+
+def plan_strips(height, strip_height, overlap):
+    """
+    Returns the (top, bottom) rows of the strips covering an image of the given height; consecutive
+    strips share overlap rows and the strips are of (nearly) equal height.
+    """
+    if height <= strip_height:
+        return [(0, height)]
+    step = strip_height - overlap
+    count = -(-(height - overlap) // step) # ceil
+    # Spread the strips evenly instead of leaving a thin last one
+    step = -(-(height - overlap) // count)
+    strips = []
+    for k in range(count):
+        top = k * step
+        strips.append((top, min(height, top + step + overlap)))
+    return strips
+
+def _overlaps(box1, box2):
+    """True if two boxes cover mostly the same area (see DUPLICATE_OVERLAP)."""
+    dx = min(box1[2], box2[2]) - max(box1[0], box2[0])
+    dy = min(box1[3], box2[3]) - max(box1[1], box2[1])
+    if dx <= 0 or dy <= 0:
+        return False
+    width = min(box1[2] - box1[0], box2[2] - box2[0])
+    height = min(box1[3] - box1[1], box2[3] - box2[1])
+    return dx >= width * DUPLICATE_OVERLAP and dy >= height * DUPLICATE_OVERLAP
+
+def merge_strips(results, strips, width, height):
+    """
+    Combines the OcrResults of the strips into one for the full image (see the module docstring).
+
+    Args:
+        results (list): OcrResult per strip, in strip coordinates.
+        strips (list): (top, bottom) per strip, from plan_strips.
+        width (int), height (int): Size of the full image.
+    """
+    kept = [] # (result, line index, strip index, box in full-image coordinates, confidence, block number)
+    for k, (result, (top, bottom)) in enumerate(zip(results, strips)):
+        cut_above = (strips[k - 1][1] + top) / 2 if k > 0 else float("-inf")
+        cut_below = (bottom + strips[k + 1][0]) / 2 if k + 1 < len(strips) else float("inf")
+        previous = [entry for entry in kept if entry[2] == k - 1]
+        for index, line in enumerate(result.lines()):
+            x1, y1, x2, y2 = line["box"]
+            if (k > 0 and y1 <= EDGE_MARGIN) or (k + 1 < len(strips) and y2 >= bottom - top - EDGE_MARGIN):
+                continue # Cut off by the strip boundary
+            box = (x1, y1 + top, x2, y2 + top)
+            center = (box[1] + box[3]) / 2
+            if not cut_above <= center < cut_below:
+                continue # The neighbouring strip owns this line
+            duplicate = next((entry for entry in previous if _overlaps(entry[3], box)), None)
+            if duplicate is not None:
+                if duplicate[4] >= line["conf"]:
+                    continue
+                kept.remove(duplicate) # This strip's reading of the line is more confident
+                previous.remove(duplicate)
+            entry = (result, index, k, box, line["conf"], line["line"][0])
+            kept.append(entry)
+    # Blocks are numbered anew so that a block never continues across strips
+    block_numbers = {}
+    pieces = []
+    for result, index, k, _, _, block in kept:
+        number = block_numbers.setdefault((k, block), len(block_numbers) + 1)
+        pieces.append((result, index, 0, strips[k][0], number))
+    return OcrResult.from_lines(pieces, width, height)
+
+def recognize_tiled(image, recognize_strip, workers=None, strip_height=None, overlap=None):
+    """
+    Recognizes a tall image strip by strip, in parallel.
+
+    Args:
+        image (PIL.Image.Image): The full image.
+        recognize_strip (callable): recognize_strip(strip image) -> OcrResult; may raise
+                                    ocr_engines.OcrError, which is passed on.
+        workers (int, optional): Parallel strips (see map_parts).
+        strip_height (int, optional), overlap (int, optional): Default to strip_settings().
+
+    Returns:
+        OcrResult: The lines of all strips, in full-image coordinates.
+    """
+    default_height, default_overlap = strip_settings()
+    strip_height = strip_height or default_height
+    overlap = default_overlap if overlap is None else overlap
+    width, height = image.size
+    strips = plan_strips(height, strip_height, overlap)
+    results = map_parts(lambda strip: recognize_strip(image.crop((0, strip[0], width, strip[1]))), strips, workers)
+    return merge_strips(results, strips, width, height)
@@ -1,10 +1,10 @@
-import cv2
-import mss
-import numpy as np
 import threading
 import time
 import os
 
+# cv2, mss and numpy are imported inside the methods that use them so that
+# importing this module (e.g. from the GUI) stays cheap until recording starts.
+
 class ScreenRecorder:
     def __init__(self, output_filename="recording.mp4", fps=15.0):
         self.output_filename = output_filename
@@ -13,6 +13,7 @@ class ScreenRecorder:
         self.recording_thread = None
         self.writer = None
         
+        import mss
         # Get screen dimensions using mss for the primary monitor
         with mss.mss() as sct:
             monitor = sct.monitors[1]  # Primary monitor
@@ -47,6 +48,10 @@ class ScreenRecorder:
 
 
     def _recording_loop(self):
+        import cv2
+        import mss
+        import numpy as np
+
         # Initialize VideoWriter here, within the thread, after start_recording sets it up
         if not self.writer:
             print("Error: VideoWriter not initialized before starting recording loop.")
@@ -88,6 +93,8 @@ class ScreenRecorder:
             print("Recording is already in progress.")
             return
 
+        import cv2
+
         # Determine codec and update filename if extension changed
         self._video_codec, actual_ext = self._get_fourcc(self.output_filename)
         if actual_ext != os.path.splitext(self.output_filename)[1].lower():
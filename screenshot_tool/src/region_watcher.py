@@ -0,0 +1,197 @@
+"""
+Change-triggered capture of a screen region.
+
+A RegionWatcher polls a region (e.g. a build status panel or a log tail) with a persistent mss
+session, compares a sparse sample of its pixels with the last reference frame and, when the
+changed fraction exceeds a threshold, fires an action: save a full-resolution capture, run OCR,
+and/or call a callback.
+
+Polling cost is controlled by `interval` (seconds between polls) and `sample_step` (only every
+n-th pixel in each direction is compared). get_status() reports the CPU time spent polling as a
+percentage of wall time, so both can be tuned until the watcher stays well under 1% CPU.
+
+Usage (from the screenshot_tool directory):
+    python -m src.region_watcher --region 100,100,600,300 --interval 1 --threshold 0.02
+    python -m src.region_watcher --region 0,900,1920,180 --action ocr --lang eng
+"""
+
+import argparse
+import concurrent.futures
+import threading
+import time
+
+from . import frame_diff
+from . import image_io
+
+ACTIONS = ("capture", "ocr", "callback")
+
+class RegionWatcher:
+    def __init__(self, region, interval=1.0, threshold=0.01, sample_step=4, pixel_tolerance=24,
+                 action="capture", on_change=None, output_dir=None, image_format=None, lang="eng", cooldown=0.0):
+        """
+        Args:
+            region (dict): {"top", "left", "width", "height"} of the area to watch.
+            interval (float): Seconds between polls.
+            threshold (float): Fraction (0.0-1.0) of sampled pixels that must change to fire.
+            sample_step (int): Compare every n-th pixel in each direction. 4 compares 1/16 of the pixels.
+            pixel_tolerance (int): Per-channel difference (0-255) below which a pixel counts as unchanged,
+                                   so anti-aliasing and cursor blink noise do not fire the watcher.
+            action (str): "capture" saves the full-resolution frame, "ocr" extracts its text,
+                          "callback" only calls on_change.
+            on_change (callable, optional): Called as on_change(event) on the watcher's worker thread after
+                                            the action completes. event is a dict with "time",
+                                            "changed_fraction", "image" and, depending on the action,
+                                            "path" or "text".
+            output_dir (str, optional): Where captures are saved. Defaults to general.default_save_path.
+            image_format (str, optional): Defaults to output.image_format.
+            lang (str): OCR language for action="ocr".
+            cooldown (float): Minimum seconds between two firings.
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action {action!r}; expected one of {ACTIONS}")
+        self.region = region
+        self.interval = float(interval)
+        self.threshold = float(threshold)
+        self.sample_step = max(1, int(sample_step))
+        self.pixel_tolerance = pixel_tolerance
+        self.action = action
+        self.on_change = on_change
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.lang = lang
+        self.cooldown = float(cooldown)
+
+        self._thread = None
+        self._stop_event = threading.Event()
+        # Actions (encode/OCR) run here so a slow action never delays the next poll.
+        self._action_executor = None
+        self._reference = None
+        self._last_fired = 0.0
+
+        self.polls = 0
+        self.changes = 0
+        self.last_changed_fraction = 0.0
+        self._poll_cpu_seconds = 0.0
+        self._started_at = None
+
+    def start(self):
+        if self.is_running():
+            print("Region watcher is already running.")
+            return
+        self._action_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="watcher-action")
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._poll_loop, name="region-watcher", daemon=True)
+        self._thread.start()
+        print(f"Watching region {self.region} every {self.interval}s (threshold {self.threshold:.1%}).")
+
+    def stop(self, wait=True):
+        self._stop_event.set()
+        if self._thread and wait:
+            self._thread.join()
+        if self._action_executor is not None:
+            self._action_executor.shutdown(wait=wait)
+            self._action_executor = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self):
+        """Returns counters and the polling CPU usage (percent of one core, averaged since start)."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "is_running": self.is_running(),
+            "polls": self.polls,
+            "changes": self.changes,
+            "last_changed_fraction": self.last_changed_fraction,
+            "cpu_percent": (self._poll_cpu_seconds / elapsed * 100.0) if elapsed > 0 else 0.0,
+        }
+
+    def _poll_loop(self):
+        import mss
+        from .main import screenshot_to_image
+
+        with mss.mss() as sct:
+            while not self._stop_event.is_set():
+                cpu_start = time.thread_time()
+                try:
+                    sct_img = sct.grab(self.region)
+                    samples = frame_diff.downsample_bgra(sct_img.bgra, sct_img.width, sct_img.height, self.sample_step)
+                    self.polls += 1
+                    if self._reference is None:
+                        self._reference = samples
+                    else:
+                        fraction = frame_diff.changed_fraction(self._reference, samples, self.pixel_tolerance)
+                        self.last_changed_fraction = fraction
+                        now = time.monotonic()
+                        if fraction > self.threshold and now - self._last_fired >= self.cooldown:
+                            # The new frame becomes the reference, so a change fires once, not on every poll.
+                            self._reference = samples
+                            self._last_fired = now
+                            self.changes += 1
+                            # Only a firing poll pays for the full-resolution conversion.
+                            image = screenshot_to_image(sct_img)
+                            self._action_executor.submit(self._fire, image, fraction)
+                except Exception as e:
+                    print(f"Region watcher error: {e}")
+                self._poll_cpu_seconds += time.thread_time() - cpu_start
+                self._stop_event.wait(self.interval)
+
+    def _fire(self, image, fraction):
+        event = {"time": time.time(), "changed_fraction": fraction, "image": image}
+        try:
+            if self.action == "capture":
+                path = image_io.build_capture_path(self.output_dir, self.image_format, prefix="watch_")
+                event["path"] = image_io.save_image(image, path, self.image_format)
+            elif self.action == "ocr":
+                from .ocr import extract_text_from_image
+                event["text"] = extract_text_from_image(image, lang=self.lang)
+            if self.on_change is not None:
+                self.on_change(event)
+        except Exception as e:
+            print(f"Region watcher action error: {e}")
+
+
+def watch_region(region, on_change=None, action="capture", interval=1.0, threshold=0.01, **kwargs):
+    """
+    Functional interface: starts watching region in the background and returns the RegionWatcher.
+    Call .stop() on it to end watching.
+    """
+    watcher = RegionWatcher(region, interval=interval, threshold=threshold, action=action, on_change=on_change, **kwargs)
+    watcher.start()
+    return watcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture or OCR a screen region whenever it changes.")
+    parser.add_argument("--region", required=True, help="left,top,width,height of the region to watch.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls.")
+    parser.add_argument("--threshold", type=float, default=0.01, help="Fraction of sampled pixels that must change (0-1).")
+    parser.add_argument("--step", type=int, default=4, help="Compare every n-th pixel in each direction.")
+    parser.add_argument("--action", choices=["capture", "ocr"], default="capture")
+    parser.add_argument("--output", help="Output directory for captures (default: configured save path).")
+    parser.add_argument("--lang", default="eng", help="OCR language for --action ocr.")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="Minimum seconds between two firings.")
+    args = parser.parse_args()
+
+    left, top, width, height = (int(v) for v in args.region.split(","))
+
+    def print_event(event):
+        stamp = time.strftime("%H:%M:%S", time.localtime(event["time"]))
+        detail = event.get("path") or (event.get("text") or "").replace("\n", " ")[:200]
+        print(f"[{stamp}] {event['changed_fraction']:.1%} changed: {detail}")
+
+    watcher = RegionWatcher({"top": top, "left": left, "width": width, "height": height},
+                            interval=args.interval, threshold=args.threshold, sample_step=args.step,
+                            action=args.action, on_change=print_event, output_dir=args.output,
+                            lang=args.lang, cooldown=args.cooldown)
+    watcher.start()
+    print("Press Ctrl+C to stop.")
+    try:
+        while watcher.is_running():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    watcher.stop()
+    status = watcher.get_status()
+    print(f"Stopped after {status['polls']} polls, {status['changes']} change(s), {status['cpu_percent']:.2f}% CPU.")
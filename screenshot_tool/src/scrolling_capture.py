@@ -1,9 +1,10 @@
-import mss
-import pyautogui
 from PIL import Image, ImageChops
 import time
 import os
-import numpy as np
+
+# mss, numpy and pyautogui are imported where they are used. pyautogui in
+# particular connects to the display on import, which is both slow and fails
+# outright in headless sessions.
 
 def find_overlap_and_stitch(img1, img2, scroll_direction="vertical"):
     """
@@ -13,6 +14,8 @@ def find_overlap_and_stitch(img1, img2, scroll_direction="vertical"):
     if not img1:
         return img2
 
+    import numpy as np
+
     w1, h1 = img1.size
     w2, h2 = img2.size
 
@@ -114,12 +117,14 @@ class ScrollingCapture:
         self.last_captured_image = None
         self.monitor_details = None
 
+        import mss
         with mss.mss() as sct:
             self.monitor_details = sct.monitors[1] # Primary monitor
 
     def _capture_screen_part(self):
         # For now, captures the full primary monitor.
         # Could be adapted to capture a specific region if initial_region is provided.
+        import mss
         with mss.mss() as sct:
             sct_img = sct.grab(self.monitor_details)
             if hasattr(sct_img, 'bgra') and sct_img.bgra:
@@ -138,7 +143,8 @@ class ScrollingCapture:
             return False
         if img1.size != img2.size:
             return False
-        
+
+        import numpy as np
         diff = ImageChops.difference(img1.convert("RGB"), img2.convert("RGB"))
         stat = np.array(diff.getdata()).sum(axis=1)
         rms = np.sqrt(np.mean(stat**2))
@@ -146,7 +152,22 @@ class ScrollingCapture:
         return rms < tolerance
 
 
-    def start(self):
+    def start(self, on_saved=None, dispatcher=None):
+        """
+        Runs the scrolling capture. Scrolling and stitching happen on the calling thread; the final
+        image is encoded and written on the shared writer pool (see image_io) so the caller is not
+        blocked while a very tall image is compressed.
+
+        Args:
+            on_saved (callable, optional): Called as on_saved(path, error) once the file is written
+                                           (error is None on success).
+            dispatcher (tk_dispatch.TkDispatcher, optional): Deliver on_saved on the Tk thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the output path, or None if nothing was captured.
+        """
+        import pyautogui
+        from . import image_io
         print("Starting scrolling capture...")
         print(f"Ensure the target window is focused and has a scrollbar.")
         print(f"Will scroll {self.max_scrolls} times, with a {self.scroll_delay}s delay between scrolls.")
@@ -194,16 +215,20 @@ class ScrollingCapture:
             # Alternative stop condition: if overlap is almost full image height (less robust)
             # This is somewhat handled by _are_images_identical if the scroll does nothing.
 
-        # 6. Save final image
+        # 6. Save final image (in the background)
         if self.stitched_image:
-            self.stitched_image.save(self.output_filename)
-            print(f"Scrolling capture finished. Saved to {self.output_filename}")
+            print(f"Scrolling capture finished. Saving to {self.output_filename}...")
+            return image_io.get_writer_pool().submit(self.stitched_image, self.output_filename,
+                                                     on_done=on_saved, dispatcher=dispatcher)
         else:
             print("No image was captured or stitched.")
+            return None
 
-def capture_scrolling(output_filename="scrolling_capture.png", scroll_delay=2, max_scrolls=10, scroll_amount=-120):
+def capture_scrolling(output_filename="scrolling_capture.png", scroll_delay=2, max_scrolls=10, scroll_amount=-120,
+                      on_saved=None, dispatcher=None):
     """
     Functional interface to initiate a scrolling capture.
+    See ScrollingCapture.start for on_saved/dispatcher and the return value.
     """
     capturer = ScrollingCapture(
         output_filename=output_filename,
@@ -211,7 +236,7 @@ def capture_scrolling(output_filename="scrolling_capture.png", scroll_delay=2, m
         max_scrolls=max_scrolls,
         scroll_amount=scroll_amount
     )
-    capturer.start()
+    return capturer.start(on_saved=on_saved, dispatcher=dispatcher)
 
 
 if __name__ == "__main__":
@@ -230,11 +255,13 @@ if __name__ == "__main__":
     # max_scrolls: Maximum number of times to scroll. Prevents infinite loops.
     # scroll_amount: The amount to scroll each time (negative for down, positive for up).
     #                This value might need tuning based on your system's scroll sensitivity.
-    capture_scrolling(
+    save_future = capture_scrolling(
         output_filename=output_file,
         scroll_delay=1.5,  # Adjust as needed, larger for web pages with lazy loading
         max_scrolls=5,     # Adjust based on expected page length
         scroll_amount=-100 # Adjust scroll step; smaller steps can be more accurate but slower
     )
 
+    if save_future is not None:
+        save_future.result() # Wait for the background save before exiting
     print(f"Test finished. Check the image file: {output_file}")
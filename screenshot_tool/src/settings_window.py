@@ -83,6 +83,15 @@ class SettingsWindow(tk.Toplevel):
         self.config_vars["general_auto_start_on_boot"] = tk.BooleanVar()
         chk_auto_start = ttk.Checkbutton(frame, text=i18n._("settings_chk_auto_start_boot") + i18n._("settings_label_placeholder"), variable=self.config_vars["general_auto_start_on_boot"], state=tk.DISABLED)
         chk_auto_start.grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=5)
+
+        # Background OCR for search (off by default: it keeps a CPU core busy, see ocr_index and video_ocr)
+        self.config_vars["search_index_enabled"] = tk.BooleanVar()
+        chk_index = ttk.Checkbutton(frame, text=i18n._("settings_chk_search_index") + i18n._("settings_label_restart_required"), variable=self.config_vars["search_index_enabled"])
+        chk_index.grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=5)
+
+        self.config_vars["search_index_recordings"] = tk.BooleanVar()
+        chk_index_recordings = ttk.Checkbutton(frame, text=i18n._("settings_chk_search_index_recordings"), variable=self.config_vars["search_index_recordings"])
+        chk_index_recordings.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=5)
         
         frame.columnconfigure(1, weight=1) # Make entry expand
 
@@ -112,18 +121,27 @@ class SettingsWindow(tk.Toplevel):
         self.val_jpg_quality_label.grid(row=1, column=2, sticky=tk.W, padx=5)
         self.config_vars["output_image_quality_jpg"].trace_add("write", self._update_jpg_quality_label)
 
+        # PNG Compression Level
+        self.lbl_png_compress = ttk.Label(frame, text=i18n._("settings_label_png_compress_level"))
+        self.lbl_png_compress.grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.config_vars["output_png_compress_level"] = tk.IntVar()
+        self.scale_png_compress = ttk.Scale(frame, from_=0, to=9, orient=tk.HORIZONTAL, variable=self.config_vars["output_png_compress_level"], length=200)
+        self.scale_png_compress.grid(row=2, column=1, sticky=tk.EW, padx=5, pady=5)
+        self.val_png_compress_label = ttk.Label(frame, text="")
+        self.val_png_compress_label.grid(row=2, column=2, sticky=tk.W, padx=5)
+        self.config_vars["output_png_compress_level"].trace_add("write", self._update_png_compress_label)
 
         # Video Format
-        ttk.Label(frame, text=i18n._("settings_label_video_format")).grid(row=2, column=0, sticky=tk.W, pady=5)
+        ttk.Label(frame, text=i18n._("settings_label_video_format")).grid(row=3, column=0, sticky=tk.W, pady=5)
         self.config_vars["output_video_format"] = tk.StringVar()
         combo_vid_format = ttk.Combobox(frame, textvariable=self.config_vars["output_video_format"], values=["MP4", "AVI"], state="readonly", width=10) # Add more later if needed
-        combo_vid_format.grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
+        combo_vid_format.grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
 
         # Video FPS
-        ttk.Label(frame, text=i18n._("settings_label_video_fps")).grid(row=3, column=0, sticky=tk.W, pady=5)
+        ttk.Label(frame, text=i18n._("settings_label_video_fps")).grid(row=4, column=0, sticky=tk.W, pady=5)
         self.config_vars["output_video_fps"] = tk.DoubleVar()
         entry_vid_fps = ttk.Entry(frame, textvariable=self.config_vars["output_video_fps"], width=12)
-        entry_vid_fps.grid(row=3, column=1, sticky=tk.W, padx=5, pady=5)
+        entry_vid_fps.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
 
         frame.columnconfigure(1, weight=1)
         self._on_image_format_change() # Initial state update for JPG quality controls
@@ -137,10 +155,21 @@ class SettingsWindow(tk.Toplevel):
         if is_jpg:
             self._update_jpg_quality_label()
 
+        is_png = self.config_vars["output_image_format"].get() == "PNG"
+        state = tk.NORMAL if is_png else tk.DISABLED
+        self.lbl_png_compress.config(state=state)
+        self.scale_png_compress.config(state=state)
+        self.val_png_compress_label.config(state=state)
+        if is_png:
+            self._update_png_compress_label()
+
 
     def _update_jpg_quality_label(self, *args):
         self.val_jpg_quality_label.config(text=str(self.config_vars["output_image_quality_jpg"].get()))
 
+    def _update_png_compress_label(self, *args):
+        self.val_png_compress_label.config(text=str(self.config_vars["output_png_compress_level"].get()))
+
 
     def _create_interface_tab(self, tab):
         frame = ttk.LabelFrame(tab, text=i18n._("settings_group_interface_options"), padding="10")
@@ -183,7 +212,8 @@ class SettingsWindow(tk.Toplevel):
         self._update_jpg_quality_label() # Update label for JPG quality
 
     def _collect_ui_settings_to_dict(self):
-        new_config = {}
+        # Start from the current config so sections/keys without a widget here are kept
+        new_config = {section: dict(values) for section, values in config_manager.load_config().items()}
         for var_key, tk_var in self.config_vars.items():
             section, key = var_key.split("_", 1)
             if section not in new_config:
@@ -253,10 +283,13 @@ if __name__ == '__main__':
             "settings_label_filename_format": {"en": "Filename Format:", "zh": "文件名格式:"},
             "settings_chk_auto_copy_clipboard": {"en": "Auto-copy to Clipboard after capture", "zh": "截图后自动复制到剪افظ板"},
             "settings_chk_auto_start_boot": {"en": "Auto-start on Boot", "zh": "开机自启"},
+            "settings_chk_search_index": {"en": "OCR new screenshots in the background for search", "zh": "在后台识别新截图的文字以便搜索"},
+            "settings_chk_search_index_recordings": {"en": "OCR screen recordings after they stop", "zh": "录屏结束后识别其中的文字"},
             "settings_label_placeholder": {"en": " (Placeholder)", "zh": " (占位符)"},
             "settings_group_output_options": {"en": "Output Options", "zh": "输出选项"},
             "settings_label_image_format": {"en": "Image Format (Screenshots):", "zh": "图片格式 (截图):"},
             "settings_label_jpg_quality": {"en": "JPG Quality (1-100):", "zh": "JPG 质量 (1-100):"},
+            "settings_label_png_compress_level": {"en": "PNG Compression (0-9):", "zh": "PNG 压缩级别 (0-9):"},
             "settings_label_video_format": {"en": "Video Format (Recording):", "zh": "视频格式 (录屏):"},
             "settings_label_video_fps": {"en": "Video FPS:", "zh": "视频帧率:"},
             "settings_group_interface_options": {"en": "Interface Options", "zh": "界面选项"},
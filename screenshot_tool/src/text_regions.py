@@ -0,0 +1,162 @@
+"""
+Fast detection of text regions, so OCR only runs where there is text.
+
+Most of a screenshot is empty background, pictures or UI chrome, yet Tesseract analyses every
+pixel. find_text_regions() locates candidate text blocks with a few OpenCV passes (tens of
+milliseconds for a full-HD screenshot, far less than OCR of the empty space):
+
+  1. the morphological gradient of the gray image marks the edges of glyphs,
+  2. long straight horizontal and vertical runs (panel borders, separators, underlines) are removed,
+  3. a closing with a wide, flat kernel joins the glyphs and words of a line,
+  4. connected components that are too small, or too sparse in edges to be text, are dropped,
+  5. the remaining boxes are padded, and lines that are stacked closely are merged into blocks
+     (fewer, larger crops keep the per-call overhead of the OCR engine down).
+
+recognize_regions() then OCRs the crops in parallel on the thread pool shared with the strips of
+tall images (see ocr_tiles.map_parts) and maps the words back into the coordinates of the full
+image. With ocr.text_regions (or detect_regions of ocr.recognize) set to
+"auto" this is used when the regions cover at most AUTO_MAX_COVERAGE of the image; denser
+screenshots are recognized in one pass. Text that the detector misses (e.g. very low contrast) is
+not recognized in region mode, and the text is assembled from lines, so the setting is "off" by
+default; callers that OCR many sparse frames (see video_ocr) turn it on.
+"""
+
+from . import config_manager
+from . import ocr_preprocess
+from . import ocr_tiles
+from .ocr_result import OcrResult
+
+MODES = ("off", "auto", "on")
+EDGE_THRESHOLD = 32 # Gradient (gray levels across 3 pixels) that counts as a glyph edge
+LINE_LENGTH = 40 # Straight edge runs at least this long are borders, not text
+LINK_WIDTH = 15 # Horizontal gap (pixels) bridged between glyphs and words
+LINK_HEIGHT = 5 # Vertical gap bridged between lines of a block
+MIN_HEIGHT = 6
+MIN_WIDTH = 6
+MIN_EDGE_DENSITY = 0.08 # Fraction of edge pixels in a box below which it is not text
+BLOCK_LINE_GAP = 1.0 # Lines closer than this many line heights, and overlapping horizontally, form one block
+REGION_PADDING = 6 # Background kept around each region (Tesseract needs a little margin)
+AUTO_MAX_COVERAGE = 0.5 # "auto" only splits images whose regions cover at most this fraction
+
+def find_text_regions(image, padding=REGION_PADDING):
+    """
+    Finds the blocks of an image that probably contain text.
+
+    Args:
+        image (PIL.Image.Image): The image (any mode; light or dark theme).
+        padding (int): Pixels added around each region.
+
+    Returns:
+        list: (x1, y1, x2, y2) boxes in reading order (top to bottom, then left to right), not overlapping.
+    """
+    import cv2
+    gray = ocr_preprocess.to_gray(image)
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, edges = cv2.threshold(gradient, EDGE_THRESHOLD, 255, cv2.THRESH_BINARY)
+    borders = cv2.bitwise_or(
+        cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (LINE_LENGTH, 1))),
+        cv2.morphologyEx(edges, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, LINE_LENGTH))))
+    edges = cv2.subtract(edges, borders)
+    blocks = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (LINK_WIDTH, LINK_HEIGHT)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(blocks, connectivity=8)
+
+    height, width = gray.shape
+    boxes = []
+    for x, y, w, h, _ in stats[1:count]:
+        if w < MIN_WIDTH or h < MIN_HEIGHT:
+            continue
+        if cv2.countNonZero(edges[y:y + h, x:x + w]) < w * h * MIN_EDGE_DENSITY:
+            continue # Mostly empty: a leftover of a frame, a gradient or noise
+        boxes.append([max(0, int(x) - padding), max(0, int(y) - padding),
+                      min(width, int(x + w) + padding), min(height, int(y + h) + padding)])
+    return [tuple(box) for box in sorted(_merge_blocks(boxes), key=lambda b: (b[1], b[0]))]
+
+def _merge_blocks(boxes):
+    """
+    Unions boxes that overlap, or are lines stacked within BLOCK_LINE_GAP line heights of each
+    other, until none are left to merge (few boxes per screenshot, so pairwise is fine).
+    """
+    def joined(a, b):
+        if not (a[0] < b[2] and b[0] < a[2]):
+            return False # Side by side (e.g. columns or a label and its value)
+        gap = max(a[1], b[1]) - min(a[3], b[3])
+        return gap < BLOCK_LINE_GAP * min(a[3] - a[1], b[3] - b[1])
+
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if joined(box, other):
+                    other[:] = [min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])]
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return boxes
+
+def coverage(regions, size):
+    """Fraction of an image of size (width, height) covered by the (non-overlapping) regions."""
+    area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+    return area / max(1, size[0] * size[1])
+
+def resolve_mode(mode=None):
+    """Returns mode, defaulting to the ocr.text_regions setting. Raises ValueError for an unknown mode."""
+    if mode is None:
+        mode = config_manager.get_setting("ocr", "text_regions", "off")
+    if mode not in MODES:
+        raise ValueError(f"Unknown text region mode {mode!r}; expected one of {MODES}")
+    return mode
+
+def recognize_regions(image, regions, recognize_crop, workers=None):
+    """
+    OCRs the regions of an image in parallel and combines the results.
+
+    Args:
+        image (PIL.Image.Image): The full image.
+        regions (list): (x1, y1, x2, y2) boxes from find_text_regions.
+        recognize_crop (callable): recognize_crop(crop image) -> OcrResult; may raise
+                                   ocr_engines.OcrError, which is passed on.
+        workers (int, optional): Parallel crops (see ocr_tiles.map_parts).
+
+    Returns:
+        OcrResult: The words of all regions in full-image coordinates; each block of each region
+                   is a block of the result.
+    """
+    width, height = image.size
+    if not regions:
+        return OcrResult(width, height)
+    # Biggest crops first, so a large block does not start last and prolong the wall time
+    order = sorted(range(len(regions)), key=lambda i: -(regions[i][2] - regions[i][0]) * (regions[i][3] - regions[i][1]))
+    results = [None] * len(regions)
+    for i, result in zip(order, ocr_tiles.map_parts(lambda i: recognize_crop(image.crop(regions[i])), order, workers)):
+        results[i] = result
+    pieces = []
+    block_numbers = {}
+    for index, (result, (x1, y1, _, _)) in enumerate(zip(results, regions)):
+        for line in range(result.line_count):
+            block = block_numbers.setdefault((index, result.line_key(line)[0]), len(block_numbers) + 1)
+            pieces.append((result, line, x1, y1, block))
+    return OcrResult.from_lines(pieces, width, height)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from PIL import Image, ImageDraw
+    parser = argparse.ArgumentParser(description="Detect the text regions of an image and draw them.")
+    parser.add_argument("image")
+    parser.add_argument("output", help="Copy of the image with the regions outlined.")
+    args = parser.parse_args()
+    with Image.open(args.image) as opened:
+        source = opened.convert("RGB")
+    start = time.perf_counter()
+    found = find_text_regions(source)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    draw = ImageDraw.Draw(source)
+    for box in found:
+        draw.rectangle(box, outline=(255, 0, 0), width=2)
+    source.save(args.output)
+    print(f"{len(found)} region(s) covering {coverage(found, source.size):.0%} of the image, found in {elapsed_ms:.1f} ms")
@@ -0,0 +1,168 @@
+"""
+Tiled rendering of large images at arbitrary zoom levels.
+
+The editor shows only the part of the image that is visible on the canvas. TileRenderer splits the
+zoomed image into square tiles, renders a tile only when it is requested and keeps the most
+recently used tiles in an LRU cache, so panning back and forth or repainting after an edit does
+not resample the whole image.
+
+To keep zoomed-out rendering cheap, the renderer keeps a pyramid of downscaled copies of the
+image (1/2, 1/4, ...). A tile is resampled from the smallest level that still has at least the
+requested resolution, so rendering one tile reads at most about four times its pixel count,
+regardless of the image size or zoom level. Edits update only the affected area of each level.
+"""
+
+import collections
+import math
+
+from PIL import Image
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_CACHE_TILES = 192 # About 48 MB of RGBA tiles at the default tile size
+MIN_PYRAMID_SIZE = 256 # Stop halving once a level is smaller than this in both directions
+
+class TileRenderer:
+    def __init__(self, image, tile_size=DEFAULT_TILE_SIZE, cache_tiles=DEFAULT_CACHE_TILES, convert=None):
+        """
+        Args:
+            image (PIL.Image.Image): The image to render. It is not copied: edit it in place and call
+                                     invalidate(), or call set_image() after replacing it.
+            tile_size (int): Edge length of a tile in display pixels.
+            cache_tiles (int): Maximum number of rendered tiles kept in the cache.
+            convert (callable, optional): Applied to each rendered PIL tile before it is cached, e.g.
+                                          ImageTk.PhotoImage, so the cache holds display-ready tiles.
+        """
+        self.tile_size = int(tile_size)
+        self.cache_tiles = max(1, int(cache_tiles))
+        self.convert = convert
+        self._cache = collections.OrderedDict() # (zoom, tx, ty) -> tile, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.set_image(image)
+
+    def set_image(self, image):
+        """Replaces the image (e.g. after a crop) and drops all cached tiles."""
+        self.image = image
+        self._levels = [image]
+        level = image
+        while level.width > MIN_PYRAMID_SIZE or level.height > MIN_PYRAMID_SIZE:
+            level = level.reduce(2) # Box filter; averages every source pixel
+            self._levels.append(level)
+        self._cache.clear()
+
+    def display_size(self, zoom):
+        """Size in display pixels of the whole image at zoom."""
+        return max(1, int(self.image.width * zoom)), max(1, int(self.image.height * zoom))
+
+    def grid_size(self, zoom):
+        """Number of tile columns and rows at zoom."""
+        width, height = self.display_size(zoom)
+        return int(math.ceil(width / self.tile_size)), int(math.ceil(height / self.tile_size))
+
+    def tiles_in(self, zoom, box):
+        """
+        Returns the (tx, ty) of all tiles intersecting box.
+
+        Args:
+            zoom (float): Display pixels per image pixel.
+            box (tuple): (x1, y1, x2, y2) in display pixels, relative to the image's top-left corner.
+        """
+        columns, rows = self.grid_size(zoom)
+        tx1 = max(0, int(box[0] // self.tile_size))
+        ty1 = max(0, int(box[1] // self.tile_size))
+        tx2 = min(columns, int(math.ceil(box[2] / self.tile_size)))
+        ty2 = min(rows, int(math.ceil(box[3] / self.tile_size)))
+        return [(tx, ty) for ty in range(ty1, ty2) for tx in range(tx1, tx2)]
+
+    def get_tile(self, zoom, tx, ty):
+        """Returns tile (tx, ty) at zoom from the cache, rendering it on a miss."""
+        key = (zoom, tx, ty)
+        tile = self._cache.get(key)
+        if tile is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return tile
+        self.misses += 1
+        tile = self.render_tile(zoom, tx, ty)
+        if self.convert is not None:
+            tile = self.convert(tile)
+        self._cache[key] = tile
+        while len(self._cache) > self.cache_tiles:
+            self._cache.popitem(last=False)
+        return tile
+
+    def render_tile(self, zoom, tx, ty):
+        """Renders tile (tx, ty) at zoom without using the cache. Edge tiles are smaller than tile_size."""
+        x1, y1 = tx * self.tile_size, ty * self.tile_size
+        return self.render_region(zoom, (x1, y1, x1 + self.tile_size, y1 + self.tile_size))
+
+    def render_region(self, zoom, box):
+        """
+        Renders an arbitrary area without using the cache, e.g. for a live effect preview.
+
+        Args:
+            zoom (float): Display pixels per image pixel.
+            box (tuple): (x1, y1, x2, y2) in display pixels; clipped to the image.
+        """
+        width, height = self.display_size(zoom)
+        x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+        x2, y2 = min(width, int(box[2])), min(height, int(box[3]))
+        if x1 >= x2 or y1 >= y2:
+            raise ValueError(f"Region {box} is outside the image at zoom {zoom}")
+
+        # Smallest pyramid level whose scale is still >= zoom
+        index = 0
+        while index + 1 < len(self._levels) and 0.5 ** (index + 1) >= zoom:
+            index += 1
+        level = self._levels[index]
+        factor = zoom * (2 ** index) # Display pixels per pixel of this level
+
+        if factor == 1.0:
+            return level.crop((x1, y1, x2, y2))
+        # Zoomed in: show crisp pixels. Zoomed out: filter to avoid aliasing of text and thin lines.
+        resample = Image.Resampling.NEAREST if factor > 1.0 else Image.Resampling.LANCZOS
+
+        # Crop first: resize() converts RGBA images to premultiplied alpha as a whole, even with a box.
+        # The margin covers the filter's reach (3 output pixels for LANCZOS) past the tile.
+        margin = int(math.ceil(3 / factor)) + 1 if factor < 1.0 else 1
+        sx1, sy1 = x1 / factor, y1 / factor
+        sx2, sy2 = min(level.width, x2 / factor), min(level.height, y2 / factor)
+        cx1, cy1 = max(0, int(sx1) - margin), max(0, int(sy1) - margin)
+        cx2, cy2 = min(level.width, int(math.ceil(sx2)) + margin), min(level.height, int(math.ceil(sy2)) + margin)
+        source = level.crop((cx1, cy1, cx2, cy2))
+        return source.resize((x2 - x1, y2 - y1), resample, box=(sx1 - cx1, sy1 - cy1, sx2 - cx1, sy2 - cy1))
+
+    def invalidate(self, box):
+        """
+        Tells the renderer that the pixels in box = (x1, y1, x2, y2) of the image changed.
+
+        Updates that area of each pyramid level and drops the cached tiles that show it.
+
+        Returns:
+            dict: zoom -> list of (tx, ty) that were dropped, for callers that need to repaint them.
+        """
+        x1, y1, x2, y2 = (int(v) for v in box)
+        for index in range(1, len(self._levels)):
+            previous, level = self._levels[index - 1], self._levels[index]
+            # Area of this level depending on the changed area of the previous one
+            x1, y1 = x1 // 2, y1 // 2
+            x2, y2 = min(level.width, (x2 + 1) // 2), min(level.height, (y2 + 1) // 2)
+            if x1 >= x2 or y1 >= y2:
+                break
+            source = previous.crop((x1 * 2, y1 * 2, min(previous.width, x2 * 2), min(previous.height, y2 * 2)))
+            level.paste(source.reduce(2), (x1, y1))
+
+        dropped = {}
+        pad = 3 # Display pixels; the LANCZOS filter reaches this far past the changed area
+        for key in list(self._cache):
+            zoom, tx, ty = key
+            dx1, dy1 = box[0] * zoom - pad, box[1] * zoom - pad
+            dx2, dy2 = box[2] * zoom + pad, box[3] * zoom + pad
+            tile_x1, tile_y1 = tx * self.tile_size, ty * self.tile_size
+            if tile_x1 < dx2 and tile_x1 + self.tile_size > dx1 and tile_y1 < dy2 and tile_y1 + self.tile_size > dy1:
+                del self._cache[key]
+                dropped.setdefault(zoom, []).append((tx, ty))
+        return dropped
+
+    def get_status(self):
+        return {"levels": len(self._levels), "cached_tiles": len(self._cache), "hits": self.hits, "misses": self.misses}
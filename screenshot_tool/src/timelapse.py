@@ -0,0 +1,194 @@
+"""
+Interval (timelapse) capture with deduplication.
+
+Takes a screenshot every N seconds and saves it with the configured output format, skipping
+frames whose content matches the last saved frame. Capturing, comparing and saving are designed
+to run unattended for days: one capture session is reused, frames are compared on a sparse grid of
+full-resolution pixels (see frame_diff; a thumbnail would average away a changed line of text),
+writes happen on a bounded writer pool, and no per-frame state is kept.
+
+Usage (from the screenshot_tool directory):
+    python -m src.timelapse --interval 60 --output ~/Pictures/dashboards
+    python -m src.timelapse --interval 5 --region 0,0,1280,720 --tolerance 0.01
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+
+from . import frame_diff
+from . import image_io
+
+SAMPLE_STEP = 2 # Every SAMPLE_STEP-th pixel in each direction is compared; glyph strokes are 1-2 pixels wide
+PIXEL_TOLERANCE = 24 # Per-channel difference below which a sampled pixel counts as unchanged
+DEFAULT_DEDUP_TOLERANCE = 0.0001
+
+class TimelapseCapture:
+    def __init__(self, interval=60.0, region=None, output_dir=None, image_format=None,
+                 dedup_tolerance=DEFAULT_DEDUP_TOLERANCE, max_frames=None, writer=None):
+        """
+        Args:
+            interval (float): Seconds between captures.
+            region (dict, optional): {"top", "left", "width", "height"}; defaults to the primary monitor.
+            output_dir (str, optional): Defaults to general.default_save_path.
+            image_format (str, optional): Defaults to output.image_format.
+            dedup_tolerance (float, optional): A frame is dropped if at most this fraction (0.0-1.0) of the
+                                               sampled pixels differs from the last saved frame. 0 drops only
+                                               exact (byte-identical) matches; negative disables deduplication.
+            max_frames (int, optional): Stop after this many saved frames.
+            writer (image_io.ImageWriterPool, optional): Shared writer pool. One is created if omitted.
+        """
+        self.interval = float(interval)
+        self.region = region
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.dedup_tolerance = dedup_tolerance
+        self.max_frames = max_frames
+
+        self._writer = writer
+        self._owns_writer = writer is None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._last_saved_samples = None
+        self._last_saved_digest = None
+
+        self.frames_captured = 0
+        self.frames_saved = 0
+        self.frames_skipped = 0
+        self.last_path = None
+
+    def start(self):
+        if self.is_running():
+            print("Timelapse capture is already running.")
+            return
+        if self._writer is None:
+            self._writer = image_io.ImageWriterPool(max_workers=2, max_pending=4)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._capture_loop, name="timelapse", daemon=True)
+        self._thread.start()
+        print(f"Timelapse capture started: every {self.interval}s.")
+
+    def stop(self, wait=True):
+        """Stops capturing. With wait=True, returns once pending frames have been written."""
+        self._stop_event.set()
+        if self._thread and wait:
+            self._thread.join()
+        if self._owns_writer and self._writer is not None:
+            self._writer.shutdown(wait=wait)
+            self._writer = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self):
+        return {
+            "is_running": self.is_running(),
+            "frames_captured": self.frames_captured,
+            "frames_saved": self.frames_saved,
+            "frames_skipped": self.frames_skipped,
+            "last_path": self.last_path,
+        }
+
+    def _signature(self, image):
+        """What _is_duplicate compares: the frame's sampled pixels, or a digest of all its bytes for tolerance 0."""
+        if self.dedup_tolerance < 0:
+            return None
+        if self.dedup_tolerance == 0:
+            return hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+        import numpy as np
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        return frame_diff.downsample_frame(np.asarray(image), SAMPLE_STEP)
+
+    def _is_duplicate(self, signature):
+        if signature is None:
+            return False
+        # Comparing against the last *saved* frame (not the previous one) means slow drift
+        # still produces a new frame once it adds up.
+        if self.dedup_tolerance == 0:
+            return signature == self._last_saved_digest
+        if self._last_saved_samples is None:
+            return False
+        return frame_diff.changed_fraction(self._last_saved_samples, signature, PIXEL_TOLERANCE) <= self.dedup_tolerance
+
+    def _capture_loop(self):
+        import mss
+        from .main import grab_image
+
+        with mss.mss() as sct:
+            next_shot = time.monotonic()
+            while not self._stop_event.is_set():
+                try:
+                    image = grab_image(self.region, sct=sct)
+                    self.frames_captured += 1
+                    signature = self._signature(image)
+                    if self._is_duplicate(signature):
+                        self.frames_skipped += 1
+                    else:
+                        path = image_io.build_capture_path(self.output_dir, self.image_format, prefix="timelapse_")
+                        self._writer.submit(image, path, self.image_format)
+                        if self.dedup_tolerance == 0:
+                            self._last_saved_digest = signature
+                        else:
+                            self._last_saved_samples = signature
+                        self.frames_saved += 1
+                        self.last_path = path
+                    del image # Do not hold the frame while sleeping
+                except Exception as e:
+                    print(f"Timelapse capture error: {e}")
+
+                if self.max_frames is not None and self.frames_saved >= self.max_frames:
+                    break
+
+                # Fixed schedule rather than sleep(interval) so capture time does not accumulate as drift.
+                # If a capture overran one or more intervals, skip them instead of bursting.
+                next_shot += self.interval
+                now = time.monotonic()
+                if next_shot < now:
+                    next_shot = now + self.interval - ((now - next_shot) % self.interval)
+                self._stop_event.wait(next_shot - now)
+        print(f"Timelapse capture stopped. Saved {self.frames_saved} frame(s), skipped {self.frames_skipped} duplicate(s).")
+
+
+def capture_timelapse(interval=60.0, region=None, output_dir=None, dedup_tolerance=DEFAULT_DEDUP_TOLERANCE, max_frames=None):
+    """
+    Functional interface: starts a timelapse capture in the background and returns it.
+    Call .stop() on the returned object to end it.
+    """
+    capturer = TimelapseCapture(interval=interval, region=region, output_dir=output_dir,
+                                dedup_tolerance=dedup_tolerance, max_frames=max_frames)
+    capturer.start()
+    return capturer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Take a screenshot every N seconds, skipping unchanged frames.")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between captures.")
+    parser.add_argument("--region", help="left,top,width,height (default: primary monitor).")
+    parser.add_argument("--output", help="Output directory (default: configured save path).")
+    parser.add_argument("--format", dest="image_format", help="PNG, JPG or BMP (default: configured format).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_DEDUP_TOLERANCE,
+                        help="Max fraction (0-1) of sampled pixels that may change for a frame to count as unchanged. "
+                             "0 drops only identical frames; -1 disables deduplication.")
+    parser.add_argument("--max-frames", type=int, help="Stop after saving this many frames.")
+    args = parser.parse_args()
+
+    region = None
+    if args.region:
+        left, top, width, height = (int(v) for v in args.region.split(","))
+        region = {"top": top, "left": left, "width": width, "height": height}
+
+    timelapse = TimelapseCapture(interval=args.interval, region=region,
+                                 output_dir=os.path.expanduser(args.output) if args.output else None,
+                                 image_format=args.image_format, dedup_tolerance=args.tolerance,
+                                 max_frames=args.max_frames)
+    timelapse.start()
+    print("Press Ctrl+C to stop.")
+    try:
+        while timelapse.is_running():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    timelapse.stop()
@@ -0,0 +1,59 @@
+"""
+Delivering results from worker threads to the Tk thread.
+
+Tkinter objects must only be touched from the thread running the mainloop. Worker threads post
+callbacks to a TkDispatcher, which runs them on the Tk thread by polling a queue with `after`.
+"""
+
+import queue
+
+DEFAULT_POLL_MS = 30
+
+class TkDispatcher:
+    def __init__(self, widget, poll_ms=DEFAULT_POLL_MS):
+        """
+        Args:
+            widget (tk.Misc): Any widget of the Tk application; polling stops when it is destroyed.
+                              Must be created on (and this constructor called from) the Tk thread.
+            poll_ms (int, optional): Polling interval. Bounds the delay before a posted callback runs.
+        """
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._queue = queue.Queue()
+        self._polling = False
+        self._ensure_polling()
+
+    def post(self, func, *args, **kwargs):
+        """Queues func(*args, **kwargs) to run on the Tk thread. Safe to call from any thread."""
+        self._queue.put((func, args, kwargs))
+
+    def wrap(self, func):
+        """Returns a function that, called from any thread, runs func on the Tk thread instead."""
+        if func is None:
+            return None
+        def posted(*args, **kwargs):
+            self.post(func, *args, **kwargs)
+        return posted
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                func, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error in Tk callback {getattr(func, '__name__', func)}: {e}")
+        try:
+            if self.widget.winfo_exists():
+                self.widget.after(self.poll_ms, self._poll)
+                return
+        except Exception: # TclError once the application has been destroyed
+            pass
+        self._polling = False
@@ -0,0 +1,252 @@
+"""
+Time-coded OCR index of screen recordings, to find when a text (e.g. an error message) was on screen.
+
+A recording shows the same screen for seconds at a time, and OCR of every frame would take far
+longer than the recording itself. build_timeline() decodes the video and:
+
+  1. looks at one frame every search.recording_sample_interval seconds (the frames in between
+     are grabbed but not converted),
+  2. compares it with the screen as last recognized, on every SAMPLE_STEP-th pixel (see
+     frame_diff), and skips it when almost nothing changed (a blinking cursor, a ticking clock),
+  3. groups the changed pixels into boxes and OCRs only the text regions (see text_regions) that
+     the boxes touch, so a line that changed in one word is still read whole; after a scene change
+     (a window switch) the whole frame is recognized instead,
+  4. replaces the lines previously seen in those areas, and records the lines whose text is new.
+
+The index is a JSON Lines file next to the video (recording.mp4 -> recording.ocr.jsonl): a header,
+then one line per frame in which new text appeared:
+
+    {"video": "recording.mp4", "fps": 15.0, "frames": 900, "interval": 1.0, "lang": "eng"}
+    {"t": 12.0, "frame": 180, "lines": [{"text": "Error: disk full", "box": [x1, y1, x2, y2], "conf": 91.2}]}
+
+Entries are written as they are found, so an interrupted run still leaves a usable index.
+search_timeline() returns the moments a text appeared.
+"""
+
+import collections
+import json
+import os
+import time
+
+from PIL import Image
+
+from . import config_manager
+from . import frame_diff
+from . import ocr
+from . import text_regions
+from .ocr_result import OcrResult
+
+DEFAULT_SAMPLE_INTERVAL = 1.0
+SAMPLE_STEP = 4 # Every SAMPLE_STEP-th pixel in each direction is compared
+PIXEL_TOLERANCE = 24 # Per-channel difference that counts as a change; lower values pick up compression noise
+MIN_CHANGED_FRACTION = 0.0005 # Frames in which less of the screen changed are skipped
+CHANGE_LINK = 4 # Changed samples up to this many samples apart form one box
+FULL_FRAME_FRACTION = 0.5 # Above this changed fraction the whole frame is recognized
+
+def timeline_path(video_path):
+    """Path of the OCR index of a video: the video's path with .ocr.jsonl instead of its extension."""
+    return os.path.splitext(video_path)[0] + ".ocr.jsonl"
+
+def format_time(seconds):
+    """Formats a time in the video as H:MM:SS.s."""
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{seconds:04.1f}"
+
+def _change_boxes(mask, size):
+    """
+    Returns the (x1, y1, x2, y2) boxes, in frame pixels, around the groups of changed samples of
+    a changed_mask, and the fraction of the frame they cover.
+    """
+    import cv2
+    import numpy as np
+    kernel = np.ones((2 * CHANGE_LINK + 1, 2 * CHANGE_LINK + 1), np.uint8)
+    grown = cv2.dilate(mask.astype(np.uint8), kernel)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(grown, connectivity=8)
+    width, height = size
+    boxes = []
+    area = 0
+    for x, y, w, h, _ in stats[1:count]:
+        box = (int(x) * SAMPLE_STEP, int(y) * SAMPLE_STEP,
+               min(width, int(x + w) * SAMPLE_STEP), min(height, int(y + h) * SAMPLE_STEP))
+        boxes.append(box)
+        area += (box[2] - box[0]) * (box[3] - box[1])
+    return boxes, area / max(1, width * height)
+
+def _intersects(box1, box2):
+    return box1[0] < box2[2] and box2[0] < box1[2] and box1[1] < box2[3] and box2[1] < box1[3]
+
+def _frames(capture, every):
+    """Yields (frame number, BGR frame) for every every-th frame of an open cv2.VideoCapture."""
+    number = 0
+    while True:
+        if number % every:
+            if not capture.grab(): # Decodes without converting the frame; cheaper than read()
+                return
+        else:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield number, frame
+        number += 1
+
+def build_timeline(video_path, output_path=None, lang=None, interval=None, on_entry=None, should_stop=None):
+    """
+    OCRs the text that appears in a video and writes the time-coded index (see the module docstring).
+
+    Args:
+        video_path (str): The recording (any format cv2.VideoCapture reads).
+        output_path (str, optional): Where to write the index. Defaults to timeline_path(video_path).
+        lang (str, optional): OCR language code(s). Defaults to the search.lang setting.
+        interval (float, optional): Seconds between checked frames. Defaults to the
+                                    search.recording_sample_interval setting.
+        on_entry (callable, optional): Called with each entry dict as it is written.
+        should_stop (callable, optional): Polled between frames; returning True ends the run early
+                                          (the index written so far is kept).
+
+    Returns:
+        dict: Summary {"frames_checked", "frames_recognized", "entries", "lines", "seconds"}.
+        None: If the video could not be read or OCR failed (the message is printed).
+    """
+    import cv2
+    lang = lang or config_manager.get_setting("search", "lang", "eng")
+    if interval is None:
+        interval = float(config_manager.get_setting("search", "recording_sample_interval", DEFAULT_SAMPLE_INTERVAL))
+    output_path = output_path or timeline_path(video_path)
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        print(f"Error: Could not open video {video_path}.")
+        return None
+    fps = capture.get(cv2.CAP_PROP_FPS) or 15.0
+    every = max(1, int(round(interval * fps)))
+
+    def recognize_crop(crop):
+        # A failing crop is reported by ocr and counts as empty; a failing engine is caught below
+        layout = ocr.extract_layout(crop, lang=lang, detect_regions="off")
+        return layout if layout is not None else OcrResult(*crop.size)
+
+    summary = {"frames_checked": 0, "frames_recognized": 0, "entries": 0, "lines": 0}
+    start = time.perf_counter()
+    reference = None # Samples of the last recognized frame
+    visible = [] # (text, box) of the lines currently on screen
+    try:
+        with open(output_path, "w", encoding="utf-8") as output:
+            header = {"video": os.path.basename(video_path), "fps": fps,
+                      "frames": int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), "interval": interval, "lang": lang}
+            output.write(json.dumps(header) + "\n")
+            for number, frame in _frames(capture, every):
+                if should_stop is not None and should_stop():
+                    break
+                summary["frames_checked"] += 1
+                samples = frame_diff.downsample_frame(frame, SAMPLE_STEP)
+                size = (frame.shape[1], frame.shape[0])
+                if reference is None or reference.shape != samples.shape:
+                    areas, covered = [(0, 0) + size], 1.0
+                else:
+                    mask = frame_diff.changed_mask(reference, samples, PIXEL_TOLERANCE)
+                    if mask.mean() < MIN_CHANGED_FRACTION:
+                        continue # Keep the old reference, so slow changes still add up
+                    areas, covered = _change_boxes(mask, size)
+                reference = samples
+                image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                summary["frames_recognized"] += 1
+
+                if covered > FULL_FRAME_FRACTION:
+                    layout = ocr.extract_layout(image, lang=lang, detect_regions="auto")
+                    if layout is None:
+                        return None
+                    areas = [(0, 0) + size]
+                else:
+                    regions = [region for region in text_regions.find_text_regions(image)
+                               if any(_intersects(region, area) for area in areas)]
+                    layout = text_regions.recognize_regions(image, regions, recognize_crop)
+                    areas = areas + regions
+
+                gone = [line for line in visible if any(_intersects(line[1], area) for area in areas)]
+                visible = [line for line in visible if line not in gone]
+                previous = collections.Counter(text for text, _ in gone)
+                new_lines = []
+                for line in layout.lines():
+                    visible.append((line["text"], line["box"]))
+                    if previous[line["text"]] > 0:
+                        previous[line["text"]] -= 1 # Recognized again, not new
+                    else:
+                        new_lines.append({"text": line["text"], "box": list(line["box"]), "conf": round(line["conf"], 1)})
+                if not new_lines:
+                    continue
+                entry = {"t": round(number / fps, 2), "frame": number, "lines": new_lines}
+                output.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                output.flush()
+                summary["entries"] += 1
+                summary["lines"] += len(new_lines)
+                if on_entry is not None:
+                    on_entry(entry)
+    except OSError as e:
+        print(f"Error: Could not write OCR index {output_path}: {e}")
+        return None
+    finally:
+        capture.release()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+def read_timeline(path):
+    """
+    Reads an index written by build_timeline (a video path is mapped to its index with timeline_path).
+
+    Returns:
+        tuple: (header dict, list of entry dicts).
+    """
+    if not path.endswith(".jsonl"):
+        path = timeline_path(path)
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        entries = [json.loads(line) for line in f if line.strip()]
+    return header, entries
+
+def search_timeline(path, query):
+    """
+    Finds the moments text containing query (case-insensitive) appeared in a recording.
+
+    Args:
+        path (str): The index, or the video it belongs to.
+        query (str): Text to look for.
+
+    Returns:
+        list: {"t", "frame", "text", "box"} dicts, in the order the lines appeared.
+    """
+    _, entries = read_timeline(path)
+    needle = query.casefold()
+    return [{"t": entry["t"], "frame": entry["frame"], "text": line["text"], "box": line["box"]}
+            for entry in entries for line in entry["lines"] if needle in line["text"].casefold()]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Build or search the time-coded OCR index of a screen recording.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="OCR the text that appears in a recording.")
+    build_parser.add_argument("video")
+    build_parser.add_argument("--output", help="Index file (default: next to the video, .ocr.jsonl).")
+    build_parser.add_argument("--lang", help="OCR language code(s) (default: the search.lang setting).")
+    build_parser.add_argument("--interval", type=float, help="Seconds between checked frames.")
+    search_parser = subparsers.add_parser("search", help="Find when a text appeared.")
+    search_parser.add_argument("video", help="The recording or its .ocr.jsonl index.")
+    search_parser.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        result = build_timeline(args.video, args.output, args.lang, args.interval,
+                                on_entry=lambda entry: print(f"{format_time(entry['t'])}  " +
+                                                             " | ".join(line["text"] for line in entry["lines"])))
+        if result is None:
+            sys.exit(1)
+        print(f"Checked {result['frames_checked']} frame(s), recognized {result['frames_recognized']}; "
+              f"{result['lines']} new line(s) in {result['seconds']:.1f} s")
+    else:
+        matches = search_timeline(args.video, args.query)
+        for match in matches:
+            print(f"{format_time(match['t'])}  frame {match['frame']}  {match['box']}  {match['text']}")
+        if not matches:
+            print("No matches.")
@@ -0,0 +1,13 @@
+import copy
+
+import pytest
+
+from src import config_manager
+
+
+@pytest.fixture
+def default_config(monkeypatch):
+    """The default settings, in memory only: the user's config file is neither read nor written."""
+    config = copy.deepcopy(config_manager.DEFAULT_CONFIG)
+    monkeypatch.setattr(config_manager, "_current_config", config)
+    return config
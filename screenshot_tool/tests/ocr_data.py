@@ -0,0 +1,26 @@
+"""Builders for OCR engine output, so tests can feed OcrResult and the OCR pipeline without Tesseract."""
+
+from src.ocr_engines import DATA_COLUMNS
+
+
+def tesseract_data(size, words, conf=90):
+    """
+    An engine's image_to_data dict (see ocr_engines.DATA_COLUMNS): the page row of an image of size,
+    then one row per word.
+
+    Args:
+        size (tuple): (width, height) of the image.
+        words (iterable): (text, (x1, y1, x2, y2), line number) per word, in reading order; all
+                          words are in block 1, paragraph 1.
+        conf (float): Confidence of every word.
+    """
+    data = {column: [] for column in DATA_COLUMNS}
+    rows = [{"level": 1, "block_num": 0, "par_num": 0, "line_num": 0, "word_num": 0, "left": 0, "top": 0,
+             "width": size[0], "height": size[1], "conf": -1, "text": ""}]
+    for number, (text, (x1, y1, x2, y2), line) in enumerate(words, 1):
+        rows.append({"level": 5, "block_num": 1, "par_num": 1, "line_num": line, "word_num": number,
+                     "left": x1, "top": y1, "width": x2 - x1, "height": y2 - y1, "conf": conf, "text": text})
+    for row in rows:
+        for column in DATA_COLUMNS:
+            data[column].append(row.get(column, 1))
+    return data
@@ -0,0 +1,55 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from src import fonts, frame_diff, timelapse
+
+
+def _dashboard(status):
+    image = Image.new("RGB", (1920, 1080), (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((100, 100, 1800, 900), fill=(255, 255, 255))
+    draw.text((200, 500), status, fill=(0, 0, 0), font=fonts.get_font("sans", 14))
+    return image
+
+
+def test_changed_fraction_sees_a_changed_status_line():
+    before = frame_diff.downsample_frame(np.asarray(_dashboard("PASSED 123")), 2)
+    after = frame_diff.downsample_frame(np.asarray(_dashboard("FAILED 124")), 2)
+    same = frame_diff.downsample_frame(np.asarray(_dashboard("PASSED 123")), 2)
+    assert frame_diff.changed_fraction(before, same) == 0.0
+    assert frame_diff.changed_fraction(before, after) > 0.0
+
+
+def test_changed_mask_marks_only_the_changed_pixels():
+    first = np.zeros((8, 8, 3), np.uint8)
+    second = first.copy()
+    second[2, 3] = 200
+    mask = frame_diff.changed_mask(frame_diff.downsample_frame(first, 1), frame_diff.downsample_frame(second, 1))
+    assert mask.sum() == 1 and mask[2, 3]
+
+
+def test_downsample_bgra_matches_downsample_frame():
+    pixels = np.random.default_rng(0).integers(0, 256, (9, 7, 4), dtype=np.uint8)
+    assert np.array_equal(frame_diff.downsample_bgra(pixels.tobytes(), 7, 9, 2), frame_diff.downsample_frame(pixels, 2))
+
+
+def _saved(capture, image):
+    signature = capture._signature(image)
+    if capture.dedup_tolerance == 0:
+        capture._last_saved_digest = signature
+    else:
+        capture._last_saved_samples = signature
+
+
+def test_timelapse_keeps_a_frame_whose_text_changed():
+    for tolerance in (0, timelapse.DEFAULT_DEDUP_TOLERANCE):
+        capture = timelapse.TimelapseCapture(dedup_tolerance=tolerance)
+        _saved(capture, _dashboard("PASSED 123"))
+        assert capture._is_duplicate(capture._signature(_dashboard("PASSED 123")))
+        assert not capture._is_duplicate(capture._signature(_dashboard("FAILED 124")))
+
+
+def test_timelapse_negative_tolerance_keeps_every_frame():
+    capture = timelapse.TimelapseCapture(dedup_tolerance=-1)
+    _saved(capture, _dashboard("PASSED 123"))
+    assert not capture._is_duplicate(capture._signature(_dashboard("PASSED 123")))
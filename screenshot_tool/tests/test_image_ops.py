@@ -0,0 +1,25 @@
+from PIL import Image
+
+from src import image_ops
+
+
+def test_negative_box_is_the_corner_of_the_documented_size():
+    assert image_ops.resolve_box([-300, -80, -1, -1], (1920, 1080)) == (1620, 1000, 1920, 1080)
+
+
+def test_negative_start_and_end_count_the_same_pixels():
+    # -n is the n-th pixel from the edge for both ends; the end pixel is included
+    assert image_ops.resolve_box([-5, -5, -5, -5], (100, 50)) == (95, 45, 96, 46)
+
+
+def test_positive_coordinates_are_unchanged():
+    assert image_ops.resolve_box([10, 20, 30, 40], (100, 100)) == (10, 20, 30, 40)
+
+
+def test_negative_points_are_pixels_from_the_edge():
+    assert image_ops.resolve_points([(20, -60), (-1, -1)], (1920, 1080)) == [(20, 1020), (1919, 1079)]
+
+
+def test_crop_with_negative_box():
+    image = Image.new("RGB", (640, 480))
+    assert image_ops.crop(image, image_ops.resolve_box([-300, -80, -1, -1], image.size)).size == (300, 80)
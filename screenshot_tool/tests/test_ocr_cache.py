@@ -0,0 +1,81 @@
+import itertools
+import types
+
+from PIL import Image
+
+from src import ocr_cache
+
+
+def _clock(monkeypatch):
+    """Makes the cache's last_used timestamps strictly increasing, so LRU order is deterministic."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(ocr_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_put_and_get_survive_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ocr_cache.OcrCache(path, max_mb=1)
+    cache.put("k", {"text": "hello"})
+    assert cache.get("k") == {"text": "hello"} and cache.memory_hits == 1
+    cache.close()
+
+    reopened = ocr_cache.OcrCache(path, max_mb=1)
+    assert reopened.get("k") == {"text": "hello"} and reopened.memory_hits == 0
+    assert reopened.get("missing") is None and reopened.misses == 1
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path, monkeypatch):
+    _clock(monkeypatch)
+    monkeypatch.setattr(ocr_cache, "MEMORY_ENTRIES", 1) # Lookups below go to the database
+    cache = ocr_cache.OcrCache(str(tmp_path / "cache.sqlite"), max_mb=5000 / (1024 * 1024))
+    for i in range(4):
+        cache.put(f"key{i}", "x" * 1000)
+    assert cache.evictions == 0
+    assert cache.get("key0") is not None # Now the most recently used
+    cache.put("key4", "x" * 1000)
+    cache.put("key5", "x" * 1000) # Over the cap: down to 90 % of it
+
+    assert cache.get("key1") is None and cache.get("key2") is None
+    assert all(cache.get(key) is not None for key in ("key0", "key3", "key4", "key5"))
+    assert cache.get_status()["stored_bytes"] <= cache.max_bytes
+    assert cache.count() == 4
+
+
+def test_eviction_keeps_entries_served_from_memory(tmp_path, monkeypatch):
+    _clock(monkeypatch)
+    monkeypatch.setattr(ocr_cache, "MEMORY_ENTRIES", 3)
+    cache = ocr_cache.OcrCache(str(tmp_path / "cache.sqlite"), max_mb=3500 / (1024 * 1024))
+    cache.put("hot", "x" * 1000)
+    cache.put("other", "x" * 1000)
+    assert cache.get("hot") is not None # A memory hit; last_used in the database stays old
+    cache.put("new", "x" * 1000)
+    cache.put("newer", "x" * 1000) # Over the cap: evicts "other", the oldest entry not in memory
+
+    assert cache.get("hot") is not None
+    assert cache.get("other") is None
+
+
+def test_get_or_compute_computes_once_per_image(tmp_path):
+    cache = ocr_cache.OcrCache(str(tmp_path / "cache.sqlite"), max_mb=1)
+    path = str(tmp_path / "shot.png")
+    Image.new("RGB", (30, 20), "white").save(path)
+    calls = []
+
+    def compute(image):
+        calls.append(image) # The decoded image, or the path if it was not decoded
+        return "text"
+
+    assert cache.get_or_compute(path, "eng", "fake", "text", compute) == ("text", False)
+    assert cache.get_or_compute(path, "eng", "fake", "text", compute) == ("text", True)
+    # The same pixels from a PIL image share the entry; another language or config does not
+    assert cache.get_or_compute(Image.open(path), "eng", "fake", "text", compute) == ("text", True)
+    assert cache.get_or_compute(path, "deu", "fake", "text", compute)[1] is False
+    assert cache.get_or_compute(path, "eng", "fake", "text", compute, config="|preprocess=x")[1] is False
+    assert len(calls) == 3
+
+
+def test_failed_compute_is_not_cached(tmp_path):
+    cache = ocr_cache.OcrCache(str(tmp_path / "cache.sqlite"), max_mb=1)
+    image = Image.new("RGB", (10, 10), "black")
+    assert cache.get_or_compute(image, "eng", "fake", "text", lambda image: None) == (None, False)
+    assert cache.get_or_compute(image, "eng", "fake", "text", lambda image: "ok") == ("ok", False)
@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+from PIL import Image
+
+from src import ocr_engines, ocr_tiles, text_regions
+from src.ocr_result import OcrResult
+
+TSV = "1\t1\t0\t0\t0\t0\t0\t0\t{w}\t{h}\t-1\t\n5\t1\t1\t1\t1\t1\t4\t4\t20\t10\t90\tword\n"
+
+
+class _StubApi:
+    """PyTessBaseAPI stand-in; recognition takes a moment so that concurrent calls overlap."""
+
+    def __init__(self, lang, path=None):
+        self.size = (0, 0)
+        self.ended = False
+
+    def SetImage(self, image):
+        self.size = image.size
+
+    def Recognize(self):
+        time.sleep(0.02)
+
+    def GetUTF8Text(self):
+        return "word\n"
+
+    def GetTSVText(self, page):
+        return TSV.format(w=self.size[0], h=self.size[1])
+
+    def End(self):
+        self.ended = True
+
+
+@pytest.fixture
+def make_engine(monkeypatch, default_config):
+    monkeypatch.setitem(sys.modules, "tesserocr", types.SimpleNamespace(PyTessBaseAPI=_StubApi))
+    engines = []
+    yield lambda max_apis: engines.append(ocr_engines.TesserocrEngine(max_apis=max_apis)) or engines[-1]
+    for engine in engines:
+        engine.close()
+
+
+def test_apis_are_reused_by_new_threads(make_engine):
+    engine = make_engine(8)
+    image = Image.new("RGB", (60, 30), "white")
+    for _ in range(3):
+        thread = threading.Thread(target=engine.image_to_data, args=(image,))
+        thread.start()
+        thread.join()
+    assert engine.api_count == 1
+
+
+def test_api_pool_is_bounded(make_engine):
+    engine = make_engine(2)
+    image = Image.new("RGB", (60, 30), "white")
+    threads = [threading.Thread(target=engine.image_to_data, args=(image,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert engine.api_count == 2
+    engine.close()
+    assert engine.api_count == 0
+
+
+def test_repeated_tiled_and_region_ocr_keeps_the_api_count(make_engine):
+    engine = make_engine(8)
+    def recognize(part):
+        return OcrResult.from_data(engine.image_to_data(part))
+
+    tall = Image.new("RGB", (200, 5000), "white")
+    wide = Image.new("RGB", (800, 600), "white")
+    regions = [(0, 0, 200, 100), (0, 200, 200, 300), (0, 400, 200, 500)]
+    counts = []
+    for _ in range(3):
+        ocr_tiles.recognize_tiled(tall, recognize, workers=3, strip_height=2000, overlap=160)
+        text_regions.recognize_regions(wide, regions, recognize, workers=3)
+        counts.append(engine.api_count)
+    assert counts[0] <= 3 and counts == [counts[0]] * 3
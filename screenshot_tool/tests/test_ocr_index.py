@@ -0,0 +1,112 @@
+import os
+
+from PIL import Image
+
+from src import ocr_index
+from src.ocr_result import OcrResult
+from tests.ocr_data import tesseract_data
+
+
+def _layout(words):
+    return OcrResult.from_data(tesseract_data((400, 100), [(word, (10 + 60 * i, 10, 60 + 60 * i, 30), 1)
+                                                           for i, word in enumerate(words)]))
+
+
+class _StubOcr:
+    """Stands in for ocr_index._ocr_job: the words of each file by name, or an error."""
+
+    def __init__(self, words):
+        self.words = words
+        self.calls = []
+
+    def __call__(self, job):
+        path, lang = job
+        self.calls.append(os.path.basename(path))
+        record = {"path": path, "lang": lang, "mtime": os.path.getmtime(path)}
+        words = self.words[os.path.basename(path)]
+        if words is None:
+            record["error"] = "OCR failed"
+        else:
+            layout = _layout(words)
+            record["text"], record["layout"] = layout.text, layout.to_dict()
+        return record
+
+
+def _image(path, color):
+    Image.new("RGB", (40, 20), color).save(path)
+    return str(path)
+
+
+def _index(tmp_path, monkeypatch, words):
+    stub = _StubOcr(words)
+    monkeypatch.setattr(ocr_index, "_ocr_job", stub)
+    return ocr_index.OcrIndex(str(tmp_path / "index.sqlite"), tokenizer="unicode61"), stub
+
+
+def test_update_indexes_new_files_and_skips_unchanged(tmp_path, monkeypatch):
+    shots = tmp_path / "shots"
+    shots.mkdir()
+    _image(shots / "a.png", "white")
+    _image(shots / "b.png", "black")
+    index, stub = _index(tmp_path, monkeypatch, {"a.png": ["connection", "refused"], "b.png": ["all", "good"]})
+
+    summary = index.update([str(shots)])
+    assert summary["ocr"] == 2 and summary["failed"] == 0
+    summary = index.update([str(shots)])
+    assert summary["unchanged"] == 2 and summary["ocr"] == 0
+    assert sorted(stub.calls) == ["a.png", "b.png"]
+
+
+def test_search_returns_matching_file_and_word_regions(tmp_path, monkeypatch):
+    shots = tmp_path / "shots"
+    shots.mkdir()
+    path = _image(shots / "a.png", "white")
+    _image(shots / "b.png", "black")
+    index, _ = _index(tmp_path, monkeypatch, {"a.png": ["connection", "refused", "here"], "b.png": ["all", "good"]})
+    index.update([str(shots)])
+
+    results = index.search("connection refus")
+    assert [result["path"] for result in results] == [os.path.abspath(path)]
+    assert results[0]["regions"] == [(10, 10, 120, 30)] # The two matched words, merged into one region
+    assert index.search("missing") == []
+
+
+def test_copied_file_reuses_layout_without_ocr(tmp_path, monkeypatch):
+    shots = tmp_path / "shots"
+    shots.mkdir()
+    _image(shots / "a.png", "white")
+    index, stub = _index(tmp_path, monkeypatch, {"a.png": ["hello"]})
+    index.update([str(shots)])
+    _image(shots / "copy.png", "white")
+
+    summary = index.update([str(shots)])
+    assert summary["reused"] == 1 and stub.calls == ["a.png"]
+    assert len(index.search("hello")) == 2
+
+
+def test_failed_file_is_retried(tmp_path, monkeypatch):
+    shots = tmp_path / "shots"
+    shots.mkdir()
+    _image(shots / "a.png", "white")
+    index, stub = _index(tmp_path, monkeypatch, {"a.png": None})
+    assert index.update([str(shots)])["failed"] == 1
+    # Not before the retry delay
+    assert index.update([str(shots)])["unchanged"] == 1 and stub.calls == ["a.png"]
+
+    stub.words["a.png"] = ["recovered"]
+    summary = index.update([str(shots)], retry_failed_after=0)
+    assert summary["ocr"] == 1 and summary["unchanged"] == 0
+    assert len(index.search("recovered")) == 1
+    assert index.stats()["failed"] == 0
+
+
+def test_deleted_file_is_removed(tmp_path, monkeypatch):
+    shots = tmp_path / "shots"
+    shots.mkdir()
+    path = _image(shots / "a.png", "white")
+    index, _ = _index(tmp_path, monkeypatch, {"a.png": ["gone"]})
+    index.update([str(shots)])
+    os.remove(path)
+
+    assert index.update([str(shots)])["removed"] == 1
+    assert index.search("gone") == [] and index.stats()["files"] == 0
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from src import ocr_tiles
+from src.ocr_result import OcrResult
+from tests.ocr_data import tesseract_data
+
+WIDTH = 800
+
+
+def _result(lines, height, conf=90):
+    """OcrResult with one word per (text, top, bottom) line, in lines order."""
+    words = [(text, (20, top, 220, bottom), number) for number, (text, top, bottom) in enumerate(lines, 1)]
+    return OcrResult.from_data(tesseract_data((WIDTH, height), words, conf))
+
+
+def _strip_results(page, strips):
+    """What OCR of each strip would see: the page lines inside it, clipped at its edges, in strip coordinates."""
+    results = []
+    for top, bottom in strips:
+        lines = [(text, max(y1, top) - top, min(y2, bottom) - top) for text, y1, y2 in page if y1 < bottom and y2 > top]
+        results.append(_result(lines, bottom - top))
+    return results
+
+
+def test_plan_strips_covers_the_image_with_even_overlapping_strips():
+    strips = ocr_tiles.plan_strips(10000, 2000, 160)
+    assert strips[0][0] == 0 and strips[-1][1] == 10000
+    for (_, bottom), (top, _) in zip(strips, strips[1:]):
+        assert bottom - top == 160
+    heights = [bottom - top for top, bottom in strips]
+    assert max(heights) <= 2000 and max(heights) - min(heights) <= 1
+
+
+def test_plan_strips_keeps_a_short_image_whole():
+    assert ocr_tiles.plan_strips(1500, 2000, 160) == [(0, 1500)]
+
+
+def test_merge_strips_keeps_every_line_once():
+    height = 5000
+    page = [(f"line{i}", y, y + 24) for i, y in enumerate(range(10, height - 30, 37))]
+    strips = ocr_tiles.plan_strips(height, 2000, 160)
+    merged = ocr_tiles.merge_strips(_strip_results(page, strips), strips, WIDTH, height)
+
+    assert [line["text"] for line in merged.lines()] == [text for text, _, _ in page]
+    assert [line["box"] for line in merged.lines()] == [(20, y1, 220, y2) for _, y1, y2 in page]
+    assert (merged.width, merged.height) == (WIDTH, height)
+
+
+def test_merge_strips_prefers_the_more_confident_duplicate():
+    strips = [(0, 1000), (900, 1900)]
+    # A line read by both strips whose centre is on different sides of the cut in each reading
+    first = _result([("he1lo", 928, 952)], 1000, conf=40)
+    second = _result([("hello", 40, 64)], 1000, conf=95) # 940-964 in the image
+    merged = ocr_tiles.merge_strips([first, second], strips, WIDTH, 1900)
+    assert [line["text"] for line in merged.lines()] == ["hello"]
+
+
+def test_map_parts_keeps_order_and_reuses_the_pool_threads(default_config):
+    threads = set()
+
+    def work(item):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.01 * (item % 3))
+        return item * 2
+
+    for _ in range(3):
+        assert ocr_tiles.map_parts(work, list(range(8)), workers=3) == [item * 2 for item in range(8)]
+    assert threads and all(name.startswith(ocr_tiles.THREAD_PREFIX) for name in threads)
+    assert len(threads) <= ocr_tiles._shared_executor()._max_workers
+
+
+def test_map_parts_with_one_worker_stays_in_the_calling_thread():
+    assert ocr_tiles.map_parts(lambda item: threading.current_thread(), [1, 2], workers=1) == [threading.current_thread()] * 2
@@ -0,0 +1,107 @@
+import copy
+import threading
+
+from PIL import Image, ImageDraw
+
+from src import fonts, ocr, ocr_cache, ocr_engines, text_regions
+from src.ocr_result import OcrResult
+from tests.ocr_data import tesseract_data
+
+
+def test_merge_blocks_joins_stacked_lines():
+    lines = [[10, 10, 200, 30], [10, 35, 150, 55], [10, 60, 180, 80]]
+    assert text_regions._merge_blocks(lines) == [[10, 10, 200, 80]]
+
+
+def test_merge_blocks_keeps_columns_and_distant_lines_apart():
+    columns = [[10, 10, 100, 30], [300, 10, 400, 30]]
+    assert text_regions._merge_blocks(copy.deepcopy(columns)) == columns
+    distant = [[10, 10, 100, 30], [10, 200, 100, 220]]
+    assert text_regions._merge_blocks(copy.deepcopy(distant)) == distant
+
+
+def test_merge_blocks_repeats_until_nothing_overlaps():
+    # The last box links the first two only after they were merged with it
+    boxes = [[0, 0, 50, 20], [200, 0, 250, 20], [40, 10, 210, 30]]
+    assert text_regions._merge_blocks(boxes) == [[0, 0, 250, 30]]
+
+
+def _sparse_screenshot():
+    image = Image.new("RGB", (1200, 800), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((20, 20, 1180, 780), outline=(120, 120, 120)) # A panel border is not text
+    font = fonts.get_font("sans", 16)
+    draw.text((80, 100), "Build finished with 3 warnings", fill=(0, 0, 0), font=font)
+    draw.text((80, 124), "See the log for details", fill=(0, 0, 0), font=font)
+    draw.text((700, 600), "Status: idle", fill=(0, 0, 0), font=font)
+    return image
+
+
+def test_find_text_regions_finds_the_text_blocks():
+    image = _sparse_screenshot()
+    regions = text_regions.find_text_regions(image)
+    assert len(regions) == 2
+    first, second = regions
+    assert first[0] <= 80 and first[1] <= 100 and first[3] >= 140 and first[3] < 200
+    assert second[0] <= 700 and second[1] <= 600 and second[1] > 500
+    assert text_regions.coverage(regions, image.size) < text_regions.AUTO_MAX_COVERAGE
+
+
+def _data(size, text):
+    """An engine's image_to_data dict for an image of size with one word at (8, 8)."""
+    return tesseract_data(size, [(text, (8, 8, 28, 18), 1)])
+
+
+def test_recognize_regions_moves_words_into_image_coordinates():
+    image = Image.new("RGB", (400, 300), "white")
+    regions = [(10, 20, 110, 60), (200, 150, 380, 200)]
+    result = text_regions.recognize_regions(
+        image, regions, lambda crop: OcrResult.from_data(_data(crop.size, f"w{crop.size[0]}")), workers=2)
+    assert [(word["text"], word["box"]) for word in result.words()] == [("w100", (18, 28, 38, 38)),
+                                                                         ("w180", (208, 158, 228, 168))]
+    assert result.block_count == 2
+
+
+class _CountingEngine:
+    name = "fake"
+    cache_config = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_data(self, image, lang="eng"):
+        self.calls += 1
+        return _data(image.size, "word")
+
+
+def test_auto_regions_repeat_is_a_whole_image_cache_hit(tmp_path, monkeypatch, default_config):
+    default_config["ocr"]["preprocess"] = "none"
+    engine = _CountingEngine()
+    monkeypatch.setattr(ocr_engines, "get_engine", lambda name=None: engine)
+    monkeypatch.setattr(ocr_cache, "_cache", ocr_cache.OcrCache(str(tmp_path / "cache.sqlite")))
+    detections = []
+    find_text_regions = text_regions.find_text_regions
+    monkeypatch.setattr(text_regions, "find_text_regions", lambda image: detections.append(1) or find_text_regions(image))
+    path = str(tmp_path / "shot.png")
+    _sparse_screenshot().save(path)
+
+    first = ocr.recognize(path, "layout", detect_regions="auto", workers=1)
+    timings = {}
+    second = ocr.recognize(path, "layout", detect_regions="auto", timings=timings, workers=1)
+    assert engine.calls == 2 and len(detections) == 1 # One engine call per region, the first time only
+    assert timings["cached"] and second.text == first.text == "word\n\nword"
+
+
+def test_recognize_regions_with_one_worker_runs_in_the_calling_thread():
+    image = Image.new("RGB", (400, 300), "white")
+    regions = [(0, 0, 50, 20), (0, 100, 300, 200)] # The second is bigger and recognized first
+    threads, sizes = [], []
+
+    def recognize(crop):
+        threads.append(threading.current_thread())
+        sizes.append(crop.size)
+        return OcrResult.from_data(_data(crop.size, f"w{crop.size[0]}"))
+
+    result = text_regions.recognize_regions(image, regions, recognize, workers=1)
+    assert threads == [threading.current_thread()] * 2 and sizes == [(300, 100), (50, 20)]
+    assert [word["text"] for word in result.words()] == ["w50", "w300"]